@@ -1,8 +1,9 @@
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
 import sys
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 import os
+import json
 import tempfile
 import shutil
 import asyncio
@@ -14,16 +15,25 @@ from modules.dns_scanner import DNSScanner
 from modules.service_analyzer import ServiceAnalyzer
 from modules.ssh_explorer import SSHExplorer
 from utils.report_manager import ReportManager
+from utils.pipeline import ReconPipeline
+from utils.job_manager import JobManager
+from utils.progress import ProgressCallback, throttled_progress
 
 # 統合MCPサーバーの初期化
 mcp = FastMCP("hacking-mcp")
 
 # 各スキャナーモジュールのインスタンス化
-nmap_scanner = NmapScanner()
-web_scanner = WebScanner()
 dns_scanner = DNSScanner()
+nmap_scanner = NmapScanner(host_resolver=dns_scanner.resolve_host)
+web_scanner = WebScanner(resolver=dns_scanner.aiohttp_resolver())
 service_analyzer = ServiceAnalyzer()
-ssh_explorer = SSHExplorer()
+ssh_explorer = SSHExplorer(host_resolver=dns_scanner.resolve_host)
+
+def _progress(ctx: Optional[Context]) -> Optional[ProgressCallback]:
+    """スキャナーの進捗をMCPの進捗通知（report_progress）とログメッセージ（見つかったもの）として転送する"""
+    if ctx is None:
+        return None
+    return throttled_progress(ctx.report_progress, ctx.info)
 
 # =============================================================================
 # Nmap関連ツール
@@ -111,14 +121,14 @@ async def web_technology_detection(url: str) -> str:
     return await web_scanner.technology_detection(url)
 
 @mcp.tool()
-async def web_directory_scan(url: str, wordlist: str = "common") -> str:
+async def web_directory_scan(url: str, wordlist: str = "common", ctx: Context = None) -> str:
     """Webディレクトリ・ファイルスキャンを実行します（gobuster風）
     
     Args:
         url: チェック対象のURL
         wordlist: 使用するwordlist（"common", "dirs", "files"）
     """
-    return await web_scanner.directory_scan(url, wordlist)
+    return await web_scanner.directory_scan(url, wordlist, progress=_progress(ctx))
 
 @mcp.tool()
 async def web_comprehensive_scan(url: str) -> str:
@@ -154,14 +164,30 @@ async def dns_lookup(domain: str, record_type: str = "A") -> str:
     return await dns_scanner.dns_lookup(domain, record_type)
 
 @mcp.tool()
-async def dns_subdomain_enum(domain: str, wordlist: str = "common") -> str:
-    """サブドメイン列挙を実行します
+async def dns_bulk_lookup(names: List[str], record_types: Optional[List[str]] = None, workers: int = 50, rate: float = 200,
+                          ctx: Context = None) -> str:
+    """複数のドメイン名を一括でDNS検索し、同じIPアドレスに解決される名前をまとめた表を返します
+    
+    Args:
+        names: 検索するドメイン名の一覧
+        record_types: レコードタイプの一覧（デフォルト: ["A"]、例: ["A", "AAAA", "MX"]）
+        workers: 同時に問い合わせるワーカー数（デフォルト: 50）
+        rate: 1秒あたりの最大クエリ数（デフォルト: 200、0で無制限）
+    """
+    return await dns_scanner.bulk_lookup(names, record_types, workers, rate, progress=_progress(ctx))
+
+@mcp.tool()
+async def dns_subdomain_enum(domain: str, wordlist: str = "common", workers: int = 100, rate: float = 500,
+                             ctx: Context = None) -> str:
+    """サブドメイン列挙を実行します（ワイルドカードDNSを検出して誤検出を除外）
     
     Args:
         domain: 対象ドメイン名
-        wordlist: 使用するwordlist（現在は"common"のみ）
+        wordlist: 使用するwordlist（"common" またはコンテナ内のwordlistファイルのパス）
+        workers: 同時に問い合わせるワーカー数（デフォルト: 100）
+        rate: 1秒あたりの最大クエリ数（デフォルト: 500、0で無制限）
     """
-    return await dns_scanner.subdomain_enum(domain, wordlist)
+    return await dns_scanner.subdomain_enum(domain, wordlist, workers, rate, progress=_progress(ctx))
 
 @mcp.tool()
 async def dns_reverse_lookup(ip: str) -> str:
@@ -172,6 +198,27 @@ async def dns_reverse_lookup(ip: str) -> str:
     """
     return await dns_scanner.reverse_dns(ip)
 
+@mcp.tool()
+async def dns_reverse_sweep(targets: str, workers: int = 50, rate: float = 200, ctx: Context = None) -> str:
+    """CIDRまたはIPアドレス一覧に対して一括で逆引きDNSを実行し、IP→ホスト名の表を返します
+    
+    Args:
+        targets: 対象のCIDRまたはIPアドレス（カンマ/空白区切り、IPv4/IPv6対応。例: "10.0.0.0/24"）
+        workers: 同時に問い合わせるワーカー数（デフォルト: 50）
+        rate: 1秒あたりの最大クエリ数（デフォルト: 200、0で無制限）
+    """
+    return await dns_scanner.reverse_sweep(targets, workers, rate, progress=_progress(ctx))
+
+@mcp.tool()
+async def dns_resolver_pool(nameservers: Optional[List[str]] = None, strategy: Optional[str] = None) -> str:
+    """DNSリゾルバープールの状態（遅延・エラー数・降格状態）を表示し、必要に応じて設定を変更します
+    
+    Args:
+        nameservers: 使用するリゾルバーの一覧（例: ["8.8.8.8", "1.1.1.1", "system", "127.0.0.1:5353"]、省略時は変更なし）
+        strategy: 選択方式 "round_robin" または "least_latency"（省略時は変更なし）
+    """
+    return await dns_scanner.resolver_pool_status(nameservers, strategy)
+
 @mcp.tool()
 async def dns_comprehensive(domain: str) -> str:
     """包括的DNS調査（全レコードタイプ + サブドメイン列挙）
@@ -204,6 +251,16 @@ async def service_quick_analysis(target: str, port: int) -> str:
     """
     return await service_analyzer.quick_port_analysis(target, port)
 
+@mcp.tool()
+async def service_batch_risk_summary(nmap_output: str, max_hosts: int = 50) -> str:
+    """大規模なnmap結果の全ポートを一括評価し、ホスト別のリスク集計と脆弱性の要約を返します
+    
+    Args:
+        nmap_output: nmapスキャンの結果テキスト（本ツールの出力またはnmapの通常出力）
+        max_hosts: ホスト別集計に表示する最大ホスト数（デフォルト: 50）
+    """
+    return await service_analyzer.batch_risk_summary(nmap_output, max_hosts)
+
 
 
 
@@ -256,7 +313,7 @@ async def quick_recon(target: str) -> str:
     return "\n".join(results)
 
 @mcp.tool()
-async def comprehensive_recon(target: str) -> str:
+async def comprehensive_recon(target: str, ctx: Context = None) -> str:
     """包括的偵察：DNS、nmap、Web、サービス分析のフルスキャン
     
     Args:
@@ -273,46 +330,61 @@ async def comprehensive_recon(target: str) -> str:
         results.append("-" * 60)
         web_comprehensive = await web_scanner.comprehensive_web_scan(target)
         results.append(web_comprehensive)
-    else:
-        # 1. DNS包括調査（ドメイン名の場合のみ）
-        if '.' in target and not target.replace('.', '').isdigit():
-            results.append("\n1. DNS Investigation")
-            results.append("-" * 30)
-            dns_result = await dns_scanner.dns_comprehensive(target)
-            results.append(dns_result)
-        else:
-            results.append("\n1. DNS Investigation")
-            results.append("-" * 30)
-            results.append("Skipped: IP address detected, DNS investigation not applicable")
-        
-        # 2. ネットワークスキャン（基本版から開始）
-        results.append("\n2. Network Scan (Basic)")
-        results.append("-" * 30)
-        basic_nmap = await nmap_scanner.basic_scan(target)
-        results.append(basic_nmap)
-        
-        # 3. サービス分析
+        return "\n".join(results)
+    
+    is_domain = '.' in target and not target.replace('.', '').isdigit()
+    
+    async def dns_stage(_):
+        if not is_domain:
+            return "Skipped: IP address detected, DNS investigation not applicable"
+        return await dns_scanner.dns_comprehensive(target)
+    
+    async def nmap_stage(_):
+        return await nmap_scanner.basic_scan(target)
+    
+    async def service_stage(inputs):
+        return await service_analyzer.analyze_nmap_results(inputs["nmap"])
+    
+    async def web_stage(inputs):
+        # HTTPサービスが見つかった場合のみ（HTTPSを優先して試行）
+        if not any(port in inputs["nmap"] for port in ['80', '443', '8080', '8443']):
+            return None
+        return await web_scanner.comprehensive_web_scan(f"https://{target}")
+    
+    # DNSとnmapは独立して並行実行し、サービス分析とWeb分析はnmapの結果を待って並行実行する
+    pipeline = ReconPipeline(f"comprehensive_recon {target}")
+    pipeline.add("dns", dns_stage)
+    pipeline.add("nmap", nmap_stage)
+    pipeline.add("service", service_stage, depends=["nmap"])
+    pipeline.add("web", web_stage, depends=["nmap"])
+    stage_results = await pipeline.run(_progress(ctx))
+    
+    # 1. DNS包括調査（ドメイン名の場合のみ）
+    results.append("\n1. DNS Investigation")
+    results.append("-" * 30)
+    results.append(stage_results["dns"])
+    
+    # 2. ネットワークスキャン（基本版）
+    results.append("\n2. Network Scan (Basic)")
+    results.append("-" * 30)
+    results.append(stage_results["nmap"])
+    
+    # 3. サービス分析（nmapが失敗した場合は実行されない）
+    if stage_results["service"] is not None:
         results.append("\n3. Service Security Analysis")
         results.append("-" * 30)
-        service_analysis = await service_analyzer.analyze_nmap_results(basic_nmap)
-        results.append(service_analysis)
-        
-        # 4. Web包括分析（HTTPサービスが見つかった場合）
-        if any(port in basic_nmap for port in ['80', '443', '8080', '8443']):
-            web_target = target
-            if not target.startswith(('http://', 'https://')):
-                # HTTPSを優先して試行
-                web_target = f"https://{target}"
-            
-            results.append("\n4. Web Application Analysis")
-            results.append("-" * 30)
-            web_comprehensive = await web_scanner.comprehensive_web_scan(web_target)
-            results.append(web_comprehensive)
+        results.append(stage_results["service"])
+    
+    # 4. Web包括分析（HTTPサービスが見つかった場合）
+    if stage_results["web"] is not None:
+        results.append("\n4. Web Application Analysis")
+        results.append("-" * 30)
+        results.append(stage_results["web"])
     
     return "\n".join(results)
 
 @mcp.tool()
-async def domain_investigation(domain: str) -> str:
+async def domain_investigation(domain: str, ctx: Context = None) -> str:
     """ドメイン専用調査：DNS、Whois、Web技術、サブドメインの包括調査
     
     Args:
@@ -323,30 +395,47 @@ async def domain_investigation(domain: str) -> str:
     results.append(f"Target Domain: {domain}")
     results.append("=" * 50)
     
+    https_url = f"https://{domain}"
+    
+    async def dns_stage(_):
+        return await dns_scanner.dns_comprehensive(domain)
+    
+    async def technology_stage(_):
+        return await web_scanner.technology_detection(https_url)
+    
+    async def headers_stage(_):
+        return await web_scanner.check_security_headers(https_url)
+    
+    async def ports_stage(_):
+        return await nmap_scanner.basic_scan(domain)
+    
+    # 4つの調査は互いに独立しているので並行実行する
+    pipeline = ReconPipeline(f"domain_investigation {domain}")
+    pipeline.add("dns", dns_stage)
+    pipeline.add("technology", technology_stage)
+    pipeline.add("headers", headers_stage)
+    pipeline.add("ports", ports_stage)
+    stage_results = await pipeline.run(_progress(ctx))
+    
     # 1. DNS包括調査
     results.append("\n1. DNS Records Analysis")
     results.append("-" * 30)
-    dns_result = await dns_scanner.dns_comprehensive(domain)
-    results.append(dns_result)
+    results.append(stage_results["dns"])
     
     # 2. Web技術検出
     results.append("\n2. Web Technology Stack")
     results.append("-" * 30)
-    https_url = f"https://{domain}"
-    tech_result = await web_scanner.technology_detection(https_url)
-    results.append(tech_result)
+    results.append(stage_results["technology"])
     
     # 3. セキュリティヘッダー分析
     results.append("\n3. Web Security Headers")
     results.append("-" * 30)
-    security_result = await web_scanner.check_security_headers(https_url)
-    results.append(security_result)
+    results.append(stage_results["headers"])
     
     # 4. 基本的なポートスキャン
     results.append("\n4. Basic Port Scan")
     results.append("-" * 30)
-    port_result = await nmap_scanner.basic_scan(domain)
-    results.append(port_result)
+    results.append(stage_results["ports"])
     
     return "\n".join(results)
 
@@ -357,42 +446,46 @@ async def web_security_audit(url: str) -> str:
     Args:
         url: 監査対象のURL
     """
-    results = []
-    results.append("=== WEB SECURITY AUDIT ===")
-    results.append(f"Target: {url}")
-    results.append("=" * 50)
+    return await web_scanner.security_audit(url)
+
+@mcp.tool()
+async def web_batch_security_audit(urls: List[str], max_concurrency: int = 10, per_host_limit: int = 2, include_details: bool = False,
+                                  ctx: Context = None) -> str:
+    """複数URLに対してWebセキュリティ監査を並行実行し、サマリー表を返します
     
-    # 1. 基本情報とレスポンス分析
-    results.append("\n1. Basic Information & Response Analysis")
-    results.append("-" * 45)
-    basic_info = await web_scanner.get_basic_info(url)
-    results.append(basic_info)
-    
-    # 2. セキュリティヘッダー詳細分析
-    results.append("\n2. Security Headers Analysis")
-    results.append("-" * 35)
-    security_headers = await web_scanner.check_security_headers(url)
-    results.append(security_headers)
-    
-    # 3. 技術スタック検出
-    results.append("\n3. Technology Stack Detection")
-    results.append("-" * 35)
-    tech_detection = await web_scanner.technology_detection(url)
-    results.append(tech_detection)
-    
-    # 4. 共通ファイル・ディレクトリ検索
-    results.append("\n4. Common Files & Directories")
-    results.append("-" * 35)
-    dir_scan = await web_scanner.directory_scan(url, "common")
-    results.append(dir_scan)
-    
-    # 5. robots.txt分析
-    results.append("\n5. robots.txt Analysis")
-    results.append("-" * 25)
-    robots_analysis = await web_scanner.check_robots_txt(url)
-    results.append(robots_analysis)
+    Args:
+        urls: 監査対象のURLリスト
+        max_concurrency: 全体の同時実行数の上限（デフォルト: 10）
+        per_host_limit: 同一ホストへの同時実行数の上限（デフォルト: 2）
+        include_details: 各URLの詳細結果を含めるかどうか（デフォルト: False）
+    """
+    return await web_scanner.batch_scan(urls, "audit", max_concurrency, per_host_limit, include_details, progress=_progress(ctx))
+
+@mcp.tool()
+async def web_batch_check_security(urls: List[str], max_concurrency: int = 10, per_host_limit: int = 2, include_details: bool = False,
+                                  ctx: Context = None) -> str:
+    """複数URLのセキュリティヘッダーを並行チェックし、サマリー表を返します
     
-    return "\n".join(results)
+    Args:
+        urls: チェック対象のURLリスト
+        max_concurrency: 全体の同時実行数の上限（デフォルト: 10）
+        per_host_limit: 同一ホストへの同時実行数の上限（デフォルト: 2）
+        include_details: 各URLの詳細結果を含めるかどうか（デフォルト: False）
+    """
+    return await web_scanner.batch_scan(urls, "security", max_concurrency, per_host_limit, include_details, progress=_progress(ctx))
+
+@mcp.tool()
+async def web_batch_technology_detection(urls: List[str], max_concurrency: int = 10, per_host_limit: int = 2, include_details: bool = False,
+                                        ctx: Context = None) -> str:
+    """複数URLの技術スタックを並行検出し、サマリー表を返します
+    
+    Args:
+        urls: チェック対象のURLリスト
+        max_concurrency: 全体の同時実行数の上限（デフォルト: 10）
+        per_host_limit: 同一ホストへの同時実行数の上限（デフォルト: 2）
+        include_details: 各URLの詳細結果を含めるかどうか（デフォルト: False）
+    """
+    return await web_scanner.batch_scan(urls, "technology", max_concurrency, per_host_limit, include_details, progress=_progress(ctx))
 
 
 
@@ -405,70 +498,87 @@ async def web_security_audit(url: str) -> str:
 # =============================================================================
 
 @mcp.tool()
-async def comprehensive_recon_with_report(target: str) -> str:
+async def comprehensive_recon_with_report(target: str, ctx: Context = None) -> str:
     """包括的偵察を行い、結果をレポートとして保存します"""
     
     # 1. レポートマネージャーを初期化
     report = ReportManager(target)
     print(f"[*] Starting comprehensive recon with reporting for {target}...", file=sys.stderr)
     
+    async def screenshot(url: str):
+        ss_filename = f"{url.replace('://', '_').replace(':', '_').replace('/', '_')}.png"
+        ss_path = os.path.join(report.ss_dir, ss_filename)
+        if await web_scanner.take_screenshot(url, ss_path):
+            return url, ss_path
+        return None
+    
     # HTTP/HTTPSのURLが指定された場合はポートスキャンをスキップ
     if target.startswith(('http://', 'https://')):
         print(f"[*] HTTP/HTTPS URL detected, skipping port scan for {target}", file=sys.stderr)
         
-        # Web包括分析を実行
-        web_comprehensive = await web_scanner.comprehensive_web_scan(target)
-        report.add_section("Web Application Analysis", web_comprehensive)
+        # Web包括分析とスクリーンショット撮影は独立しているので並行実行する
+        pipeline = ReconPipeline(f"recon_with_report {target}")
+        pipeline.add("web", lambda _: web_scanner.comprehensive_web_scan(target))
+        pipeline.add("screenshot", lambda _: screenshot(target))
+        stage_results = await pipeline.run(_progress(ctx))
         
-        # スクリーンショットを撮影
-        ss_filename = f"{target.replace('://', '_').replace(':', '_').replace('/', '_')}.png"
-        ss_path = os.path.join(report.ss_dir, ss_filename)
-        
-        if await web_scanner.take_screenshot(target, ss_path):
-            report.add_screenshot(target, ss_path)
+        report.add_section("Web Application Analysis", stage_results["web"])
+        if isinstance(stage_results["screenshot"], tuple):
+            report.add_screenshot(*stage_results["screenshot"])
     else:
-        # 2. ネットワークスキャンを実行し、レポートに追記
-        # まず基本スキャンで開放ポートを特定
-        basic_nmap = await nmap_scanner.basic_scan(target)
-        open_ports = nmap_scanner._extract_open_ports_from_result(basic_nmap)
+        async def basic_nmap_stage(_):
+            # まず基本スキャンで開放ポートを特定
+            return await nmap_scanner.basic_scan(target)
         
-        if open_ports:
-            ports_str = ",".join(open_ports)
-            detailed_nmap = await nmap_scanner.detailed_scan(target, ports_str)
-        else:
-            detailed_nmap = basic_nmap
+        async def detailed_nmap_stage(inputs):
+            open_ports = nmap_scanner._extract_open_ports_from_result(inputs["basic_nmap"])
+            if not open_ports:
+                return inputs["basic_nmap"]
+            return await nmap_scanner.detailed_scan(target, ",".join(open_ports))
         
-        report.add_section("Nmap Scan Results", detailed_nmap)
+        async def web_ports_stage(inputs):
+            # 一般的なWebポートを、ポート番号を含めたURLにする
+            urls = []
+            for port in nmap_scanner._extract_open_ports_from_result(inputs["detailed_nmap"]):
+                if port in ['80', '443', '8080', '8443']:
+                    protocol = "https" if port in ['443', '8443'] else "http"
+                    urls.append(f"{protocol}://{target}:{port}")
+            return urls
         
-        # 3. HTTP/HTTPSサービスがあればスクリーンショットを撮影
-        open_ports = nmap_scanner._extract_open_ports_from_result(detailed_nmap)
-        web_ports_found = False # Webポートが見つかったかどうかのフラグ
+        async def screenshots_stage(inputs):
+            shots = await asyncio.gather(*(screenshot(url) for url in inputs["web_ports"]))
+            return [shot for shot in shots if shot]
         
-        for port in open_ports:
-            # 一般的なWebポートをチェック
-            if port in ['80', '443', '8080', '8443']:
-                web_ports_found = True
-                protocol = "https" if port in ['443', '8443'] else "http"
-                # ポート番号を含めたURLを生成
-                service_url = f"{protocol}://{target}:{port}"
-                
-                ss_filename = f"{service_url.replace('://', '_').replace(':', '_')}.png"
-                ss_path = os.path.join(report.ss_dir, ss_filename)
-                
-                if await web_scanner.take_screenshot(service_url, ss_path):
-                    report.add_screenshot(service_url, ss_path)
-
-        # 4. DNSスキャンを実行し、レポートに追記
-        dns_result = await dns_scanner.dns_comprehensive(target)
-        report.add_section("DNS Analysis", dns_result)
-
-        # 5. Webポートが見つかった場合のみ、Web包括分析を実行
-        if web_ports_found:
+        async def dns_stage(_):
+            return await dns_scanner.dns_comprehensive(target)
+        
+        async def web_stage(inputs):
+            # Webポートが見つかった場合のみ、Web包括分析を実行
+            if not inputs["web_ports"]:
+                return "No open web ports (80, 443, 8080, 8443) found. Skipping web scan."
             # web_scannerが賢くなったので、ターゲットをそのまま渡すだけで良い
-            web_comprehensive = await web_scanner.comprehensive_web_scan(target)
-            report.add_section("Web Application Analysis", web_comprehensive)
-        else:
-            report.add_section("Web Application Analysis", "No open web ports (80, 443, 8080, 8443) found. Skipping web scan.")
+            return await web_scanner.comprehensive_web_scan(target)
+        
+        # DNSはnmapと並行実行し、スクリーンショットとWeb分析は開放ポートが分かり次第並行実行する
+        pipeline = ReconPipeline(f"recon_with_report {target}")
+        pipeline.add("basic_nmap", basic_nmap_stage)
+        pipeline.add("dns", dns_stage)
+        pipeline.add("detailed_nmap", detailed_nmap_stage, depends=["basic_nmap"])
+        pipeline.add("web_ports", web_ports_stage, depends=["detailed_nmap"])
+        pipeline.add("screenshots", screenshots_stage, depends=["web_ports"])
+        pipeline.add("web", web_stage, depends=["web_ports"])
+        stage_results = await pipeline.run(_progress(ctx))
+        
+        # レポートには従来と同じ順序（nmap、スクリーンショット、DNS、Web）で追記する
+        # 基本スキャンが失敗した場合は詳細スキャンが実行されないため、基本スキャンのエラーを載せる
+        report.add_section("Nmap Scan Results", stage_results["detailed_nmap"] or stage_results["basic_nmap"])
+        if isinstance(stage_results["screenshots"], list):
+            for service_url, ss_path in stage_results["screenshots"]:
+                report.add_screenshot(service_url, ss_path)
+        report.add_section("DNS Analysis", stage_results["dns"])
+        # nmapが失敗した場合、Web分析は実行されない（失敗内容はnmapのセクションに出る）
+        if stage_results["web"] is not None:
+            report.add_section("Web Application Analysis", stage_results["web"])
 
     # 6. 最後に短い完了メッセージだけを返す
     final_message = f"✅ Scan complete. Full report saved at: {report.report_path}"
@@ -492,7 +602,8 @@ async def ssh_explore_current_directory(host: str, username: str, password: str,
     return await ssh_explorer.explore_current_directory(host=host, port=port, username=username, password=password)
 
 @mcp.tool()
-async def ssh_search_flag_files(host: str, username: str, password: str, port: int = 22, search_paths: Optional[List[str]] = None) -> str:
+async def ssh_search_flag_files(host: str, username: str, password: str, port: int = 22, search_paths: Optional[List[str]] = None,
+                                time_budget: int = 60) -> str:
     """SSH接続後、リモートサーバー上のflag*.txtやroot.txtファイルを網羅的に検索します
     
     Args:
@@ -501,8 +612,10 @@ async def ssh_search_flag_files(host: str, username: str, password: str, port: i
         password: SSHパスワード
         port: SSHポート番号 (デフォルト: 22)
         search_paths: 検索するパスのリスト（指定しない場合は主要ディレクトリを検索）
+        time_budget: 検索の制限時間（秒）。超えた場合はそれまでの結果を返す（デフォルト: 60）
     """
-    return await ssh_explorer.search_flag_files(host=host, port=port, username=username, password=password, search_paths=search_paths)
+    return await ssh_explorer.search_flag_files(host=host, port=port, username=username, password=password,
+                                                search_paths=search_paths, time_budget=time_budget)
 
 @mcp.tool()
 async def ssh_explore_system_directories(host: str, username: str, password: str, port: int = 22) -> str:
@@ -594,6 +707,183 @@ async def ssh_keep_only_root_txt(host: str, username: str, password: str, port:
     """
     return await ssh_explorer.keep_only_root_txt(host=host, port=port, username=username, password=password)
 
+@mcp.tool()
+async def ssh_explore_hosts(hosts: List[str], username: str, password: str, port: int = 22, action: str = "comprehensive",
+                            concurrency: int = 10, host_timeout: int = 120, ctx: Context = None) -> str:
+    """同じ認証情報で複数ホストに読み取り専用の調査を並行実行し、ホストごとの結果をまとめて返します（スコープ外のホストはスキップ）
+    
+    Args:
+        hosts: 接続先ホストのリスト
+        username: SSHユーザー名
+        password: SSHパスワード
+        port: SSHポート番号 (デフォルト: 22)
+        action: 調査内容（current_directory, flag_files, system_directories, hidden_files, comprehensive）
+        concurrency: 同時に調査するホスト数（デフォルト: 10）
+        host_timeout: 1ホストあたりの制限時間（秒、デフォルト: 120）
+    """
+    return await ssh_explorer.explore_hosts(hosts=hosts, port=port, username=username, password=password, action=action,
+                                            concurrency=concurrency, host_timeout=host_timeout, progress=_progress(ctx))
+
+@mcp.tool()
+async def ssh_fetch_files(host: str, username: str, password: str, paths: List[str], port: int = 22,
+                          max_file_size: int = 10485760, max_total_size: int = 52428800) -> str:
+    """SFTPでリモートのファイルを並行取得し、内容のプレビューと保存先を返します（大きいファイルはscan_results/ssh_filesに保存）
+    
+    Args:
+        host: 接続先ホスト
+        username: ユーザー名
+        password: パスワード
+        paths: 取得するファイルのパス（ワイルドカード可。例: ["/etc/passwd", "/home/*/user.txt"]）
+        port: SSHポート（デフォルト: 22）
+        max_file_size: 1ファイルあたりの最大取得バイト数（デフォルト: 10MB）
+        max_total_size: 合計の最大取得バイト数（デフォルト: 50MB）
+    """
+    return await ssh_explorer.fetch_files(host=host, port=port, username=username, password=password, paths=paths,
+                                          max_file_bytes=max_file_size, max_total_bytes=max_total_size)
+
+@mcp.tool()
+async def ssh_build_file_index(host: str, username: str, password: str, port: int = 22, root: str = '/',
+                               full_rebuild: bool = False, time_budget: int = 300) -> str:
+    """SSH接続先のファイル一覧（パス・サイズ・権限・更新時刻・所有者）をローカルのインデックスに取り込みます。2回目以降は変化したディレクトリだけを再走査します
+    
+    Args:
+        host: 接続先ホスト
+        username: ユーザー名
+        password: パスワード
+        port: SSHポート（デフォルト: 22）
+        root: インデックス化するディレクトリ（デフォルト: /）
+        full_rebuild: Trueの場合は差分ではなく全体を走査し直す
+        time_budget: 走査の制限時間（秒、デフォルト: 300）
+    """
+    return await ssh_explorer.build_file_index(host=host, port=port, username=username, password=password, root=root,
+                                               full_rebuild=full_rebuild, time_budget=time_budget)
+
+@mcp.tool()
+async def ssh_query_file_index(host: str, username: str, port: int = 22, query: str = "pattern", pattern: str = "*",
+                               directory: str = '/', min_size: int = 0, limit: int = 100) -> str:
+    """ssh_build_file_indexで作成したインデックスをローカルで検索します（リモートへの接続は行いません）
+    
+    Args:
+        host: 接続先ホスト
+        username: インデックス作成時のユーザー名
+        port: SSHポート（デフォルト: 22）
+        query: 検索の種類（pattern: ファイル名のワイルドカード一致, hidden: 隠しファイル, size: サイズの大きいファイル, dirs: ディレクトリ別の件数集計）
+        pattern: queryがpatternのときのファイル名パターン（例: flag*.txt）
+        directory: 検索対象のディレクトリ（デフォルト: /）
+        min_size: queryがsizeのときの最小サイズ（バイト）
+        limit: 最大表示件数（デフォルト: 100）
+    """
+    return await ssh_explorer.query_file_index(host=host, port=port, username=username, query=query, pattern=pattern,
+                                               directory=directory, min_size=min_size, limit=limit)
+
+@mcp.tool()
+async def ssh_close_connections(host: Optional[str] = None) -> str:
+    """ssh_* ツールが再利用しているSSH接続を閉じます
+    
+    Args:
+        host: 接続を閉じる対象ホスト（省略時はすべての接続）
+    """
+    return await ssh_explorer.close_connections(host)
+
+# =============================================================================
+# ジョブ管理ツール（時間のかかるツールのバックグラウンド実行）
+# =============================================================================
+
+JOB_TOOLS = {"start_job", "job_status", "job_result", "job_cancel"}
+
+async def _run_tool_job(tool: str, args: Dict[str, Any]) -> str:
+    """登録済みのツールを引数の検証込みで実行し、テキスト結果を返す"""
+    contents = await mcp.call_tool(tool, args)
+    return "\n".join(getattr(content, "text", "") for content in contents)
+
+job_manager = JobManager(_run_tool_job, max_concurrent=4, results_dir="scan_results/jobs")
+
+def _format_job(job: Dict[str, Any]) -> str:
+    created = datetime.fromtimestamp(job["created_at"]).strftime('%Y-%m-%d %H:%M:%S')
+    line = f"{job['id']}  {job['status']:<9}  {job['tool']}  (開始要求: {created}"
+    if job["started_at"]:
+        end = job["finished_at"] or datetime.now().timestamp()
+        line += f", 実行時間: {end - job['started_at']:.1f}秒"
+    return line + ")"
+
+@mcp.tool()
+async def start_job(tool: str, args: Optional[Dict[str, Any]] = None) -> str:
+    """時間のかかるツールをバックグラウンドで実行し、すぐにジョブIDを返します（結果は job_status / job_result で確認）
+    
+    Args:
+        tool: 実行するツール名（例: comprehensive_recon, nmap_basic_scan）
+        args: ツールの引数（例: {"target": "example.com"}）
+    """
+    if tool in JOB_TOOLS:
+        return f"Error: {tool} cannot be run as a job"
+    if tool not in {registered.name for registered in await mcp.list_tools()}:
+        return f"Error: unknown tool '{tool}'"
+    job = job_manager.start(tool, args or {})
+    return (f"✅ Job started: {job['id']}\n"
+            f"Tool: {tool}\n"
+            f"Check progress with job_status('{job['id']}') and fetch the output with job_result('{job['id']}').")
+
+@mcp.tool()
+async def job_status(job_id: Optional[str] = None) -> str:
+    """ジョブの状態を表示します（job_idを省略すると最近のジョブ一覧）
+    
+    Args:
+        job_id: ジョブID
+    """
+    if job_id is None:
+        jobs = job_manager.list()
+        if not jobs:
+            return "No jobs."
+        return "\n".join(["=== JOBS ===", f"Summary: {job_manager.stats()}", ""] + [_format_job(job) for job in jobs])
+    job = job_manager.get(job_id)
+    if job is None:
+        return f"Error: job '{job_id}' not found"
+    lines = [_format_job(job), f"Args: {json.dumps(job['args'], ensure_ascii=False)}"]
+    if job["result"] is not None:
+        lines.append(f"Result: {len(job['result'])} characters (job_result で取得)")
+    if job["error"]:
+        lines.append(f"Error: {job['error']}")
+    return "\n".join(lines)
+
+@mcp.tool()
+async def job_result(job_id: str, offset: int = 0, limit: int = 20000) -> str:
+    """終了したジョブの結果を取得します（長い結果はoffset/limitでページ単位に取得）
+    
+    Args:
+        job_id: ジョブID
+        offset: 取得開始位置（文字数、デフォルト: 0）
+        limit: 1回に取得する最大文字数（デフォルト: 20000）
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return f"Error: job '{job_id}' not found"
+    if job["status"] in JobManager.ACTIVE_STATES:
+        return f"Job {job_id} is still {job['status']}. Check again later with job_status('{job_id}')."
+    if job["result"] is None:
+        return f"Job {job_id} {job['status']}: {job['error'] or 'no result'}"
+    result = job["result"]
+    offset = max(0, offset)
+    limit = max(1, limit)
+    page = result[offset:offset + limit]
+    header = f"[Job {job_id} ({job['tool']}) result: characters {offset}-{offset + len(page)} of {len(result)}]"
+    if offset + limit < len(result):
+        header += f"\n[Next page: job_result('{job_id}', offset={offset + limit}, limit={limit})]"
+    return f"{header}\n{page}"
+
+@mcp.tool()
+async def job_cancel(job_id: str) -> str:
+    """実行中または待機中のジョブを中止します
+    
+    Args:
+        job_id: ジョブID
+    """
+    if job_manager.cancel(job_id):
+        return f"✅ Job {job_id} cancelled."
+    job = job_manager.get(job_id)
+    if job is None:
+        return f"Error: job '{job_id}' not found"
+    return f"Job {job_id} is already {job['status']}."
+
 # =============================================================================
 # ステータス・ヘルプ機能
 # =============================================================================
@@ -608,7 +898,8 @@ async def scanner_status() -> str:
         f"Web Scanner: {await web_scanner.get_status()}",
         f"DNS Scanner: {await dns_scanner.get_status()}",
         f"Service Analyzer: {await service_analyzer.get_status()}",
-        f"SSH Explorer: Available",
+        f"SSH Explorer: {await ssh_explorer.get_status()}",
+        f"Jobs: {job_manager.stats()}",
         "",
         "=== AVAILABLE TOOL CATEGORIES ===",
         "",
@@ -625,16 +916,23 @@ async def scanner_status() -> str:
         "  • web_directory_scan: ディレクトリ・ファイルスキャン",
         "  • web_comprehensive_scan: 包括的Webスキャン",
         "  • web_security_audit: Webセキュリティ監査",
+        "  • web_batch_security_audit: 複数URLのWebセキュリティ監査（並行実行）",
+        "  • web_batch_check_security: 複数URLのセキュリティヘッダー確認（並行実行）",
+        "  • web_batch_technology_detection: 複数URLの技術スタック検出（並行実行）",
         "",
         "🔍 DNS Investigation (dns_*):",
         "  • dns_lookup: DNSレコード検索",
+        "  • dns_bulk_lookup: 複数ドメインの一括DNS検索",
         "  • dns_subdomain_enum: サブドメイン列挙",
         "  • dns_reverse_lookup: 逆引きDNS",
+        "  • dns_reverse_sweep: CIDR/IP一覧の一括逆引きDNS",
         "  • dns_comprehensive: 包括的DNS調査",
+        "  • dns_resolver_pool: リゾルバープールの状態表示・設定",
         "",
         "🛡️ Service Analysis (service_*):",
         "  • service_analyze_nmap: nmapの結果を分析",
         "  • service_quick_analysis: 特定ポートの分析",
+        "  • service_batch_risk_summary: 大規模スキャン結果の一括リスク集計",
         "",
 
         "",
@@ -655,6 +953,17 @@ async def scanner_status() -> str:
         "  • ssh_cleanup_files: 指定パターンのファイル削除・整理",
         "  • ssh_list_current_files: 現在ディレクトリのファイル一覧表示",
         "  • ssh_keep_only_root_txt: root.txt以外のファイルを削除・整理",
+        "  • ssh_explore_hosts: 複数ホストへの読み取り専用調査の並行実行",
+        "  • ssh_fetch_files: SFTPによるファイルの並行取得",
+        "  • ssh_build_file_index: リモートのファイル一覧をインデックス化（差分更新対応）",
+        "  • ssh_query_file_index: インデックスをローカルで検索（名前・隠しファイル・サイズ・ディレクトリ別集計）",
+        "  • ssh_close_connections: 再利用中のSSH接続を閉じる",
+        "",
+        "⏳ Background Jobs (job_*):",
+        "  • start_job: 時間のかかるツールをバックグラウンド実行（ジョブIDを即座に返す）",
+        "  • job_status: ジョブの状態・一覧",
+        "  • job_result: ジョブの結果取得（ページ単位）",
+        "  • job_cancel: ジョブの中止",
         "",
         "📊 Utility:",
         "  • scanner_status: この状態表示",
@@ -674,7 +983,11 @@ async def scanner_status() -> str:
         "Specific investigations:",
         "  dns_comprehensive('google.com')",
         "  web_technology_detection('https://wordpress.org')",
-        "  service_quick_analysis('target.com', 22)"
+        "  service_quick_analysis('target.com', 22)",
+        "",
+        "Long-running scans:",
+        "  start_job('comprehensive_recon', {'target': 'example.com'})",
+        "  job_result('<job id>')"
     ]
     return "\n".join(status)
 
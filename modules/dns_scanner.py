@@ -1,8 +1,31 @@
 import asyncio
+import os
 import sys
 import socket
 import re
-from typing import List, Dict, Optional
+import secrets
+import time
+from typing import List, Dict, Optional, Set
+
+import dns.asyncquery
+import dns.asyncresolver
+import dns.exception
+import dns.flags
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.resolver
+import dns.reversename
+import dns.version
+import ipaddress
+from aiohttp.abc import AbstractResolver
+
+from utils.dns_cache import DNSCache
+from utils.dns_engine import UDPQueryEngine
+from utils.progress import ProgressCallback
+from utils.rate_limiter import TokenBucket
+from utils.resolver_pool import ResolverPool
+from utils.scope import EngagementScope
 
 class DNSScanner:
     def __init__(self):
@@ -23,6 +46,51 @@ class DNSScanner:
             'SOA': 'Start of Authority',
             'PTR': '逆引き'
         }
+        
+        # dnspythonによる名前解決の設定（リゾルバープール）
+        # nameservers: "8.8.8.8"、"127.0.0.1:5353"、"system"（/etc/resolv.conf）など
+        self.nameservers = ['8.8.8.8', '1.1.1.1']
+        self.port = 53
+        self.resolver_strategy = "least_latency"
+        self.resolver_max_concurrency = 50
+        self.query_timeout = 5.0
+        self.query_lifetime = 10.0
+        self.query_attempts = 3
+        self._pool: Optional[ResolverPool] = None
+        self._pool_config = None
+        # 個別クエリのレート制限（1秒あたりのクエリ数、キャッシュヒットは対象外）
+        self.query_rate = 20
+        self.query_limiter = TokenBucket(self.query_rate, burst=10)
+        
+        # 全モジュールで共有するDNSキャッシュ（TTLの下限/上限・否定応答の保持秒数）
+        self.cache_min_ttl = 30
+        self.cache_max_ttl = 3600
+        self.cache_negative_ttl = 60
+        self.cache = DNSCache(
+            min_ttl=self.cache_min_ttl,
+            max_ttl=self.cache_max_ttl,
+            negative_ttl=self.cache_negative_ttl
+        )
+        self.hosts_file = '/etc/hosts'
+        self._hosts: Optional[Dict[str, List[str]]] = None
+        self._system_resolver: Optional[dns.asyncresolver.Resolver] = None
+        
+        # サブドメイン列挙エンジンの設定
+        self.enum_workers = 100
+        self.enum_rate = 500
+        self.enum_retries = 2
+        self.wildcard_probes = 3
+        
+        # 一括逆引きの設定
+        self.sweep_workers = 50
+        self.sweep_rate = 200
+        self.sweep_max_hosts = 4096
+        
+        # 一括正引きの設定
+        self.bulk_workers = 50
+        self.bulk_rate = 200
+        self.bulk_max_queries = 5000
+        self.scope = EngagementScope.from_env()
     
     def _validate_domain(self, domain: str) -> bool:
         """ドメイン名の基本検証"""
@@ -36,49 +104,261 @@ class DNSScanner:
         return bool(re.match(domain_pattern, domain))
     
     def _validate_ip(self, ip: str) -> bool:
-        """IPアドレスの検証"""
+        """IPアドレスの検証（IPv4/IPv6）"""
         try:
-            socket.inet_aton(ip)
+            ipaddress.ip_address(ip.strip())
             return True
-        except socket.error:
+        except ValueError:
             return False
     
+    def _get_pool(self) -> ResolverPool:
+        """リゾルバープールを取得（リゾルバーの構成が変わった場合は作り直す）"""
+        config = (tuple(self.nameservers), self.port, self.resolver_max_concurrency)
+        if self._pool is not None and self._pool_config == config:
+            # 選択方式の変更だけなら統計を保ったまま切り替える
+            self._pool.strategy = ResolverPool.validate_strategy(self.resolver_strategy)
+        else:
+            self._pool = ResolverPool(
+                self.nameservers,
+                port=self.port,
+                strategy=self.resolver_strategy,
+                max_concurrency=self.resolver_max_concurrency
+            )
+            self._pool_config = config
+        return self._pool
+    
+    async def _resolve(self, name: str, record_type: str = "A", limiter: Optional[TokenBucket] = None) -> Dict:
+        """キャッシュを参照し、なければDNSクエリを実行してTTL付きのレコードを返す"""
+        cached = self.cache.get(name, record_type)
+        if cached is not None:
+            return cached
+        result = await self._query(name, record_type, limiter)
+        self.cache.put(name, record_type, result)
+        return result
+    
+    async def _query(self, name: str, record_type: str = "A", limiter: Optional[TokenBucket] = None) -> Dict:
+        """DNSクエリをプロセス内で実行（limiter未指定時は共有のレート制限を使う）"""
+        result = {"name": name, "type": record_type, "status": "NOERROR", "records": [], "error": None}
+        await (limiter or self.query_limiter).acquire()
+        pool = self._get_pool()
+        request = dns.message.make_query(name, record_type)
+        deadline = time.monotonic() + self.query_lifetime
+        tried = []
+        response = None
+        
+        # 失敗（タイムアウト・SERVFAIL・REFUSED）したら別のリゾルバーで再試行
+        for _ in range(min(self.query_attempts, len(pool.upstreams))):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            upstream = pool.select(exclude=tried)
+            tried.append(upstream.key)
+            try:
+                async with upstream.slot():
+                    started = time.monotonic()
+                    response, _ = await dns.asyncquery.udp_with_fallback(
+                        request, upstream.address, timeout=min(self.query_timeout, remaining), port=upstream.port
+                    )
+                    latency = time.monotonic() - started
+            except dns.exception.Timeout:
+                pool.record_failure(upstream)
+                result["status"] = "TIMEOUT"
+                result["error"] = f"Query timed out ({upstream.label})"
+                continue
+            except (OSError, dns.exception.DNSException) as e:
+                pool.record_failure(upstream)
+                result["status"] = "ERROR"
+                result["error"] = f"{upstream.label}: {str(e)}"
+                continue
+            
+            if response.rcode() in (dns.rcode.SERVFAIL, dns.rcode.REFUSED):
+                pool.record_failure(upstream)
+                result["status"] = "SERVFAIL"
+                result["error"] = f"{upstream.label} answered {dns.rcode.to_text(response.rcode())}"
+                response = None
+                continue
+            pool.record_success(upstream, latency)
+            break
+        
+        if response is None:
+            return result
+        
+        result["error"] = None
+        if response.rcode() == dns.rcode.NXDOMAIN:
+            result["status"] = "NXDOMAIN"
+            return result
+        if response.rcode() != dns.rcode.NOERROR:
+            result["status"] = "ERROR"
+            result["error"] = dns.rcode.to_text(response.rcode())
+            return result
+        
+        try:
+            # CNAMEを辿って問い合わせ型のレコードを取り出す
+            chain = response.resolve_chaining()
+        except dns.exception.DNSException as e:
+            result["status"] = "ERROR"
+            result["error"] = str(e)
+            return result
+        if chain.answer is None:
+            result["status"] = "NOANSWER"
+            return result
+        
+        result["status"] = "NOERROR"
+        ttl = min(chain.answer.ttl, chain.minimum_ttl)
+        for rdata in chain.answer:
+            result["records"].append({
+                "name": chain.answer.name.to_text(),
+                "type": record_type,
+                "ttl": ttl,
+                "value": rdata.to_text()
+            })
+        return result
+    
+    def _load_hosts(self) -> Dict[str, List[str]]:
+        """hostsファイルを読み込む（初回のみ）"""
+        if self._hosts is None:
+            hosts: Dict[str, List[str]] = {}
+            try:
+                with open(self.hosts_file, 'r', encoding='utf-8', errors='ignore') as f:
+                    for line in f:
+                        fields = line.split('#', 1)[0].split()
+                        if len(fields) < 2:
+                            continue
+                        for hostname in fields[1:]:
+                            hosts.setdefault(hostname.lower(), []).append(fields[0])
+            except OSError:
+                pass
+            self._hosts = hosts
+        return self._hosts
+    
+    async def resolve_addresses(self, host: str, family: int = socket.AF_UNSPEC) -> List[str]:
+        """ホスト名をIPアドレスのリストに解決（hostsファイル→システムのDNS設定→getaddrinfo→設定済みのネームサーバー）
+
+        接続先の解決なので、内部向けの名前（スプリットホライズンDNSなど）が正しく引けるようシステムリゾルバーを優先し、
+        システムリゾルバーで引けない名前だけ設定済みのネームサーバーに問い合わせる。
+        """
+        host = host.strip().rstrip('.')
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+        
+        def wanted(address: str) -> bool:
+            version = ipaddress.ip_address(address).version
+            return family == socket.AF_UNSPEC or (family == socket.AF_INET) == (version == 4)
+        
+        addresses = [a for a in self._load_hosts().get(host.lower(), []) if wanted(a)]
+        if addresses:
+            return addresses
+        
+        record_types = []
+        if family in (socket.AF_UNSPEC, socket.AF_INET):
+            record_types.append("A")
+        if family in (socket.AF_UNSPEC, socket.AF_INET6):
+            record_types.append("AAAA")
+        for answer in await asyncio.gather(*(self._resolve_system(host, t) for t in record_types)):
+            addresses.extend(r["value"] for r in answer["records"])
+        # システムのDNS設定で引けない名前（mDNSやNSSだけにある名前）は getaddrinfo に任せる
+        if not addresses:
+            addresses = await self._resolve_getaddrinfo(host, family)
+        if addresses or '.' not in host:
+            return addresses
+        
+        # システムリゾルバーで引けない名前は設定済みのネームサーバーに問い合わせる
+        for answer in await asyncio.gather(*(self._resolve(host, t) for t in record_types)):
+            addresses.extend(r["value"] for r in answer["records"] if r["type"] == answer["type"])
+        return addresses
+    
+    async def _resolve_system(self, host: str, record_type: str) -> Dict:
+        """システムのDNS設定（/etc/resolv.conf のネームサーバーと検索ドメイン）で問い合わせ、応答のTTLでキャッシュ"""
+        cache_type = f"SYSTEM-{record_type}"
+        cached = self.cache.get(host, cache_type)
+        if cached is not None:
+            return cached
+        result = {"name": host, "type": record_type, "status": "NOERROR", "records": [], "error": None}
+        try:
+            if self._system_resolver is None:
+                self._system_resolver = dns.asyncresolver.Resolver(configure=True)
+            answer = await self._system_resolver.resolve(host, record_type, search=True, lifetime=self.query_lifetime)
+            for rdata in answer:
+                result["records"].append({
+                    "name": answer.canonical_name.to_text(),
+                    "type": record_type,
+                    "ttl": answer.rrset.ttl,
+                    "value": rdata.to_text()
+                })
+        except dns.resolver.NXDOMAIN:
+            result["status"] = "NXDOMAIN"
+        except dns.resolver.NoAnswer:
+            result["status"] = "NOANSWER"
+        except (OSError, dns.exception.DNSException) as e:
+            # タイムアウト・ネームサーバーなしなどの一時的な失敗はキャッシュしない（DNSCacheが保存しない）
+            result["status"] = "ERROR"
+            result["error"] = str(e)
+        self.cache.put(host, cache_type, result)
+        return result
+    
+    async def _resolve_getaddrinfo(self, host: str, family: int) -> List[str]:
+        """OSのリゾルバー（getaddrinfo）で解決。TTLが分からないので結果はキャッシュせず、名前がないという応答だけ否定キャッシュする"""
+        cache_type = f"GETADDRINFO-{int(family)}"
+        if self.cache.get(host, cache_type) is not None:
+            return []
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, None, family=family, type=socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            # EAI_AGAIN などの一時的な失敗は否定キャッシュしない
+            if e.errno in (socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)):
+                self.cache.put(host, cache_type, {"name": host, "type": cache_type, "status": "NXDOMAIN", "records": [], "error": None})
+            return []
+        addresses: List[str] = []
+        for info in infos:
+            if info[4][0] not in addresses:
+                addresses.append(info[4][0])
+        return addresses
+    
+    async def resolve_host(self, host: str) -> Optional[str]:
+        """nmapやSSHに渡すためにホスト名を1つのIPアドレスへ事前解決（IPv4優先）"""
+        addresses = await self.resolve_addresses(host)
+        if not addresses:
+            return None
+        ipv4 = [a for a in addresses if ipaddress.ip_address(a).version == 4]
+        return (ipv4 or addresses)[0]
+    
+    def aiohttp_resolver(self) -> "CachedResolver":
+        """aiohttpのTCPConnectorに渡す共有キャッシュ付きリゾルバー"""
+        return CachedResolver(self)
+    
     async def get_status(self) -> str:
         """DNS機能の状態確認"""
         try:
-            # dig コマンドの利用可能性チェック
-            process = await asyncio.create_subprocess_exec(
-                'dig', '-v',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode == 0:
-                version_info = stdout.decode() or stderr.decode()
-                return f"Available - {version_info.split()[0] if version_info else 'dig available'}"
-            else:
-                # digがない場合はnslookupを試す
-                return await self._check_nslookup()
-        except Exception as e:
-            return f"Available - DNS resolution via Python (dig unavailable: {str(e)})"
+            pool = self._get_pool()
+        except ValueError as e:
+            return f"Error - invalid resolver configuration: {str(e)}"
+        return (
+            f"Available - dnspython {dns.version.version} (resolver pool: {len(pool.upstreams)} upstreams, "
+            f"{pool.strategy}; cache: {self.cache.stats()})"
+        )
     
-    async def _check_nslookup(self) -> str:
-        """nslookupの利用可能性チェック"""
+    async def resolver_pool_status(self, nameservers: Optional[List[str]] = None, strategy: Optional[str] = None) -> str:
+        """リゾルバープールの設定変更と統計の表示"""
+        previous = (list(self.nameservers), self.resolver_strategy)
+        if nameservers:
+            self.nameservers = [ns.strip() for ns in nameservers if ns.strip()]
+        if strategy:
+            self.resolver_strategy = strategy
         try:
-            process = await asyncio.create_subprocess_exec(
-                'nslookup', 'example.com',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode == 0:
-                return "Available - nslookup working"
-            else:
-                return "Available - Python DNS only"
-        except:
-            return "Available - Python DNS only"
+            pool = self._get_pool()
+        except ValueError as e:
+            self.nameservers, self.resolver_strategy = previous
+            return f"Error: Invalid resolver configuration: {str(e)}"
+        
+        result = [f"=== DNS RESOLVER POOL ==="]
+        result.append(f"Nameservers: {', '.join(self.nameservers)}")
+        result.append(f"Strategy: {pool.strategy} (max {self.resolver_max_concurrency} in-flight queries per resolver)")
+        result.append("")
+        result.extend(f"  {line}" for line in pool.status_lines())
+        return "\n".join(result)
     
     async def dns_lookup(self, domain: str, record_type: str = "A") -> str:
         """DNS レコードを検索"""
@@ -90,168 +370,446 @@ class DNSScanner:
             return f"Error: Unsupported record type. Available: {', '.join(self.record_types.keys())}"
         
         try:
-            # dig コマンドを使用
-            cmd = ['dig', '+short', f'@8.8.8.8', domain, record_type]
-            
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(), 
-                timeout=30
-            )
+            answer = await self._resolve(domain, record_type)
             
             result = [f"=== DNS LOOKUP RESULTS ==="]
             result.append(f"Domain: {domain}")
             result.append(f"Record Type: {record_type} ({self.record_types[record_type]})")
             result.append("")
             
-            if process.returncode == 0:
-                output = stdout.decode().strip()
-                if output:
-                    result.append("Results:")
-                    for line in output.split('\n'):
-                        if line.strip():
-                            result.append(f"  {line.strip()}")
-                else:
-                    result.append("No records found")
+            if answer["records"]:
+                result.append("Results:")
+                for record in answer["records"]:
+                    result.append(f"  {record['value']} (TTL {record['ttl']})")
+            elif answer["status"] in ("NOERROR", "NOANSWER", "NXDOMAIN"):
+                result.append(f"No records found ({answer['status']})")
             else:
-                error = stderr.decode().strip()
-                result.append(f"DNS query failed: {error}")
+                result.append(f"DNS query failed: {answer['status']} {answer['error'] or ''}".rstrip())
             
             return "\n".join(result)
             
-        except asyncio.TimeoutError:
-            return f"DNS lookup timed out for {domain}"
         except Exception as e:
-            # Fallback to Python DNS
-            return await self._python_dns_lookup(domain, record_type)
+            return f"Error during DNS lookup: {str(e)}"
     
-    async def _python_dns_lookup(self, domain: str, record_type: str) -> str:
-        """Python標準ライブラリでのDNS検索（フォールバック）"""
+    async def bulk_lookup(self, names: List[str], record_types: Optional[List[str]] = None,
+                          workers: Optional[int] = None, rate: Optional[float] = None,
+                          progress: Optional[ProgressCallback] = None) -> str:
+        """複数ドメイン名・レコードタイプの一括DNS検索（同じIPに解決される名前をまとめて表示）
+        
+        Args:
+            names: 対象のドメイン名一覧
+            record_types: レコードタイプの一覧（デフォルト: A）
+            workers: 同時に問い合わせるワーカー数
+            rate: 1秒あたりの最大クエリ数（0以下で無制限、キャッシュヒットは対象外）
+            progress: 進捗コールバック（1件問い合わせるごとに呼ぶ）
+        """
+        record_types = [t.upper() for t in (record_types or ["A"])]
+        unsupported = [t for t in record_types if t not in self.record_types or t == 'PTR']
+        if unsupported:
+            return f"Error: Unsupported record type: {', '.join(unsupported)}"
+        
+        # 同一の (名前, タイプ) は1回だけ問い合わせる
+        queries = []
+        seen: Set[tuple] = set()
+        invalid = []
+        for name in names:
+            name = name.strip().lower().rstrip('.')
+            if not name:
+                continue
+            if not self._validate_domain(name):
+                if name not in invalid:
+                    invalid.append(name)
+                continue
+            for record_type in dict.fromkeys(record_types):
+                if (name, record_type) not in seen:
+                    seen.add((name, record_type))
+                    queries.append((name, record_type))
+        if not queries:
+            return "Error: No valid domain names specified"
+        if len(queries) > self.bulk_max_queries:
+            return f"Error: Too many queries ({len(queries)}, limit: {self.bulk_max_queries})"
+        
+        limiter = TokenBucket(self.bulk_rate if rate is None else rate)
+        workers = max(1, workers or self.bulk_workers)
+        start_time = time.monotonic()
+        answers: Dict[tuple, Dict] = {}
+        
+        queue: asyncio.Queue = asyncio.Queue()
+        for query in queries:
+            queue.put_nowait(query)
+        
+        async def worker():
+            while True:
+                try:
+                    name, record_type = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                answers[(name, record_type)] = await self._resolve(name, record_type, limiter)
+                if progress:
+                    await progress(len(answers), len(queries), f"Bulk lookup: {len(answers)}/{len(queries)} queries answered")
+        
         try:
-            if record_type == "A":
-                ip = socket.gethostbyname(domain)
-                return f"DNS Lookup (Python fallback):\nDomain: {domain}\nA Record: {ip}"
-            else:
-                return f"Python DNS fallback only supports A records. Use dig for {record_type} records."
-        except socket.gaierror as e:
-            return f"DNS resolution failed: {str(e)}"
+            await asyncio.gather(*(worker() for _ in range(min(workers, len(queries)))))
+            
+            by_address: Dict[str, List[str]] = {}
+            other_records = []
+            unresolved: Dict[str, List[str]] = {}
+            cache_hits = 0
+            for name, record_type in queries:
+                answer = answers[(name, record_type)]
+                cache_hits += bool(answer.get("cached"))
+                if not answer["records"]:
+                    unresolved.setdefault(name, []).append(f"{record_type} {answer['status']}")
+                    continue
+                for record in answer["records"]:
+                    if record_type in ('A', 'AAAA'):
+                        hosts = by_address.setdefault(record["value"], [])
+                        if name not in hosts:
+                            hosts.append(name)
+                    else:
+                        other_records.append(f"  {name} {record_type} {record['value']} (TTL {record['ttl']})")
+            
+            result = [f"=== BULK DNS LOOKUP ==="]
+            result.append(f"Names: {len({name for name, _ in queries})} (unique queries: {len(queries)}, cache hits: {cache_hits})")
+            result.append(f"Record Types: {', '.join(dict.fromkeys(record_types))}")
+            result.append("")
+            
+            if by_address:
+                result.append("Addresses:")
+                for address in sorted(by_address, key=lambda a: (ipaddress.ip_address(a).version, ipaddress.ip_address(a))):
+                    result.append(f"  {address} <- {', '.join(by_address[address])}")
+                result.append("")
+            if other_records:
+                result.append("Other Records:")
+                result.extend(other_records)
+                result.append("")
+            if unresolved:
+                result.append("No Records:")
+                result.extend(f"  {name}: {', '.join(statuses)}" for name, statuses in unresolved.items())
+                result.append("")
+            if invalid:
+                result.append(f"Skipped invalid names: {', '.join(invalid)}")
+                result.append("")
+            
+            resolved = len(queries) - sum(len(statuses) for statuses in unresolved.values())
+            result.append(
+                f"Summary: {resolved} of {len(queries)} queries answered, {len(by_address)} unique addresses "
+                f"(elapsed: {round(time.monotonic() - start_time, 2)}s)"
+            )
+            return "\n".join(result)
+            
+        except Exception as e:
+            return f"Error during bulk DNS lookup: {str(e)}"
+    
+    def _load_wordlist(self, wordlist: str) -> Optional[List[str]]:
+        """wordlist名またはファイルパスからラベル一覧を読み込む"""
+        if wordlist == "common":
+            return list(self.common_subdomains)
+        if not os.path.isfile(wordlist):
+            return None
+        
+        labels = []
+        seen = set()
+        with open(wordlist, "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                label = line.strip().lower().strip('.')
+                if not label or label.startswith('#') or label in seen:
+                    continue
+                # 空のラベル（a..b）や63文字を超えるラベルはDNS名にできないので読み飛ばす
+                if any(not 1 <= len(part) <= 63 for part in label.split('.')):
+                    continue
+                seen.add(label)
+                labels.append(label)
+        return labels
+    
+    async def _resolve_with_retry(self, name: str, record_type: str = "A") -> Dict:
+        """SERVFAIL・タイムアウト時に間隔を空けて再試行するDNSクエリ"""
+        answer = await self._resolve(name, record_type)
+        for attempt in range(self.enum_retries):
+            if answer["status"] not in ("SERVFAIL", "TIMEOUT"):
+                break
+            await asyncio.sleep(0.2 * (2 ** attempt))
+            answer = await self._resolve(name, record_type)
+        return answer
     
-    async def subdomain_enum(self, domain: str, wordlist: str = "common") -> str:
+    async def _detect_wildcard(self, domain: str) -> Set[str]:
+        """ランダムなラベルを解決し、ワイルドカードDNSの応答IPを収集"""
+        probes = [f"{secrets.token_hex(8)}.{domain}" for _ in range(self.wildcard_probes)]
+        answers = await asyncio.gather(*(self._resolve_with_retry(name, "A") for name in probes))
+        wildcard_ips = set()
+        for answer in answers:
+            wildcard_ips.update(record["value"] for record in answer["records"])
+        return wildcard_ips
+    
+    async def enumerate_subdomains(self, domain: str, labels: List[str], on_found=None,
+                                   workers: Optional[int] = None, rate: Optional[float] = None,
+                                   on_progress=None) -> Dict:
+        """ワーカープールとレート制限付きでサブドメインを非同期に列挙
+        
+        Args:
+            domain: 対象ドメイン名
+            labels: 試行するサブドメインのラベル一覧
+            on_found: 発見ごとに呼ばれるコールバック（fqdn, ips）
+            workers: 同時に問い合わせるワーカー数
+            rate: 1秒あたりの最大クエリ数（0以下で無制限）
+            on_progress: 1件問い合わせるごとに呼ばれるコルーチン関数（問い合わせ済み件数, 全体件数）
+        """
+        workers = max(1, workers or self.enum_workers)
+        limiter = TokenBucket(self.enum_rate if rate is None else rate)
+        start_time = time.monotonic()
+        
+        stats = {"found": [], "wildcard_ips": set(), "wildcard_filtered": 0, "errors": 0, "queried": 0}
+        stats["wildcard_ips"] = await self._detect_wildcard(domain)
+        
+        queue: asyncio.Queue = asyncio.Queue()
+        for label in labels:
+            queue.put_nowait(label)
+        
+        # 1つのUDPソケットでクエリを多重化するエンジンをプール内のリゾルバーごとに用意
+        pool = self._get_pool()
+        engines = {upstream.key: UDPQueryEngine(upstream.address, upstream.port, self.query_timeout) for upstream in pool.upstreams}
+        for engine in engines.values():
+            await engine.start()
+        
+        async def query_a(fqdn: str, attempt: int) -> Dict:
+            """エンジン経由でAレコードを問い合わせ（応答が切り詰められた場合は通常のリゾルバーで再問い合わせ）"""
+            upstream = pool.select()
+            try:
+                async with upstream.slot():
+                    started = time.monotonic()
+                    response = await engines[upstream.key].query(fqdn, "A")
+                    latency = time.monotonic() - started
+            except (asyncio.TimeoutError, OSError, dns.exception.DNSException):
+                pool.record_failure(upstream)
+                return {"status": "TIMEOUT", "ips": []}
+            except ValueError:
+                # 問い合わせ名として組み立てられない名前（IDNAで変換できないラベルなど）はエラーとして数える
+                return {"status": "INVALID", "ips": []}
+            if response["rcode"] in ("SERVFAIL", "REFUSED"):
+                pool.record_failure(upstream)
+                return {"status": "SERVFAIL", "ips": []}
+            pool.record_success(upstream, latency)
+            if response["truncated"]:
+                answer = await self._resolve(fqdn, "A")
+                return {"status": answer["status"], "ips": [r["value"] for r in answer["records"]]}
+            return {"status": response["rcode"], "ips": [r["value"] for r in response["records"]]}
+        
+        async def worker():
+            while True:
+                try:
+                    label = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                fqdn = f"{label}.{domain}"
+                answer = None
+                for attempt in range(self.enum_retries + 1):
+                    if attempt:
+                        await asyncio.sleep(0.2 * (2 ** (attempt - 1)))
+                    await limiter.acquire()
+                    answer = await query_a(fqdn, attempt)
+                    if answer["status"] not in ("SERVFAIL", "TIMEOUT"):
+                        break
+                stats["queried"] += 1
+                if on_progress is not None:
+                    await on_progress(stats["queried"], len(labels))
+                if answer["status"] not in ("NOERROR", "NXDOMAIN"):
+                    stats["errors"] += 1
+                    continue
+                ips = answer["ips"]
+                if not ips:
+                    continue
+                # ワイルドカードと同じ応答しか返さない名前は除外
+                if stats["wildcard_ips"] and set(ips) <= stats["wildcard_ips"]:
+                    stats["wildcard_filtered"] += 1
+                    continue
+                stats["found"].append((fqdn, ips))
+                if on_found is not None:
+                    callback_result = on_found(fqdn, ips)
+                    if asyncio.iscoroutine(callback_result):
+                        await callback_result
+        
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(workers, max(1, len(labels))))))
+        finally:
+            for engine in engines.values():
+                engine.close()
+        stats["elapsed"] = round(time.monotonic() - start_time, 2)
+        return stats
+    
+    async def subdomain_enum(self, domain: str, wordlist: str = "common",
+                             workers: Optional[int] = None, rate: Optional[float] = None,
+                             progress: Optional[ProgressCallback] = None) -> str:
         """サブドメイン列挙"""
         if not self._validate_domain(domain):
             return "Error: Invalid domain format"
         
-        if wordlist == "common":
-            subdomains_to_check = self.common_subdomains
-        else:
-            # 将来的に外部wordlistファイルに対応予定
-            subdomains_to_check = self.common_subdomains
+        subdomains_to_check = self._load_wordlist(wordlist)
+        if subdomains_to_check is None:
+            return f"Error: Wordlist not found: {wordlist} (use \"common\" or a path to a wordlist file)"
         
         result = [f"=== SUBDOMAIN ENUMERATION ==="]
         result.append(f"Target Domain: {domain}")
         result.append(f"Wordlist: {wordlist} ({len(subdomains_to_check)} entries)")
         result.append("")
         
-        found_subdomains = []
+        async def report_found(fqdn: str, ips: List[str]):
+            # 見つかった時点で逐次ログに出力
+            print(f"[+] Subdomain found: {fqdn} -> {', '.join(ips)}", file=sys.stderr)
+            if progress:
+                await progress(0, None, "Subdomain enumeration", f"Subdomain found: {fqdn} -> {', '.join(ips)}")
+        
+        async def report_progress(queried: int, total: int):
+            await progress(queried, total, f"Subdomain enumeration: {queried}/{total} names resolved")
         
         try:
-            # 並行してサブドメインをチェック
-            tasks = []
-            for subdomain in subdomains_to_check:
-                full_domain = f"{subdomain}.{domain}"
-                tasks.append(self._check_subdomain(full_domain))
+            stats = await self.enumerate_subdomains(domain, subdomains_to_check, report_found, workers, rate,
+                                                    report_progress if progress else None)
             
-            # 最大10個ずつ並行実行（レート制限対策）
-            chunk_size = 10
-            for i in range(0, len(tasks), chunk_size):
-                chunk = tasks[i:i + chunk_size]
-                chunk_results = await asyncio.gather(*chunk, return_exceptions=True)
-                
-                for j, subdomain_result in enumerate(chunk_results):
-                    if isinstance(subdomain_result, Exception):
-                        continue
-                    if subdomain_result:
-                        found_subdomains.append(subdomain_result)
-                
-                # レート制限のため少し待機
-                await asyncio.sleep(0.1)
+            if stats["wildcard_ips"]:
+                result.append(f"Wildcard DNS detected: {', '.join(sorted(stats['wildcard_ips']))} (matching answers filtered)")
+                result.append("")
             
-            if found_subdomains:
+            if stats["found"]:
                 result.append("Found Subdomains:")
-                for subdomain_info in found_subdomains:
-                    result.append(f"  {subdomain_info}")
+                for fqdn, ips in stats["found"]:
+                    result.append(f"  {fqdn} -> {', '.join(ips)}")
             else:
-                result.append("No subdomains found from the common wordlist")
+                result.append("No subdomains found from the wordlist")
             
             result.append("")
-            result.append(f"Summary: {len(found_subdomains)} subdomains discovered")
+            result.append(f"Summary: {len(stats['found'])} subdomains discovered")
+            result.append(
+                f"Queried: {stats['queried']} names in {stats['elapsed']}s "
+                f"(errors: {stats['errors']}, wildcard-filtered: {stats['wildcard_filtered']})"
+            )
             
             return "\n".join(result)
             
         except Exception as e:
             return f"Error during subdomain enumeration: {str(e)}"
     
-    async def _check_subdomain(self, full_domain: str) -> Optional[str]:
-        """個別サブドメインの存在確認"""
-        try:
-            ip = socket.gethostbyname(full_domain)
-            return f"{full_domain} -> {ip}"
-        except socket.gaierror:
-            return None
-    
     async def reverse_dns(self, ip: str) -> str:
         """逆引きDNS"""
         if not self._validate_ip(ip):
             return "Error: Invalid IP address format"
+        ip = ip.strip()
         
         try:
-            # dig を使用した逆引き
-            cmd = ['dig', '+short', '-x', ip]
-            
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(), 
-                timeout=30
-            )
+            answer = await self._resolve(dns.reversename.from_address(ip).to_text(), "PTR")
             
             result = [f"=== REVERSE DNS LOOKUP ==="]
             result.append(f"IP Address: {ip}")
             result.append("")
             
-            if process.returncode == 0:
-                output = stdout.decode().strip()
-                if output:
-                    result.append("Hostname(s):")
-                    for line in output.split('\n'):
-                        if line.strip():
-                            result.append(f"  {line.strip()}")
-                else:
-                    result.append("No PTR record found")
+            if answer["records"]:
+                result.append("Hostname(s):")
+                for record in answer["records"]:
+                    result.append(f"  {record['value']} (TTL {record['ttl']})")
+            elif answer["status"] in ("NOERROR", "NOANSWER", "NXDOMAIN"):
+                result.append("No PTR record found")
             else:
-                # Python fallback
-                try:
-                    hostname = socket.gethostbyaddr(ip)[0]
-                    result.append(f"Hostname (Python fallback): {hostname}")
-                except socket.herror:
-                    result.append("No PTR record found")
+                result.append(f"Reverse DNS query failed: {answer['status']} {answer['error'] or ''}".rstrip())
             
             return "\n".join(result)
             
-        except asyncio.TimeoutError:
-            return f"Reverse DNS lookup timed out for {ip}"
         except Exception as e:
             return f"Error during reverse DNS lookup: {str(e)}"
     
+    def _expand_sweep_targets(self, targets: str) -> List[str]:
+        """CIDR・IPアドレスの一覧を展開し、スコープと件数上限を検証（不正な場合は ValueError）"""
+        addresses: List[str] = []
+        seen: Set[str] = set()
+        for entry in targets.replace(',', ' ').split():
+            try:
+                network = ipaddress.ip_network(entry, strict=False)
+            except ValueError:
+                raise ValueError(f"Invalid IP address or CIDR: {entry}")
+            if not self.scope.contains_network(network):
+                raise ValueError(f"{network} is outside the engagement scope ({self.scope.describe()})")
+            if len(addresses) + network.num_addresses > self.sweep_max_hosts + 2:
+                raise ValueError(f"Too many addresses (limit: {self.sweep_max_hosts})")
+            hosts = [network.network_address] if network.num_addresses == 1 else network.hosts()
+            for address in hosts:
+                text = str(address)
+                if text not in seen:
+                    seen.add(text)
+                    addresses.append(text)
+        if len(addresses) > self.sweep_max_hosts:
+            raise ValueError(f"Too many addresses (limit: {self.sweep_max_hosts})")
+        return addresses
+    
+    async def reverse_sweep(self, targets: str, workers: Optional[int] = None, rate: Optional[float] = None,
+                            progress: Optional[ProgressCallback] = None) -> str:
+        """CIDR・IPアドレス一覧に対する一括逆引きDNS
+        
+        Args:
+            targets: CIDRまたはIPアドレス（カンマ/空白区切り、IPv4/IPv6）
+            workers: 同時に問い合わせるワーカー数
+            rate: 1秒あたりの最大クエリ数（0以下で無制限）
+            progress: 進捗コールバック（1アドレス終わるごとに呼ぶ）
+        """
+        try:
+            addresses = self._expand_sweep_targets(targets)
+        except ValueError as e:
+            return f"Error: {str(e)}"
+        if not addresses:
+            return "Error: No target addresses specified"
+        
+        limiter = TokenBucket(self.sweep_rate if rate is None else rate)
+        workers = max(1, workers or self.sweep_workers)
+        start_time = time.monotonic()
+        
+        queue: asyncio.Queue = asyncio.Queue()
+        for address in addresses:
+            queue.put_nowait(address)
+        names: Dict[str, List[str]] = {}
+        errors = 0
+        done = 0
+        
+        async def worker():
+            nonlocal errors, done
+            while True:
+                try:
+                    address = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                answer = await self._resolve(dns.reversename.from_address(address).to_text(), "PTR", limiter)
+                finding = None
+                if answer["records"]:
+                    names[address] = [record["value"].rstrip('.') for record in answer["records"]]
+                    finding = f"{address} -> {', '.join(names[address])}"
+                elif answer["status"] not in ("NOERROR", "NOANSWER", "NXDOMAIN"):
+                    errors += 1
+                done += 1
+                if progress:
+                    await progress(done, len(addresses), f"Reverse sweep: {done}/{len(addresses)} addresses", finding)
+        
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(workers, len(addresses)))))
+            
+            result = [f"=== BULK REVERSE DNS SWEEP ==="]
+            result.append(f"Targets: {targets.strip()} ({len(addresses)} addresses)")
+            result.append(f"Scope: {self.scope.describe()}")
+            result.append("")
+            
+            if names:
+                width = max(len('IP Address'), *(len(address) for address in names)) + 2
+                result.append(f"{'IP Address':<{width}}Hostname")
+                for address in sorted(names, key=lambda a: (ipaddress.ip_address(a).version, ipaddress.ip_address(a))):
+                    result.append(f"{address:<{width}}{', '.join(names[address])}")
+            else:
+                result.append("No PTR records found")
+            
+            result.append("")
+            result.append(
+                f"Summary: {len(names)} of {len(addresses)} addresses have PTR records "
+                f"(errors: {errors}, elapsed: {round(time.monotonic() - start_time, 2)}s)"
+            )
+            return "\n".join(result)
+            
+        except Exception as e:
+            return f"Error during reverse DNS sweep: {str(e)}"
+    
     async def dns_comprehensive(self, domain: str) -> str:
         """包括的DNS調査"""
         if not self._validate_domain(domain):
@@ -261,25 +819,52 @@ class DNSScanner:
         result.append(f"Target: {domain}")
         result.append("=" * 50)
         
-        # 主要レコードタイプを順番に調査
+        # 主要レコードタイプとサブドメイン列挙を並行して実行（レートは共有トークンバケットで制御）
         main_records = ['A', 'AAAA', 'MX', 'NS', 'TXT']
         
-        for record_type in main_records:
+        *record_results, subdomain_result = await asyncio.gather(
+            *(self.dns_lookup(domain, record_type) for record_type in main_records),
+            self.subdomain_enum(domain)
+        )
+        
+        for record_type, record_result in zip(main_records, record_results):
             result.append(f"\n--- {record_type} Records ---")
-            record_result = await self.dns_lookup(domain, record_type)
             # ヘッダー部分を除いて結果のみ追加
             lines = record_result.split('\n')
             if len(lines) > 4:  # ヘッダーをスキップ
                 result.extend(lines[4:])
-            
-            await asyncio.sleep(0.5)  # レート制限対策
         
         # サブドメイン列挙
         result.append(f"\n--- Subdomain Enumeration ---")
-        subdomain_result = await self.subdomain_enum(domain)
         # 結果のみ追加
         lines = subdomain_result.split('\n')
         if len(lines) > 4:
             result.extend(lines[4:])
         
-        return "\n".join(result)
\ No newline at end of file
+        return "\n".join(result)
+
+
+class CachedResolver(AbstractResolver):
+    """DNSScannerの共有キャッシュを使うaiohttp用リゾルバー"""
+
+    def __init__(self, scanner: DNSScanner):
+        self.scanner = scanner
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> List[Dict]:
+        addresses = await self.scanner.resolve_addresses(host, family)
+        if not addresses:
+            raise OSError(f"DNS lookup failed for {host}")
+        return [
+            {
+                "hostname": host,
+                "host": address,
+                "port": port,
+                "family": socket.AF_INET6 if ':' in address else socket.AF_INET,
+                "proto": 0,
+                "flags": socket.AI_NUMERICHOST
+            }
+            for address in addresses
+        ]
+
+    async def close(self) -> None:
+        pass
@@ -1,14 +1,17 @@
 import asyncio
 import sys
 import re
-from typing import List, Optional
+import ipaddress
+from typing import Awaitable, Callable, List, Optional
 from lxml import etree
 
 class NmapScanner:
-    def __init__(self):
+    def __init__(self, host_resolver: Optional[Callable[[str], Awaitable[Optional[str]]]] = None):
         self.default_options = [
             "-T4"
         ]
+        # ホスト名を事前解決する関数（DNSScannerの共有キャッシュを使う）
+        self.host_resolver = host_resolver
     
     def _validate_target(self, target: str) -> bool:
         """基本的なターゲット検証"""
@@ -24,6 +27,27 @@ class NmapScanner:
         
         return True
     
+    async def _resolve_target(self, target: str) -> str:
+        """単一ホスト名のターゲットを共有DNSキャッシュでIPアドレスに事前解決"""
+        target = target.strip()
+        if self.host_resolver is None or not re.match(r'^[A-Za-z0-9_.-]*[A-Za-z][A-Za-z0-9_.-]*$', target):
+            return target
+        try:
+            ipaddress.ip_address(target)
+            return target
+        except ValueError:
+            pass
+        
+        address = await self.host_resolver(target)
+        if not address:
+            return target
+        print(f"Resolved {target} -> {address}", file=sys.stderr)
+        return address
+    
+    def _resolved_name(self, target: str, scan_target: str) -> Optional[str]:
+        """事前解決した場合は元のホスト名（nmapにはIPアドレスを渡すため結果に名前が出ない）"""
+        return target.strip() if scan_target != target.strip() else None
+    
     async def get_status(self) -> str:
         """nmapの状態を確認"""
         try:
@@ -62,7 +86,8 @@ class NmapScanner:
                         safe_options.append(opt)
                 cmd.extend(safe_options)
             
-            cmd.append(target)
+            scan_target = await self._resolve_target(target)
+            cmd.append(scan_target)
             
             print(f"Executing: {' '.join(cmd)}", file=sys.stderr)
             
@@ -78,7 +103,7 @@ class NmapScanner:
             )
             
             if process.returncode == 0:
-                return self._parse_xml_output(stdout.decode())
+                return self._parse_xml_output(stdout.decode(), hostname=self._resolved_name(target, scan_target))
             else:
                 return f"Scan failed: {stderr.decode()}"
                 
@@ -114,7 +139,8 @@ class NmapScanner:
                 f"-p{ports}"                 # 指定されたポートのみをスキャン
             ]
             
-            cmd.append(target)
+            scan_target = await self._resolve_target(target)
+            cmd.append(scan_target)
             
             print(f"Executing detailed scan on ports {ports}: {' '.join(cmd)}", file=sys.stderr)
             
@@ -130,7 +156,8 @@ class NmapScanner:
             )
             
             if process.returncode == 0:
-                return self._parse_xml_output(stdout.decode(), detailed=True)
+                return self._parse_xml_output(stdout.decode(), detailed=True,
+                                              hostname=self._resolved_name(target, scan_target))
             else:
                 return f"Detailed scan failed: {stderr.decode()}"
                 
@@ -149,10 +176,11 @@ class NmapScanner:
             return "Error: Invalid port specification. Use format like '80,443' or '1-1000'"
         
         try:
+            scan_target = await self._resolve_target(target)
             cmd = [
                 "sudo", "nmap", "-oX", "-",
                 f"-p{ports}",
-                "-T4", target
+                "-T4", scan_target
             ]
             
             print(f"Executing port scan: {' '.join(cmd)}", file=sys.stderr)
@@ -169,7 +197,7 @@ class NmapScanner:
             )
             
             if process.returncode == 0:
-                return self._parse_xml_output(stdout.decode())
+                return self._parse_xml_output(stdout.decode(), hostname=self._resolved_name(target, scan_target))
             else:
                 return f"Port scan failed: {stderr.decode()}"
                 
@@ -178,7 +206,7 @@ class NmapScanner:
         except Exception as e:
             return f"Error during port scan: {str(e)}"
     
-    def _parse_xml_output(self, xml_data: str, detailed: bool = False) -> str:
+    def _parse_xml_output(self, xml_data: str, detailed: bool = False, hostname: Optional[str] = None) -> str:
         """XML出力を解析してフォーマット"""
         try:
             root = etree.fromstring(xml_data.encode())
@@ -214,10 +242,12 @@ class NmapScanner:
                 
                 # ホスト名
                 hostnames = host.findall(".//hostname")
-                if hostnames:
-                    for hostname in hostnames:
-                        name = hostname.get("name", "")
-                        scan_info.append(f"Hostname: {name}")
+                names = [entry.get("name", "") for entry in hostnames]
+                if hostname and hostname not in names:
+                    # 事前解決したターゲット名（nmapにホスト名を渡した場合の user 指定の名前に相当）
+                    names.insert(0, hostname)
+                for name in names:
+                    scan_info.append(f"Hostname: {name}")
                 
                 # ポート情報
                 ports = host.findall(".//port")
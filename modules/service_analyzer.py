@@ -1,136 +1,39 @@
 import asyncio
 import re
 import sys
+import time
+from array import array
 from typing import Dict, List, Optional, Tuple
 
+from utils.service_kb import ServiceKnowledgeBase
+from utils.vuln_index import SEVERITY_ORDER, VulnerabilityIndex
+
+# 集計に使うセキュリティレベルの並び（配列上のコード値）
+RISK_LEVELS = ("high_risk", "medium_risk", "low_risk", "secure", "unknown")
+
 class ServiceAnalyzer:
     def __init__(self):
-        # ポート番号とサービスの対応表
-        self.port_services = {
-            21: {"name": "FTP", "description": "File Transfer Protocol"},
-            22: {"name": "SSH", "description": "Secure Shell"},
-            23: {"name": "Telnet", "description": "Telnet Protocol"},
-            25: {"name": "SMTP", "description": "Simple Mail Transfer Protocol"},
-            53: {"name": "DNS", "description": "Domain Name System"},
-            80: {"name": "HTTP", "description": "Hypertext Transfer Protocol"},
-            110: {"name": "POP3", "description": "Post Office Protocol v3"},
-            143: {"name": "IMAP", "description": "Internet Message Access Protocol"},
-            443: {"name": "HTTPS", "description": "HTTP over SSL/TLS"},
-            993: {"name": "IMAPS", "description": "IMAP over SSL"},
-            995: {"name": "POP3S", "description": "POP3 over SSL"},
-            1433: {"name": "MSSQL", "description": "Microsoft SQL Server"},
-            3306: {"name": "MySQL", "description": "MySQL Database"},
-            3389: {"name": "RDP", "description": "Remote Desktop Protocol"},
-            5432: {"name": "PostgreSQL", "description": "PostgreSQL Database"},
-            5900: {"name": "VNC", "description": "Virtual Network Computing"},
-            6379: {"name": "Redis", "description": "Redis Database"},
-            8080: {"name": "HTTP-Alt", "description": "Alternative HTTP"},
-            8443: {"name": "HTTPS-Alt", "description": "Alternative HTTPS"},
-            27017: {"name": "MongoDB", "description": "MongoDB Database"}
-        }
+        # サービス表とセキュリティチェック項目（data/services から初回参照時に読み込む）
+        self.knowledge_base = ServiceKnowledgeBase()
+        # オフラインの脆弱性フィード（data/vulnerabilities.json）の区間索引
+        self.vulnerability_index = VulnerabilityIndex()
         
-        # サービス別の脆弱性とセキュリティチェック項目
-        self.security_checks = {
-            "SSH": {
-                "common_issues": [
-                    "デフォルトポート22の使用",
-                    "パスワード認証の有効化",
-                    "rootログインの許可",
-                    "古いSSHバージョンの使用"
-                ],
-                "recommendations": [
-                    "ポート番号の変更",
-                    "公開鍵認証の使用",
-                    "rootログインの無効化",
-                    "fail2banの導入",
-                    "SSH鍵の定期的な更新"
-                ],
-                "tools": ["ssh-audit", "nmap --script ssh-*"]
-            },
-            "HTTP": {
-                "common_issues": [
-                    "HTTPS未使用",
-                    "セキュリティヘッダーの不備",
-                    "古いWebサーバーバージョン",
-                    "ディレクトリリスティングの有効化"
-                ],
-                "recommendations": [
-                    "HTTPS への移行",
-                    "セキュリティヘッダーの設定",
-                    "Webサーバーの更新",
-                    "適切なアクセス制御の実装"
-                ],
-                "tools": ["nikto", "dirb", "gobuster", "testssl.sh"]
-            },
-            "HTTPS": {
-                "common_issues": [
-                    "弱い暗号化スイートの使用",
-                    "期限切れ証明書",
-                    "自己署名証明書",
-                    "混合コンテンツの存在"
-                ],
-                "recommendations": [
-                    "強い暗号化スイートの使用",
-                    "証明書の定期的な更新",
-                    "HSTS の有効化",
-                    "証明書透明性の監視"
-                ],
-                "tools": ["testssl.sh", "sslscan", "sslyze"]
-            },
-            "FTP": {
-                "common_issues": [
-                    "匿名ログインの許可",
-                    "平文での通信",
-                    "古いFTPサーバーの使用",
-                    "適切なアクセス制御の不備"
-                ],
-                "recommendations": [
-                    "SFTP または FTPS の使用",
-                    "匿名アクセスの無効化",
-                    "強力な認証の実装",
-                    "ログ監視の実装"
-                ],
-                "tools": ["nmap --script ftp-*", "hydra"]
-            },
-            "MySQL": {
-                "common_issues": [
-                    "デフォルトのroot空パスワード",
-                    "外部からのアクセス許可",
-                    "古いMySQLバージョン",
-                    "適切な権限設定の不備"
-                ],
-                "recommendations": [
-                    "強力なパスワードの設定",
-                    "外部アクセスの制限",
-                    "定期的なアップデート",
-                    "最小権限の原則の適用"
-                ],
-                "tools": ["nmap --script mysql-*", "sqlmap"]
-            },
-            "RDP": {
-                "common_issues": [
-                    "デフォルトポート3389の使用",
-                    "弱いパスワード",
-                    "BlueKeep脆弱性",
-                    "ネットワークレベル認証の無効化"
-                ],
-                "recommendations": [
-                    "ポート番号の変更",
-                    "強力なパスワードの使用",
-                    "VPN経由でのアクセス",
-                    "定期的なセキュリティ更新"
-                ],
-                "tools": ["nmap --script rdp-*", "rdesktop"]
-            }
-        }
+        # (ポート, プロトコル, サービス名, バージョン) ごとの評価結果のメモ
+        self._score_cache: Dict[Tuple[int, str, str, str], Dict] = {}
+        self.score_cache_size = 50000
         
-
+        # リスク判定に使うポート分類
+        self.high_risk_ports = frozenset([21, 23, 25, 110, 143, 1433, 3306, 3389])
+        self.unencrypted_ports = frozenset([21, 23, 25, 80, 110, 143])
     
     async def get_status(self) -> str:
         """Service Analyzerの状態確認"""
-        return f"Available - {len(self.port_services)} services, {len(self.security_checks)} security profiles"
+        return (
+            f"Available - {len(self.knowledge_base)} services, {self.knowledge_base.profile_count} security profiles, "
+            f"{len(self.vulnerability_index)} vulnerability entries"
+        )
     
-    def analyze_port(self, port: int, service_name: str = "", version: str = "") -> Dict:
+    def analyze_port(self, port: int, service_name: str = "", version: str = "", protocol: str = "tcp") -> Dict:
         """単一ポートの詳細分析"""
         analysis = {
             "port": port,
@@ -140,47 +43,73 @@ class ServiceAnalyzer:
             "security_level": "unknown",
             "issues": [],
             "recommendations": [],
-            "tools": []
+            "tools": [],
+            "vulnerabilities": []
         }
         
         # 既知のサービスかチェック
-        if port in self.port_services:
-            analysis["known_service"] = self.port_services[port]
-            service_type = self.port_services[port]["name"]
-            
-            # セキュリティチェック項目の追加
-            if service_type in self.security_checks:
-                check_info = self.security_checks[service_type]
-                analysis["issues"] = check_info["common_issues"]
-                analysis["recommendations"] = check_info["recommendations"]
-                analysis["tools"] = check_info["tools"]
-                
-                # セキュリティレベルの評価
-                analysis["security_level"] = self._evaluate_security_level(port, service_name, version)
+        entry = self.knowledge_base.lookup_port(port, protocol)
+        score = self._score_service(port, protocol, service_name, version)
+        profile = score["profile"]
+        if entry is not None:
+            analysis["known_service"] = {"name": entry["name"], "description": entry["description"]}
+        elif profile is not None:
+            analysis["known_service"] = {"name": profile["name"], "description": profile["name"]}
         
-
+        # セキュリティチェック項目の追加
+        if profile is not None:
+            analysis["issues"] = profile["common_issues"]
+            analysis["recommendations"] = profile["recommendations"]
+            analysis["tools"] = profile["tools"]
+        
+        # 製品・バージョンに該当する既知の脆弱性とセキュリティレベル
+        analysis["vulnerabilities"] = score["vulnerabilities"]
+        analysis["security_level"] = score["level"]
         
         return analysis
     
-    def _evaluate_security_level(self, port: int, service_name: str, version: str) -> str:
-        """セキュリティレベルの評価"""
-        risk_factors = 0
-        
-        # 高リスクポート
-        high_risk_ports = [21, 23, 25, 110, 143, 1433, 3306, 3389]
-        if port in high_risk_ports:
-            risk_factors += 1
-        
-        # 暗号化されていないプロトコル
-        unencrypted_ports = [21, 23, 25, 80, 110, 143]
-        if port in unencrypted_ports:
-            risk_factors += 1
-        
-        # バージョン情報から古いソフトウェアを検出
-        if version:
-            if any(old_version in version.lower() for old_version in ["2.0", "1.0", "old", "legacy"]):
-                risk_factors += 1
+    def _score_service(self, port: int, protocol: str, service_name: str, version: str) -> Dict:
+        """プロファイル・脆弱性・リスク要因をまとめて評価（同じ組み合わせはメモから返す）"""
+        key = (port, protocol, service_name, version)
+        score = self._score_cache.get(key)
+        if score is not None:
+            return score
         
+        profile = self.knowledge_base.lookup_profile(port, protocol, service_name, version)
+        vulnerabilities = self._find_vulnerabilities(service_name, version)
+        factors = self._risk_factors(port, vulnerabilities)
+        score = {
+            "profile": profile,
+            "vulnerabilities": vulnerabilities,
+            "factors": factors,
+            # プロファイルも脆弱性も該当しないサービスは評価しない
+            "level": self._level_from_factors(sum(factors)) if profile is not None or vulnerabilities else "unknown"
+        }
+        if len(self._score_cache) >= self.score_cache_size:
+            self._score_cache.clear()
+        self._score_cache[key] = score
+        return score
+    
+    def _find_vulnerabilities(self, service_name: str, version: str) -> List[Dict]:
+        """サービス名・バージョン文字列から脆弱性フィードを検索"""
+        if not version:
+            return []
+        return self.vulnerability_index.lookup_service(version, f"{service_name} {version}")
+    
+    def _risk_factors(self, port: int, vulnerabilities: List[Dict]) -> Tuple[int, int, int]:
+        """リスク要因（高リスクポート, 非暗号化プロトコル, 脆弱性の深刻度）"""
+        # 脆弱性フィードに該当するバージョン（critical: +3, high: +2, medium/low: +1）
+        vulnerability_score = 0
+        if vulnerabilities:
+            vulnerability_score = max(max(SEVERITY_ORDER.get(v["severity"], 1) - 1, 1) for v in vulnerabilities)
+        return (
+            int(port in self.high_risk_ports),
+            int(port in self.unencrypted_ports),
+            vulnerability_score
+        )
+    
+    @staticmethod
+    def _level_from_factors(risk_factors: int) -> str:
         if risk_factors >= 3:
             return "high_risk"
         elif risk_factors >= 2:
@@ -190,8 +119,6 @@ class ServiceAnalyzer:
         else:
             return "secure"
     
-
-    
     async def analyze_nmap_results(self, nmap_output: str) -> str:
         """nmapの結果を解析してサービス分析を実行"""
         try:
@@ -207,13 +134,16 @@ class ServiceAnalyzer:
                 return "\n".join(result)
             
             # 各ポートを分析
+            high_risk_count = 0
             for port_info in ports_info:
                 port = port_info.get("port")
                 service = port_info.get("service", "")
                 version = port_info.get("version", "")
                 
                 if port:
-                    analysis = self.analyze_port(int(port), service, version)
+                    analysis = self.analyze_port(int(port), service, version, port_info.get("protocol", "tcp"))
+                    if analysis["security_level"] == "high_risk":
+                        high_risk_count += 1
                     
                     result.append(f"Port {port} Analysis:")
                     result.append("-" * 40)
@@ -229,6 +159,12 @@ class ServiceAnalyzer:
                     
                     result.append(f"Security Level: {analysis['security_level'].upper()}")
                     
+                    if analysis["vulnerabilities"]:
+                        result.append("\nKnown Vulnerabilities:")
+                        for vuln in analysis["vulnerabilities"]:
+                            result.append(f"  ⚠️ {vuln['id']} ({vuln['severity'].upper()}, CVSS {vuln['cvss']}) {vuln['name']}")
+                            result.append(f"     {vuln['description']}")
+                    
                     if analysis["issues"]:
                         result.append("\nCommon Security Issues:")
                         for issue in analysis["issues"]:
@@ -250,9 +186,6 @@ class ServiceAnalyzer:
             
             # 全体的なセキュリティサマリー
             result.append("\n=== SECURITY SUMMARY ===")
-            high_risk_count = sum(1 for info in ports_info if self._evaluate_security_level(
-                int(info.get("port", 0)), info.get("service", ""), info.get("version", "")
-            ) == "high_risk")
             
             if high_risk_count > 0:
                 result.append(f"⚠️  {high_risk_count} high-risk services detected")
@@ -271,12 +204,13 @@ class ServiceAnalyzer:
         
         # 簡単な正規表現でポート情報を抽出
         # フォーマット例: "80/tcp - open (Apache 2.4.41)"
-        port_pattern = r'(\d+)/\w+\s+-\s+open(?:\s+\(([^)]+)\))?'
+        port_pattern = r'(\d+)/(\w+)\s+-\s+open(?:\s+\(([^)]+)\))?'
         matches = re.findall(port_pattern, nmap_output)
         
         for match in matches:
             port = match[0]
-            service_info = match[1] if len(match) > 1 else ""
+            protocol = match[1]
+            service_info = match[2]
             
             # サービス名とバージョンを分離
             service_name = ""
@@ -292,12 +226,190 @@ class ServiceAnalyzer:
             
             ports_info.append({
                 "port": port,
+                "protocol": protocol,
                 "service": service_name,
                 "version": version
             })
         
         return ports_info
     
+    def _parse_nmap_hosts(self, nmap_output: str) -> List[Dict]:
+        """nmap出力（本ツールの整形結果または通常出力）からホストごとの開放ポートを抽出"""
+        ports_info = []
+        host = "unknown"
+        formatted_port = re.compile(r'^\s*(\d+)/(\w+)\s+-\s+open(?:\s+\((.*)\))?\s*$')
+        normal_port = re.compile(r'^(\d+)/(\w+)\s+open\s+(\S+)(?:\s+(.*?))?\s*$')
+        
+        for line in nmap_output.splitlines():
+            host_match = re.match(r'^(?:Address \((?:ipv4|ipv6)\):|Nmap scan report for)\s+(.+?)\s*$', line)
+            if host_match:
+                host = host_match.group(1)
+                continue
+            
+            match = formatted_port.match(line)
+            if match:
+                # "(ssh OpenSSH 8.2p1)" -> service: "ssh", version: "OpenSSH 8.2p1"
+                service_name, _, version = (match.group(3) or "").partition(' ')
+            else:
+                match = normal_port.match(line)
+                if not match:
+                    continue
+                service_name, version = match.group(3), match.group(4) or ""
+            
+            ports_info.append({
+                "host": host,
+                "port": int(match.group(1)),
+                "protocol": match.group(2).lower(),
+                "service": service_name,
+                "version": version.strip()
+            })
+        
+        return ports_info
+    
+    def score_batch(self, ports_info: List[Dict]) -> Dict:
+        """全ポートをまとめて評価し、列形式（array）の結果を返す
+        
+        同じ (ポート, プロトコル, サービス, バージョン) の評価はメモから返すため、
+        同一サービスが多数並ぶ大規模スキャンでも評価は組み合わせの数だけで済む。
+        """
+        host_ids: Dict[str, int] = {}
+        service_ids: Dict[Tuple[str, str], int] = {}
+        service_scores: List[Dict] = []
+        
+        columns = {
+            "host": array('I'),
+            "port": array('H'),
+            "service": array('I'),
+            "high_risk_port": array('B'),
+            "unencrypted": array('B'),
+            "vulnerability": array('B'),
+            "level": array('B')
+        }
+        level_codes = {level: code for code, level in enumerate(RISK_LEVELS)}
+        
+        for info in ports_info:
+            port = int(info["port"])
+            protocol = info.get("protocol", "tcp")
+            service_name = info.get("service", "")
+            version = info.get("version", "")
+            score = self._score_service(port, protocol, service_name, version)
+            
+            service_key = (service_name, version)
+            service_id = service_ids.get(service_key)
+            if service_id is None:
+                service_id = service_ids[service_key] = len(service_scores)
+                service_scores.append(score)
+            
+            columns["host"].append(host_ids.setdefault(info.get("host", "unknown"), len(host_ids)))
+            columns["port"].append(port)
+            columns["service"].append(service_id)
+            high_risk_port, unencrypted, vulnerability = score["factors"]
+            columns["high_risk_port"].append(high_risk_port)
+            columns["unencrypted"].append(unencrypted)
+            columns["vulnerability"].append(vulnerability)
+            columns["level"].append(level_codes[score["level"]])
+        
+        return {
+            "columns": columns,
+            "hosts": list(host_ids),
+            "services": list(service_ids),
+            "service_scores": service_scores
+        }
+    
+    async def batch_risk_summary(self, nmap_output: str, max_hosts: int = 50) -> str:
+        """大規模なnmap結果を一括評価し、ホスト別・サービス別に集計した要約を返す"""
+        try:
+            start_time = time.monotonic()
+            ports_info = self._parse_nmap_hosts(nmap_output)
+            
+            result = ["=== BATCH RISK SUMMARY ==="]
+            if not ports_info:
+                result.append("No port information found in nmap output")
+                return "\n".join(result)
+            
+            batch = self.score_batch(ports_info)
+            columns = batch["columns"]
+            hosts = batch["hosts"]
+            services = batch["services"]
+            
+            # 列を1回走査してホスト別・サービス別・レベル別に集計
+            level_totals = [0] * len(RISK_LEVELS)
+            host_tallies = [[0] * len(RISK_LEVELS) for _ in hosts]
+            service_counts = [0] * len(services)
+            service_hosts: List[set] = [set() for _ in services]
+            for host_id, service_id, level in zip(columns["host"], columns["service"], columns["level"]):
+                level_totals[level] += 1
+                host_tallies[host_id][level] += 1
+                service_counts[service_id] += 1
+                service_hosts[service_id].add(host_id)
+            
+            result.append(
+                f"Hosts: {len(hosts)} | Open ports: {len(columns['port'])} | "
+                f"Distinct services: {len(services)}"
+            )
+            result.append("Risk Distribution: " + " | ".join(
+                f"{level.upper()} {count}" for level, count in zip(RISK_LEVELS, level_totals)
+            ))
+            result.append(
+                f"Risk Factors: high-risk ports {sum(columns['high_risk_port'])}, "
+                f"unencrypted {sum(columns['unencrypted'])}, "
+                f"known-vulnerable {sum(1 for v in columns['vulnerability'] if v)}"
+            )
+            
+            # ホスト別の集計（高リスク・中リスクの多い順）
+            result.append("\nPer-Host Risk:")
+            width = max(len("Host"), *(len(host) for host in hosts)) + 2
+            result.append(f"  {'Host':<{width}}{'Ports':>6}{'High':>6}{'Medium':>8}{'Low':>6}{'Secure':>8}{'Unknown':>9}")
+            order = sorted(range(len(hosts)), key=lambda h: (-host_tallies[h][0], -host_tallies[h][1], hosts[h]))
+            for host_id in order[:max_hosts]:
+                tally = host_tallies[host_id]
+                result.append(
+                    f"  {hosts[host_id]:<{width}}{sum(tally):>6}{tally[0]:>6}{tally[1]:>8}{tally[2]:>6}{tally[3]:>8}{tally[4]:>9}"
+                )
+            if len(hosts) > max_hosts:
+                result.append(f"  ... and {len(hosts) - max_hosts} more hosts")
+            
+            # リスクの高いサービス（レベル順・出現数順）
+            result.append("\nServices by Risk:")
+            level_codes = {level: code for code, level in enumerate(RISK_LEVELS)}
+            service_order = sorted(
+                range(len(services)),
+                key=lambda s: (level_codes[batch["service_scores"][s]["level"]], -service_counts[s])
+            )
+            for service_id in service_order[:20]:
+                service_name, version = services[service_id]
+                score = batch["service_scores"][service_id]
+                label = " ".join(part for part in (service_name, version) if part) or "unidentified"
+                line = (
+                    f"  [{score['level'].upper()}] {label}: {service_counts[service_id]} ports "
+                    f"on {len(service_hosts[service_id])} hosts"
+                )
+                if score["vulnerabilities"]:
+                    line += f" - {', '.join(v['id'] for v in score['vulnerabilities'])}"
+                result.append(line)
+            if len(services) > 20:
+                result.append(f"  ... and {len(services) - 20} more services")
+            
+            # 既知の脆弱性ごとの影響ホスト
+            affected: Dict[str, Tuple[Dict, set]] = {}
+            for service_id, score in enumerate(batch["service_scores"]):
+                for vuln in score["vulnerabilities"]:
+                    affected.setdefault(vuln["id"], (vuln, set()))[1].update(service_hosts[service_id])
+            if affected:
+                result.append("\nKnown Vulnerabilities:")
+                for vuln, host_set in sorted(
+                    affected.values(), key=lambda item: (-SEVERITY_ORDER.get(item[0]["severity"], 0), item[0]["id"])
+                ):
+                    names = sorted(hosts[h] for h in host_set)
+                    shown = ", ".join(names[:5]) + (f" (+{len(names) - 5})" if len(names) > 5 else "")
+                    result.append(f"  ⚠️ {vuln['id']} ({vuln['severity'].upper()}) {vuln['name']}: {shown}")
+            
+            result.append(f"\nScored {len(columns['port'])} ports in {round(time.monotonic() - start_time, 3)}s")
+            return "\n".join(result)
+            
+        except Exception as e:
+            return f"Error in batch risk summary: {str(e)}"
+    
     async def quick_port_analysis(self, target: str, port: int) -> str:
         """特定ポートのクイック分析"""
         try:
@@ -1,59 +1,220 @@
 import asyncio
 import asyncssh
-from typing import List, Optional
+import base64
+import os
+import posixpath
+import re
+import shlex
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from utils.progress import ProgressCallback
+from utils.remote_index import RemoteFileIndex
+from utils.scope import EngagementScope
+from utils.ssh_pool import SSHConnectionPool
 
 class SSHExplorer:
     """SSH接続後のリモートサーバー調査とファイル検索を行うクラス"""
 
+    def __init__(self, host_resolver: Optional[Callable[[str], Awaitable[Optional[str]]]] = None):
+        # ホスト名を事前解決する関数（DNSScannerの共有キャッシュを使う）
+        self.host_resolver = host_resolver
+        # ssh_* ツール間で共有する接続プール
+        self.pool = SSHConnectionPool(max_connections=10, idle_timeout=300.0)
+        
+        # SFTPによるファイル取得の設定
+        self.sftp_concurrency = 8
+        self.sftp_max_file_bytes = 10 * 1024 * 1024
+        self.sftp_max_total_bytes = 50 * 1024 * 1024
+        self.sftp_inline_bytes = 64 * 1024      # これを超えるファイルはローカルに保存してプレビューのみ返す
+        self.sftp_chunk_bytes = 256 * 1024
+        self.sftp_preview_chars = 2000
+        self.download_dir = "scan_results/ssh_files"
+        
+        # flagファイル検索の設定
+        self.search_concurrency = 8             # 同時に走らせるfindの数（1接続上のチャネル数）
+        self.search_time_budget = 60            # 検索全体の制限時間（秒）。超えた分は途中結果を返す
+        self.search_prune_paths = ['/proc', '/sys', '/dev', '/run']
+        self.search_prune_fstypes = [
+            'proc', 'sysfs', 'devtmpfs', 'devpts', 'cgroup', 'cgroup2', 'tracefs', 'debugfs', 'securityfs',
+            'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'sshfs', 'fuse.sshfs', '9p', 'afs', 'ceph', 'glusterfs',
+        ]
+        self.search_read_bytes = 4096           # 見つかったファイルから読み取る最大バイト数
+        self.search_read_batch_bytes = 64 * 1024  # 内容の読み取り1回分のパス列の最大長（引数長の上限を超えないように分割）
+        
+        # リモートファイル一覧のインデックス（ホストごとに1回走査し、以降はローカルで検索）
+        self.file_index = RemoteFileIndex("scan_results/ssh_index.sqlite3")
+        self.index_time_budget = 300
+        self.index_batch_entries = 5000
+        self.index_relist_chunk = 100           # 差分再走査で1回のfindに渡すディレクトリ数
+        
+        # 複数ホストへの一括調査の設定
+        self.fanout_concurrency = 10            # 接続プールの上限に合わせる
+        self.fanout_host_timeout = 120
+        self.fanout_max_hosts = 256
+        self.scope = EngagementScope.from_env()
+        
+        # リモートコマンド出力の逐次読み取りの設定
+        self.stream_read_size = 64 * 1024
+        self.command_max_bytes = 8 * 1024 * 1024   # _run_remote_command で保持する標準出力の上限
+        self.search_max_results = 10000            # flagファイル検索で1ルートから受け取るパスの上限
+
+    async def _stream_command(self, conn: asyncssh.SSHClientConnection, command: str,
+                              max_lines: Optional[int] = None, max_bytes: Optional[int] = None,
+                              separator: str = '\n', timeout: Optional[float] = None,
+                              status: Optional[Dict] = None) -> AsyncIterator[str]:
+        """リモートコマンドの標準出力を全体を溜めずに読み、区切り文字ごとに1行ずつ返す
+
+        行数・バイト数の上限か制限時間に達した時点でリモートのプロセスを止めて終了する。
+        上限に達したか、時間切れか、終了コードなどは status に入れる。
+        """
+        status = status if status is not None else {}
+        status.update(lines=0, bytes=0, truncated=False, timed_out=False, exit_status=None)
+        delimiter = separator.encode()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+        # 標準エラーを読まずにパイプに溜めるとチャネル全体が止まるため捨てる
+        process = await conn.create_process(command, encoding=None, stderr=asyncssh.DEVNULL)
+        try:
+            pending = b""
+            while True:
+                remaining = deadline - loop.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    status["timed_out"] = True
+                    break
+                try:
+                    chunk = await asyncio.wait_for(process.stdout.read(self.stream_read_size), timeout=remaining)
+                except asyncio.TimeoutError:
+                    status["timed_out"] = True
+                    break
+                if not chunk:
+                    # 区切り文字で終わらない最後の行
+                    if pending:
+                        status["lines"] += 1
+                        yield pending.decode('utf-8', errors='replace')
+                    break
+                if max_bytes is not None and status["bytes"] + len(chunk) > max_bytes:
+                    chunk = chunk[:max_bytes - status["bytes"]]
+                    status["truncated"] = True
+                status["bytes"] += len(chunk)
+                records = (pending + chunk).split(delimiter)
+                pending = records.pop()
+                for record in records:
+                    status["lines"] += 1
+                    yield record.decode('utf-8', errors='replace')
+                    if max_lines is not None and status["lines"] >= max_lines:
+                        status["truncated"] = True
+                        break
+                if status["truncated"]:
+                    break
+            if not (status["truncated"] or status["timed_out"]):
+                await process.wait(check=False)
+        finally:
+            if process.exit_status is None:
+                # 上限到達・時間切れ・呼び出し側の中断ではリモートのプロセスを止めてチャネルを閉じる
+                try:
+                    process.terminate()
+                except (OSError, asyncssh.Error):
+                    pass
+            process.close()
+            status["exit_status"] = process.exit_status
+
     async def _run_remote_command(self, conn: asyncssh.SSHClientConnection, command: str) -> str:
-        """リモートでコマンドを実行し、標準出力を返す"""
-        result = await conn.run(command, check=False)
-        return result.stdout.strip()
+        """リモートでコマンドを実行し、標準出力を返す（command_max_bytes を超える分は読まない）"""
+        lines = [line async for line in self._stream_command(conn, command, max_bytes=self.command_max_bytes)]
+        return "\n".join(lines).strip()
+
+    def _timed_command(self, command: str, budget: int) -> str:
+        """リモートの timeout コマンドがあれば制限時間付きで実行するシェル文"""
+        return f"if command -v timeout >/dev/null 2>&1; then timeout {budget} {command}; else {command}; fi"
+
+    async def _run_remote_script(self, conn: asyncssh.SSHClientConnection, script: str,
+                                 status: Optional[Dict] = None) -> List[str]:
+        """シェルスクリプトを1回のexecで実行し、NUL区切りの出力をフィールドに分割して返す（command_max_bytes まで）"""
+        fields = [
+            field async for field in self._stream_command(
+                conn, script, max_bytes=self.command_max_bytes, separator='\0', status=status,
+            )
+        ]
+        if fields and fields[-1] in ("", "\n"):
+            fields.pop()
+        return fields
 
     async def _execute_exploration(self, host: str, port: int, username: str, password: str, task_function):
-        """SSH接続を確立し、指定された探索タスクを実行する共通ラッパー"""
+        """プールからSSH接続を取得し、指定された探索タスクを実行する共通ラッパー"""
         try:
-            async with asyncssh.connect(host, port=port, username=username, password=password, known_hosts=None) as conn:
-                return await task_function(conn)
-        except asyncssh.PermissionDeniedError:
+            connect_host = host
+            if self.host_resolver is not None:
+                connect_host = await self.host_resolver(host) or host
+            reused = False
+            try:
+                async with self.pool.connection(host, port, username, password, connect_host) as (conn, reused):
+                    return await task_function(conn)
+            except (asyncssh.ConnectionLost, asyncssh.DisconnectError):
+                # 再利用した接続が使用中に切れた場合は、新しい接続で1回だけやり直す
+                if not reused:
+                    raise
+                async with self.pool.connection(host, port, username, password, connect_host) as (conn, _):
+                    return await task_function(conn)
+        except asyncio.TimeoutError:
+            return f"エラー: 接続がタイムアウトしました。ホスト {host}:{port} を確認してください。"
+        except asyncssh.PermissionDenied:
             return "エラー: 認証に失敗しました。ユーザー名またはパスワードが正しくありません。"
         except OSError as e:
             return f"エラー: 接続に失敗しました。ホスト {host}:{port} を確認してください。 ({e})"
         except Exception as e:
             return f"予期せぬエラーが発生しました: {str(e)}"
 
+    async def get_status(self) -> str:
+        """SSH Explorerの状態確認"""
+        return f"Available - connection pool: {self.pool.stats()}"
+
+    async def close_connections(self, host: Optional[str] = None) -> str:
+        """プール内のSSH接続を閉じます"""
+        closed = self.pool.close(host)
+        target = f"{host} の" if host else "すべての"
+        return f"✅ {target}SSH接続を閉じました（{closed}件）。"
+
     async def explore_current_directory(self, host: str, port: int, username: str, password: str) -> str:
         """リモートサーバーの現在のディレクトリの内容を調査し、テキストファイルの内容も読み取ります"""
+        patterns = ["*.txt", "*.log", "*.conf", "*.cfg", "*.ini", "*.json", "*.xml", "*.yaml", "*.yml"]
+        name_filter = " -o ".join(f"-name {shlex.quote(pattern)}" for pattern in patterns)
+        # pwd・ls -la・テキストファイルのサイズと内容（base64）を1回の実行でNUL区切りにして取得
+        script = (
+            "pwd; printf '\\0'; ls -la; printf '\\0'; "
+            f"find . -maxdepth 1 -type f \\( {name_filter} \\) -exec sh -c '"
+            'for f do s=$(stat -c%s -- "$f" 2>/dev/null || echo unknown); printf "%s\\0%s\\0" "$f" "$s"; '
+            'if [ "$s" != unknown ] && [ "$s" -le 1048576 ]; then if [ -r "$f" ]; then base64 -- "$f" | tr -d "\\n"; else printf "!"; fi; fi; '
+            "printf \"\\0\"; done' sh {} + 2>/dev/null"
+        )
+        
         async def task(conn):
-            current_dir = await self._run_remote_command(conn, 'pwd')
-            dir_contents = await self._run_remote_command(conn, 'ls -la')
-            
-            # テキストファイルを検索して読み取り
-            text_files = await self._run_remote_command(conn, 'find . -maxdepth 1 -type f \\( -name "*.txt" -o -name "*.log" -o -name "*.conf" -o -name "*.cfg" -o -name "*.ini" -o -name "*.json" -o -name "*.xml" -o -name "*.yaml" -o -name "*.yml" \\) 2>/dev/null')
+            status: Dict = {}
+            fields = await self._run_remote_script(conn, script, status)
+            current_dir = fields[0].strip() if fields else ""
+            dir_contents = fields[1].strip() if len(fields) > 1 else ""
+            text_files = fields[2:]
             
             result = f"現在のディレクトリ: {current_dir}\n\nディレクトリの内容:\n{dir_contents}\n"
             
-            if text_files:
+            if len(text_files) >= 3:
                 result += "\n📄 テキストファイルの内容:\n"
                 result += "=" * 50 + "\n"
                 
-                files = text_files.split('\n')
-                for file_path in files:
-                    if not file_path:
-                        continue
+                for index in range(0, len(text_files) - 2, 3):
+                    file_path, file_size, encoded = text_files[index:index + 3]
                     
                     # ファイル名から./を除去
                     file_name = file_path.replace('./', '')
                     
                     try:
-                        # ファイルサイズを確認
-                        file_size = await self._run_remote_command(conn, f'stat -c%s "{file_path}" 2>/dev/null || echo "unknown"')
-                        
-                        # ファイルサイズが1MB以下なら読み取り
+                        # ファイルサイズが1MB以下なら内容を表示
                         if file_size != "unknown" and int(file_size) <= 1048576:  # 1MB = 1048576 bytes
-                            content = await self._run_remote_command(conn, f'cat "{file_path}" 2>/dev/null || echo "読み取りエラー"')
+                            content = ""
+                            if encoded and encoded != "!":
+                                content = base64.b64decode(encoded).decode('utf-8', errors='replace').strip()
                             
-                            if content and content != "読み取りエラー":
+                            if content:
                                 result += f"\n📁 ファイル: {file_name}\n"
                                 result += f"📏 サイズ: {file_size} bytes\n"
                                 result += f"📝 内容:\n{'-' * 30}\n{content}\n{'-' * 30}\n"
@@ -66,115 +227,521 @@ class SSHExplorer:
                         result += f"\n📁 ファイル: {file_name} (エラー: {str(e)})\n"
             else:
                 result += "\n📄 テキストファイルは見つかりませんでした。\n"
+            if status["truncated"]:
+                result += f"\n⚠️ 出力が{self.command_max_bytes} bytesを超えたため、途中までのファイルのみ表示しています。\n"
             
             return result
         
         return await self._execute_exploration(host, port, username, password, task)
 
-    async def search_flag_files(self, host: str, port: int, username: str, password: str, search_paths: Optional[List[str]] = None) -> str:
+    def _local_download_path(self, host: str, port: int, remote_path: str) -> str:
+        """リモートパスに対応するローカルの保存先（ワークスペース外に出ないよう正規化）"""
+        parts = [part for part in remote_path.split('/') if part not in ('', '.', '..')]
+        host_dir = re.sub(r'[^A-Za-z0-9_.-]', '_', f"{host}_{port}")
+        return os.path.join(self.download_dir, host_dir, *parts)
+
+    def _preview(self, data: bytes) -> str:
+        """取得した内容のプレビュー（バイナリは種別のみ）"""
+        if b'\0' in data[:8192]:
+            return "(バイナリファイル)"
+        text = data.decode('utf-8', errors='replace')
+        if len(text) > self.sftp_preview_chars:
+            return text[:self.sftp_preview_chars] + f"\n... (先頭{self.sftp_preview_chars}文字のみ表示)"
+        return text
+
+    async def _sftp_fetch(self, sftp: asyncssh.SFTPClient, path: str, host: str, port: int,
+                          budget: Dict[str, int], max_file_bytes: int) -> Dict:
+        """1ファイルをSFTPで取得（大きいファイルはチャンクごとにローカルへ書き出す）"""
+        item = {"path": path, "size": None, "fetched": 0, "truncated": False, "stored": None, "preview": "", "error": None}
+        try:
+            attrs = await sftp.stat(path)
+            if attrs.type != asyncssh.FILEXFER_TYPE_REGULAR:
+                item["error"] = "通常ファイルではありません"
+                return item
+            item["size"] = attrs.size or 0
+            
+            # 全体の残り予算から、このファイルに使う分を先に確保する
+            allowance = min(item["size"], max_file_bytes, budget["remaining"])
+            budget["remaining"] -= allowance
+            if allowance < item["size"]:
+                item["truncated"] = True
+            if allowance == 0 and item["size"] > 0:
+                item["error"] = "取得上限（合計サイズ）に達したためスキップ"
+                return item
+            
+            head = bytearray()
+            local_file = None
+            if allowance > self.sftp_inline_bytes:
+                item["stored"] = self._local_download_path(host, port, path)
+                os.makedirs(os.path.dirname(item["stored"]), exist_ok=True)
+                local_file = open(item["stored"], 'wb')
+            try:
+                # encoding=None でバイト列として開き、大きな read はasyncssh側で複数要求を並行発行する
+                async with sftp.open(path, 'rb', encoding=None) as remote_file:
+                    while item["fetched"] < allowance:
+                        chunk = await remote_file.read(min(self.sftp_chunk_bytes, allowance - item["fetched"]))
+                        if not chunk:
+                            break
+                        item["fetched"] += len(chunk)
+                        if len(head) < self.sftp_inline_bytes:
+                            head.extend(chunk[:self.sftp_inline_bytes - len(head)])
+                        if local_file is not None:
+                            local_file.write(chunk)
+            finally:
+                if local_file is not None:
+                    local_file.close()
+            # 確保した予算のうち使わなかった分を戻す
+            budget["remaining"] += allowance - item["fetched"]
+            item["preview"] = self._preview(bytes(head))
+        except (asyncssh.SFTPError, OSError) as e:
+            item["error"] = str(e)
+        return item
+
+    async def fetch_files(self, host: str, port: int, username: str, password: str, paths: List[str],
+                          max_file_bytes: Optional[int] = None, max_total_bytes: Optional[int] = None) -> str:
+        """SFTPで複数ファイルを並行して取得し、プレビューと保存先を返します"""
+        max_file_bytes = max_file_bytes or self.sftp_max_file_bytes
+        budget = {"remaining": max_total_bytes or self.sftp_max_total_bytes}
+        total_budget = budget["remaining"]
+        
+        async def task(conn):
+            async with conn.start_sftp_client() as sftp:
+                # ワイルドカードを含むパスはリモートで展開し、重複を除く
+                targets: List[str] = []
+                missing = []
+                for pattern in paths:
+                    if any(ch in pattern for ch in '*?['):
+                        try:
+                            matches = await sftp.glob(pattern)
+                        except asyncssh.SFTPNoSuchFile:
+                            matches = []
+                        if not matches:
+                            missing.append(pattern)
+                        targets.extend(matches)
+                    else:
+                        targets.append(pattern)
+                targets = list(dict.fromkeys(targets))
+                
+                semaphore = asyncio.Semaphore(self.sftp_concurrency)
+                
+                async def fetch(path: str) -> Dict:
+                    async with semaphore:
+                        return await self._sftp_fetch(sftp, path, host, port, budget, max_file_bytes)
+                
+                items = await asyncio.gather(*(fetch(path) for path in targets))
+            
+            fetched_total = sum(item["fetched"] for item in items)
+            result_text = f"📥 SFTPファイル取得結果: {len(items)}件（取得 {fetched_total} / 上限 {total_budget} bytes）\n\n"
+            for item in items:
+                result_text += f"📁 {item['path']}\n"
+                if item["error"]:
+                    result_text += f"  エラー: {item['error']}\n\n"
+                    continue
+                size_line = f"  📏 サイズ: {item['size']} bytes（取得: {item['fetched']} bytes"
+                size_line += "、上限により途中まで）" if item["truncated"] else "）"
+                result_text += size_line + "\n"
+                if item["stored"]:
+                    result_text += f"  💾 保存先: {item['stored']}\n"
+                result_text += f"  📝 内容:\n{'-' * 30}\n{item['preview'].strip()}\n{'-' * 30}\n\n"
+            for pattern in missing:
+                result_text += f"⚠️ 一致するファイルがありません: {pattern}\n"
+            return result_text.strip()
+        
+        return await self._execute_exploration(host, port, username, password, task)
+
+    def _normalize_search_roots(self, search_paths: List[str], cwd: str) -> List[str]:
+        """検索ルートを絶対パスに揃え、祖先ルートに含まれるものを除く"""
+        roots = []
+        for path in search_paths:
+            path = posixpath.normpath(posixpath.join(cwd, path))
+            roots.append(path)
+        normalized: List[str] = []
+        for path in sorted(set(roots), key=len):
+            if not any(path == root or path.startswith(root.rstrip('/') + '/') for root in normalized):
+                normalized.append(path)
+        return normalized
+
+    def _find_prune_expression(self) -> str:
+        """疑似ファイルシステムとネットワークマウントを辿らないためのfind式"""
+        tests = [f"-path {shlex.quote(path)}" for path in self.search_prune_paths]
+        tests += [f"-fstype {shlex.quote(fstype)}" for fstype in self.search_prune_fstypes]
+        return "\\( " + " -o ".join(tests) + " \\) -prune"
+
+    async def _find_in_root(self, conn: asyncssh.SSHClientConnection, root: str, name_filter: str,
+                            budget: int, max_depth: Optional[int] = None) -> tuple:
+        """1つのルートをfindで検索し、(見つかったパス, 時間切れかどうか, 件数上限で打ち切ったか) を返す"""
+        depth = f"-maxdepth {max_depth} " if max_depth is not None else ""
+        find_command = (
+            f"find {shlex.quote(root)} {depth}{self._find_prune_expression()} "
+            f"-o \\( {name_filter} \\) -type f -printf '%p\\0' 2>/dev/null"
+        )
+        # リモートのtimeoutで打ち切り、それまでに出力されたパスは途中結果として使う
+        status: Dict = {}
+        paths = [
+            path async for path in self._stream_command(
+                conn, self._timed_command(find_command, budget), max_lines=self.search_max_results,
+                separator='\0', timeout=budget + 2, status=status,
+            ) if path
+        ]
+        return paths, status["timed_out"] or status["exit_status"] == 124, status["truncated"]
+
+    async def search_flag_files(self, host: str, port: int, username: str, password: str,
+                                search_paths: Optional[List[str]] = None, time_budget: Optional[int] = None) -> str:
         """リモートサーバー上のflag*.txtやroot.txtファイルを網羅的に検索します"""
         if search_paths is None:
             search_paths = ['.', '/home', '/var', '/tmp', '/opt', '/usr', '/etc', '/root', '/']
+        budget = max(1, int(time_budget or self.search_time_budget))
+        name_filter = "-name 'flag*.txt' -o -name 'root.txt'"
         
         async def task(conn):
-            found_any_file = False
-            output_text = ""
+            # 制限時間は検索全体で共有し、後から始まるルートには残り時間だけを渡す
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + budget
+            cwd = await self._run_remote_command(conn, 'pwd') or '/'
+            roots = self._normalize_search_roots(search_paths, cwd)
             
-            # まずroot.txtを直接確認
-            root_content = await self._run_remote_command(conn, 'cat /root/root.txt 2>/dev/null || echo "root.txt not found"')
-            if "root.txt not found" not in root_content:
-                found_any_file = True
-                output_text += f"🔍 /root/root.txt:\n"
-                output_text += f"内容: {root_content}\n\n"
+            # ルートが "/" のときは直下のディレクトリごとに分けて並行検索する
+            units = []
+            for root in roots:
+                if root == '/':
+                    children = await self._run_remote_script(
+                        conn, f"find / -mindepth 1 -maxdepth 1 {self._find_prune_expression()} -o -type d -printf '%p\\0' 2>/dev/null"
+                    )
+                    units.append(('/', 1))
+                    units.extend((child, None) for child in children if child)
+                else:
+                    units.append((root, None))
             
-            # findコマンドを一括で実行
-            find_command = "find " + " ".join(search_paths) + " \\( -name 'flag*.txt' -o -name 'root.txt' \\) -type f 2>/dev/null"
-            found_files_str = await self._run_remote_command(conn, find_command)
-
-            if not found_files_str and not found_any_file:
-                return "flag*.txtまたはroot.txtファイルは見つかりませんでした。"
-
-            if found_files_str:
-                files = found_files_str.split('\n')
-                for file_path in files:
-                    if not file_path:
-                        continue
-                    
-                    # /root/root.txtは既に処理済みなのでスキップ
-                    if file_path == "/root/root.txt":
-                        continue
-                    
-                    found_any_file = True
-                    result_text = f"見つかったflagファイル: {file_path}\n"
-                    
-                    content = await self._run_remote_command(conn, f'cat "{file_path}"')
-                    if content:
-                        result_text += f"内容: {content}\n"
-                    else:
-                        result_text += "内容: (空ファイル)\n"
-                    
-                    output_text += result_text + "\n"
-
-            return output_text.strip() if found_any_file else "flag*.txtまたはroot.txtファイルは見つかりませんでした。"
+            semaphore = asyncio.Semaphore(self.search_concurrency)
+            
+            async def search(unit):
+                async with semaphore:
+                    remaining = deadline - loop.time()
+                    if remaining < 1:
+                        return [], True, False
+                    return await self._find_in_root(conn, unit[0], name_filter, int(remaining), unit[1])
+            
+            results = await asyncio.gather(*(search(unit) for unit in units))
+            found = sorted({path for paths, _, _ in results for path in paths})
+            timed_out = [unit[0] for unit, (_, expired, _) in zip(units, results) if expired]
+            truncated = [unit[0] for unit, (_, _, capped) in zip(units, results) if capped]
+            if '/root/root.txt' not in found:
+                found.insert(0, '/root/root.txt')
+            
+            # 内容はまとめて読み取る（読めないものは "!"）。パスが多い場合は引数長の上限を超えないよう分割する
+            batches: List[List[str]] = [[]]
+            batch_length = 0
+            for path in found:
+                quoted = shlex.quote(path)
+                if batches[-1] and batch_length + len(quoted) + 1 > self.search_read_batch_bytes:
+                    batches.append([])
+                    batch_length = 0
+                batches[-1].append(quoted)
+                batch_length += len(quoted) + 1
+            fields: List[str] = []
+            for batch in batches:
+                script = (
+                    f"for f in {' '.join(batch)}; do "
+                    "printf '%s\\0' \"$f\"; "
+                    f"if [ -f \"$f\" ] && [ -r \"$f\" ]; then head -c {self.search_read_bytes} \"$f\" | tr -d '\\000'; else printf '!'; fi; "
+                    "printf '\\0'; done"
+                )
+                fields.extend(await self._run_remote_script(conn, script))
+            
+            output_text = ""
+            for index in range(0, len(fields) - 1, 2):
+                file_path, content = fields[index], fields[index + 1].strip()
+                if content == "!":
+                    continue
+                if file_path == "/root/root.txt":
+                    output_text += f"🔍 /root/root.txt:\n内容: {content}\n\n"
+                    continue
+                output_text += f"見つかったflagファイル: {file_path}\n"
+                output_text += f"内容: {content}\n\n" if content else "内容: (空ファイル)\n\n"
+            
+            if not output_text:
+                output_text = "flag*.txtまたはroot.txtファイルは見つかりませんでした。\n\n"
+            output_text += f"検索ルート: {', '.join(roots)}\n"
+            if timed_out:
+                output_text += f"⏱️ 制限時間（{budget}秒）内に検索が終わらなかったため途中結果です: {', '.join(timed_out)}\n"
+            if truncated:
+                output_text += f"⚠️ 一致が{self.search_max_results}件を超えたため打ち切りました: {', '.join(truncated)}\n"
+            return output_text.strip()
 
         return await self._execute_exploration(host, port, username, password, task)
 
     async def explore_system_directories(self, host: str, port: int, username: str, password: str) -> str:
         """リモートサーバーのシステムの主要ディレクトリを調査します"""
         directories = ['/home', '/var', '/tmp', '/opt', '/usr', '/etc', '/root']
+        # 存在確認・ファイル数・ディレクトリ数・先頭の一覧を全ディレクトリ分まとめて1回で取得
+        script = (
+            f"for d in {' '.join(shlex.quote(d) for d in directories)}; do "
+            "printf '%s\\0' \"$d\"; "
+            "if [ -d \"$d\" ]; then printf 'exists\\0'; "
+            "find \"$d\" -maxdepth 1 -type f -printf . 2>/dev/null | wc -c; printf '\\0'; "
+            "find \"$d\" -maxdepth 1 -type d -printf . 2>/dev/null | wc -c; printf '\\0'; "
+            "ls -la \"$d\" 2>/dev/null | head -4; printf '\\0'; "
+            "else printf 'not found\\0'; fi; done"
+        )
         
         async def task(conn):
+            fields = await self._run_remote_script(conn, script)
             result_text = "システムディレクトリ調査結果:\n\n"
-            for dir_path in directories:
-                # ディレクトリの存在確認
-                dir_exists = await self._run_remote_command(conn, f'test -d {dir_path} && echo "exists" || echo "not found"')
-                if "not found" in dir_exists:
+            index = 0
+            while index + 1 < len(fields):
+                dir_path, state = fields[index], fields[index + 1]
+                index += 2
+                if state != "exists":
                     result_text += f"=== {dir_path} ===\n"
                     result_text += "ディレクトリが存在しません\n\n"
                     continue
                 
                 # ファイル数とディレクトリ数のみを表示
-                file_count = await self._run_remote_command(conn, f'find {dir_path} -maxdepth 1 -type f | wc -l')
-                dir_count = await self._run_remote_command(conn, f'find {dir_path} -maxdepth 1 -type d | wc -l')
+                file_count, dir_count, important_files = (fields[index:index + 3] + ["", "", ""])[:3]
+                index += 3
                 
                 result_text += f"=== {dir_path} ===\n"
                 result_text += f"ファイル数: {file_count.strip()}\n"
                 result_text += f"ディレクトリ数: {dir_count.strip()}\n"
                 
                 # 重要なファイルのみを表示（最初の3つ）
-                important_files = await self._run_remote_command(conn, f'ls -la {dir_path} | head -4')
-                result_text += f"内容（最初の3つ）:\n{important_files}\n\n"
+                result_text += f"内容（最初の3つ）:\n{important_files.strip()}\n\n"
             
             return result_text
 
         return await self._execute_exploration(host, port, username, password, task)
 
+    async def _expand_home(self, conn: asyncssh.SSHClientConnection, path: str) -> str:
+        """先頭の ~、~user、$HOME（${HOME}）をリモートで展開する（引用符付きで渡すとシェルが展開しないため）"""
+        match = re.match(r'^(~[A-Za-z0-9._-]*|\$HOME|\$\{HOME\})(?=/|$)', path)
+        if not match:
+            return path
+        # 先頭部分は上の正規表現に一致する文字だけなので、引用符なしでシェルに展開させてよい
+        home = await self._run_remote_command(conn, f"printf '%s' {match.group(1)}")
+        return home + path[match.end():] if home else path
+
     async def check_hidden_files(self, host: str, port: int, username: str, password: str, directory: str = '.') -> str:
         """リモートサーバーの隠しファイルを検索します"""
         async def task(conn):
-            find_command = f"find {directory} -name '.*' -type f 2>/dev/null"
-            hidden_files_str = await self._run_remote_command(conn, find_command)
+            # 隠しファイルの一覧と属性（ls -la 相当）を1回のfindでNUL区切りにして取得
+            find_command = (
+                f"find {shlex.quote(await self._expand_home(conn, directory))} -name '.*' -type f "
+                "-printf '%p\\0%M %n %u %g %s %Tb %Td %TH:%TM\\0' 2>/dev/null"
+            )
+            status: Dict = {}
+            fields = await self._run_remote_script(conn, find_command, status)
             
-            if not hidden_files_str:
+            if len(fields) < 2:
                 return f"{directory}に隠しファイルは見つかりませんでした。"
             
             result_text = f"{directory}の隠しファイル:\n"
-            files = hidden_files_str.split('\n')
-            for file_path in files:
-                if not file_path:
-                    continue
-                
-                size_info = await self._run_remote_command(conn, f'ls -la "{file_path}"')
-                result_text += f"- {file_path}\n  {size_info}\n\n"
+            for index in range(0, len(fields) - 1, 2):
+                file_path, attributes = fields[index], fields[index + 1]
+                result_text += f"- {file_path}\n  {attributes} {file_path}\n\n"
+            if status["truncated"]:
+                result_text += f"⚠️ 出力が{self.command_max_bytes} bytesを超えたため途中で打ち切りました。\n"
             
             return result_text
 
         return await self._execute_exploration(host, port, username, password, task)
 
+    async def _stream_index_entries(self, conn: asyncssh.SSHClientConnection, command: str,
+                                    status: Dict, timeout: Optional[float] = None) -> AsyncIterator[List[tuple]]:
+        """find -printf の出力をエントリ単位のまとまりに分けて返す"""
+        width = RemoteFileIndex.FIELDS_PER_ENTRY
+        carry: List[str] = []
+        async for field in self._stream_command(conn, command, separator='\0', timeout=timeout, status=status):
+            carry.append(field)
+            if len(carry) >= self.index_batch_entries * width:
+                usable = len(carry) - len(carry) % width
+                yield RemoteFileIndex.parse_entries(carry[:usable])
+                carry = carry[usable:]
+        if carry:
+            yield RemoteFileIndex.parse_entries(carry)
+
+    async def build_file_index(self, host: str, port: int, username: str, password: str, root: str = '/',
+                               full_rebuild: bool = False, time_budget: Optional[int] = None) -> str:
+        """リモートのファイル一覧をローカルのインデックスに取り込みます（2回目以降は変化したディレクトリだけを再走査）"""
+        budget = max(1, int(time_budget or self.index_time_budget))
+        key = RemoteFileIndex.host_key(host, port, username)
+        prune = self._find_prune_expression()
+        
+        async def task(conn):
+            started = time.monotonic()
+            cwd = await self._run_remote_command(conn, 'pwd') or '/'
+            index_root = self._normalize_search_roots([root], cwd)[0]
+            existing = self.file_index.indexed_root(key, index_root)
+            status: Dict = {}
+            
+            if full_rebuild or existing is None or not existing["complete"]:
+                self.file_index.begin_full(key, index_root)
+                entries = 0
+                command = f"find {shlex.quote(index_root)} {prune} -o -printf '{RemoteFileIndex.PRINTF_FORMAT}' 2>/dev/null"
+                async for rows in self._stream_index_entries(conn, self._timed_command(command, budget), status):
+                    self.file_index.add_entries(key, rows)
+                    entries += len(rows)
+                complete = status.get("exit_status") != 124
+                self.file_index.finish(key, index_root, complete)
+                result_text = f"📇 ファイルインデックスを作成しました: {host} {index_root}\n"
+                result_text += f"  取り込んだエントリ: {entries}\n"
+            else:
+                # ディレクトリの更新時刻だけを取得し、変化したディレクトリの直下だけを一覧し直す
+                known = self.file_index.indexed_root(key, index_root)["root"]
+                local_dirs = self.file_index.directory_mtimes(key, known)
+                current_dirs: List[tuple] = []
+                command = f"find {shlex.quote(known)} {prune} -o -type d -printf '{RemoteFileIndex.PRINTF_FORMAT}' 2>/dev/null"
+                async for rows in self._stream_index_entries(conn, self._timed_command(command, budget), status):
+                    current_dirs.extend(rows)
+                complete = status.get("exit_status") != 124
+                
+                changed = [row[0] for row in current_dirs if local_dirs.get(row[0]) != row[5]]
+                current_paths = {row[0] for row in current_dirs}
+                # 走査が途中で打ち切られた場合は、見えなかったディレクトリを削除扱いにしない
+                removed = [path for path in local_dirs if path not in current_paths] if complete else []
+                
+                listings: List[tuple] = []
+                relisted = 0
+                for index in range(0, len(changed), self.index_relist_chunk):
+                    remaining = budget - (time.monotonic() - started)
+                    if remaining < 1:
+                        break
+                    chunk_dirs = changed[index:index + self.index_relist_chunk]
+                    chunk = " ".join(shlex.quote(path) for path in chunk_dirs)
+                    command = f"find {chunk} -mindepth 1 -maxdepth 1 {prune} -o -printf '{RemoteFileIndex.PRINTF_FORMAT}' 2>/dev/null"
+                    chunk_status: Dict = {}
+                    chunk_rows: List[tuple] = []
+                    async for rows in self._stream_index_entries(conn, self._timed_command(command, int(remaining)),
+                                                                 chunk_status, timeout=remaining + 10):
+                        chunk_rows.extend(rows)
+                    if chunk_status["timed_out"] or chunk_status["exit_status"] in (None, 124):
+                        break
+                    listings.extend(chunk_rows)
+                    relisted += len(chunk_dirs)
+                
+                # 一覧し直せなかったディレクトリは古い更新時刻とエントリのまま残し、次回の差分更新で再走査する
+                skipped = set(changed[relisted:])
+                changed = changed[:relisted]
+                self.file_index.apply_directory_changes(key, current_dirs, changed, removed, listings, skipped)
+                self.file_index.finish(key, known, complete)
+                index_root = known
+                result_text = f"📇 ファイルインデックスを差分更新しました: {host} {index_root}\n"
+                result_text += f"  変化したディレクトリ: {len(changed)} / {len(current_dirs)}\n"
+                result_text += f"  削除されたディレクトリ: {len(removed)}\n"
+                if skipped:
+                    result_text += f"⏱️ 制限時間内に一覧し直せなかったディレクトリ: {len(skipped)}（次回の差分更新で再走査します）\n"
+            
+            result_text += f"  インデックス全体: {self.file_index.stats(key)}\n"
+            result_text += f"  所要時間: {time.monotonic() - started:.1f}秒\n"
+            if not complete:
+                result_text += f"⏱️ 制限時間（{budget}秒）内に走査が終わらなかったため一部のみです。次回は再度全体を走査します。\n"
+            return result_text.strip()
+        
+        return await self._execute_exploration(host, port, username, password, task)
+
+    async def query_file_index(self, host: str, port: int, username: str, query: str = "pattern", pattern: str = "*",
+                               directory: str = '/', min_size: int = 0, limit: int = 100) -> str:
+        """インデックス済みのファイル一覧をローカルで検索します（SSH接続は行いません）"""
+        key = RemoteFileIndex.host_key(host, port, username)
+        directory = posixpath.normpath(directory) if directory.startswith('/') else posixpath.normpath('/' + directory)
+        indexed = self.file_index.indexed_root(key, directory)
+        if indexed is None:
+            return f"エラー: {host} の {directory} はインデックス化されていません。先に ssh_build_file_index を実行してください。"
+        
+        if query == "pattern":
+            rows = self.file_index.search(key, pattern, directory, limit)
+            title = f"名前が {pattern} に一致するファイル"
+        elif query == "hidden":
+            rows = self.file_index.hidden(key, directory, limit)
+            title = "隠しファイル・ディレクトリ"
+        elif query == "size":
+            rows = self.file_index.by_size(key, directory, min_size, limit)
+            title = f"{min_size} bytes以上のファイル（大きい順）"
+        elif query == "dirs":
+            counts = self.file_index.directory_counts(key, directory, limit)
+            result_text = f"📂 {directory} のディレクトリ別集計（{host}）:\n"
+            for path, files, dirs, size, direct in counts:
+                label = f"{path}（直下）" if direct else f"{path}/"
+                result_text += f"  {label}: ファイル {files}, ディレクトリ {dirs}, 合計 {size} bytes\n"
+            return result_text.strip()
+        else:
+            return "エラー: query は pattern, hidden, size, dirs のいずれかを指定してください。"
+        
+        indexed_at = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(indexed["indexed_at"]))
+        result_text = f"🔎 {title}: {len(rows)}件（{host} {directory}、インデックス作成: {indexed_at}）\n"
+        for path, size, mode, mtime, owner in rows:
+            modified = time.strftime('%Y-%m-%d %H:%M', time.localtime(mtime))
+            result_text += f"  {mode} {owner:<10} {size:>10} {modified} {path}\n"
+        if len(rows) >= limit:
+            result_text += f"  ... (先頭{limit}件のみ表示)\n"
+        return result_text.strip()
+
     async def comprehensive_exploration(self, host: str, port: int, username: str, password: str) -> str:
         """リモートサーバーのflag*.txtやroot.txtファイルを網羅的に検索します"""
         return await self.search_flag_files(host, port, username, password)
 
+    async def _host_in_scope(self, host: str) -> bool:
+        """ホスト名・IPアドレス、または解決したアドレスが診断スコープ内か"""
+        if self.scope.contains_host(host):
+            return True
+        if self.host_resolver is not None:
+            address = await self.host_resolver(host)
+            if address and self.scope.contains_ip(address):
+                return True
+        return False
+
+    async def explore_hosts(self, hosts: List[str], port: int, username: str, password: str,
+                            action: str = "comprehensive", concurrency: Optional[int] = None,
+                            host_timeout: Optional[int] = None, progress: Optional[ProgressCallback] = None) -> str:
+        """同じ認証情報で複数ホストに対して読み取り専用の調査を並行実行し、結果をまとめて返します"""
+        actions = {
+            "current_directory": self.explore_current_directory,
+            "flag_files": self.search_flag_files,
+            "system_directories": self.explore_system_directories,
+            "hidden_files": self.check_hidden_files,
+            "comprehensive": self.comprehensive_exploration,
+        }
+        if action not in actions:
+            return f"エラー: action は {', '.join(actions)} のいずれかを指定してください。"
+        hosts = list(dict.fromkeys(host.strip() for host in hosts if host.strip()))
+        if not hosts:
+            return "エラー: 調査するホストを指定してください。"
+        if len(hosts) > self.fanout_max_hosts:
+            return f"エラー: ホスト数が多すぎます（{len(hosts)}件、上限 {self.fanout_max_hosts}件）。"
+        timeout = host_timeout or self.fanout_host_timeout
+        semaphore = asyncio.Semaphore(concurrency or self.fanout_concurrency)
+        explore = actions[action]
+        
+        async def run(host: str):
+            if not await self._host_in_scope(host):
+                return host, "out_of_scope", f"スコープ外のためスキップしました（{self.scope.describe()}）", 0.0
+            async with semaphore:
+                started = time.monotonic()
+                try:
+                    output = await asyncio.wait_for(explore(host, port, username, password), timeout=timeout)
+                except asyncio.TimeoutError:
+                    return host, "timeout", f"{timeout}秒以内に完了しませんでした。", time.monotonic() - started
+                failed = output.startswith("エラー") or output.startswith("予期せぬエラー")
+                return host, "error" if failed else "ok", output, time.monotonic() - started
+        
+        # 終わったホストから順に結果を受け取る
+        results = {}
+        for finished in asyncio.as_completed([run(host) for host in hosts]):
+            host, status, output, elapsed = await finished
+            results[host] = (status, output, elapsed)
+            if progress:
+                await progress(len(results), len(hosts), f"SSH exploration: {len(results)}/{len(hosts)} hosts done",
+                               f"{host}: {status}")
+        
+        labels = {"ok": "✅ 成功", "error": "❌ 失敗", "timeout": "⏱️ タイムアウト", "out_of_scope": "🚫 スコープ外"}
+        counts = {status: sum(1 for result in results.values() if result[0] == status) for status in labels}
+        summary = ", ".join(f"{labels[status]} {count}" for status, count in counts.items() if count)
+        result_text = f"🖧 複数ホスト調査（{action}）: {len(hosts)}ホスト — {summary}\n\n"
+        for host in hosts:
+            status, output, elapsed = results[host]
+            result_text += f"=== {host}:{port} [{labels[status]}{f', {elapsed:.1f}秒' if status != 'out_of_scope' else ''}] ===\n"
+            result_text += output.strip() + "\n\n"
+        return result_text.strip()
+
 
 
 
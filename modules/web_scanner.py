@@ -1,21 +1,60 @@
 import aiohttp
+from aiohttp.abc import AbstractResolver
 import asyncio
+from multidict import CIMultiDict
 import sys
 import time
 import re
 from urllib.parse import urljoin, urlparse
-from typing import List, Dict, Optional, Set
+from typing import List, Dict, Optional, Set, Tuple
 from playwright.async_api import async_playwright
 import os
 
+from utils.favicon_index import FaviconIndex, favicon_hashes
+from utils.robots_sitemap import SitemapStreamParser, parse_robots_txt, robots_seed_paths
+from utils.http_cache import HTTPCache
+from utils.progress import ProgressCallback
+
 
 class WebScanner:
-    def __init__(self):
+    def __init__(self, resolver: Optional[AbstractResolver] = None):
         self.timeout = aiohttp.ClientTimeout(total=15)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Compatible Security Scanner)'
         }
         
+        # 共有セッション（コネクションプール）の設定
+        self.max_connections = 100
+        self.max_connections_per_host = 20
+        self._session: Optional[aiohttp.ClientSession] = None
+        # 名前解決に使うリゾルバー（Noneの場合はaiohttpの既定）
+        self.resolver = resolver
+        
+        # バッチスキャンのデフォルト同時実行数
+        self.batch_max_concurrency = 10
+        self.batch_per_host_limit = 2
+        self.batch_max_targets = 500
+        
+        # faviconフィンガープリント（ホストごとに1回だけ取得する）
+        self.favicon_index = FaviconIndex()
+        self.favicon_max_size = 1024 * 1024
+        self._favicon_tasks: Dict[str, asyncio.Task] = {}
+        
+        # robots.txt・サイトマップ解析の上限
+        self.robots_max_size = 512 * 1024
+        self.sitemap_max_files = 50
+        self.sitemap_max_urls = 50000
+        self.sitemap_max_bytes = 50 * 1024 * 1024
+        self.seed_max_paths = 200
+        
+        # パス探索に使うHTTPメソッド（ホストごとに判定してキャッシュ）
+        # "HEAD": HEADが正しく扱われる / "RANGE": Range: bytes=0-0 付きGETで代用
+        self._probe_methods: Dict[str, str] = {}
+        self._probe_method_tasks: Dict[str, asyncio.Task] = {}
+        
+        # 条件付きリクエスト（ETag/Last-Modified）用のディスクキャッシュ
+        self.http_cache = HTTPCache()
+        
         # 一般的なディレクトリ・ファイル名
         self.common_dirs = [
             'admin', 'administrator', 'login', 'panel', 'control', 'dashboard',
@@ -39,6 +78,18 @@ class WebScanner:
             'backup.sql', 'database.sql', 'dump.sql'
         ]
         
+        # セキュリティヘッダーとその説明
+        self.security_headers = {
+            'X-Frame-Options': 'クリックジャッキング対策',
+            'X-Content-Type-Options': 'MIME型推測攻撃対策',
+            'X-XSS-Protection': 'XSS攻撃対策（古いブラウザ用）',
+            'Strict-Transport-Security': 'HTTPS強制',
+            'Content-Security-Policy': 'コンテンツ読み込み制御',
+            'Referrer-Policy': 'リファラー情報制御',
+            'Permissions-Policy': '機能へのアクセス制御',
+            'Cross-Origin-Embedder-Policy': 'クロスオリジン埋め込み制御'
+        }
+        
         # 技術検出パターン
         self.tech_patterns = {
             'WordPress': [
@@ -104,7 +155,32 @@ class WebScanner:
             return url
         except:
             return None
-    
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """全スキャンで共有するセッションを取得（コネクションを再利用する）"""
+        if self._session is None or self._session.closed:
+            connector_options = {}
+            if self.resolver is not None:
+                # TTLは共有リゾルバー側で管理するため、aiohttp独自のDNSキャッシュは無効化する
+                connector_options = {"resolver": self.resolver, "use_dns_cache": False}
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+                **connector_options
+            )
+            self._session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                headers=self.headers,
+                connector=connector
+            )
+        return self._session
+
+    async def close(self):
+        """共有セッションを閉じる"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
     async def get_status(self) -> str:
         """Webスキャナーの状態を確認"""
         try:
@@ -124,225 +200,625 @@ class WebScanner:
             return "Error: Invalid URL format"
         
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout, headers=self.headers) as session:
-                start_time = time.time()
-                async with session.head(validated_url, allow_redirects=True) as response:
-                    response_time = round((time.time() - start_time) * 1000, 2)
-                    
-                    headers_info = [
-                        "=== HTTP HEADERS ===",
-                        f"URL: {str(response.url)}",
-                        f"Status: {response.status} {response.reason}",
-                        f"Response Time: {response_time}ms",
-                        "",
-                        "Response Headers:"
-                    ]
-                    for header, value in response.headers.items():
-                        headers_info.append(f"  {header}: {value}")
-                    
-                    return "\n".join(headers_info)
+            session = await self._get_session()
+            start_time = time.time()
+            async with session.head(validated_url, allow_redirects=True) as response:
+                response_time = round((time.time() - start_time) * 1000, 2)
+                
+                headers_info = [
+                    "=== HTTP HEADERS ===",
+                    f"URL: {str(response.url)}",
+                    f"Status: {response.status} {response.reason}",
+                    f"Response Time: {response_time}ms",
+                    "",
+                    "Response Headers:"
+                ]
+                for header, value in response.headers.items():
+                    headers_info.append(f"  {header}: {value}")
+                
+                return "\n".join(headers_info)
                     
         except aiohttp.ClientError as e:
             return f"Error connecting to {validated_url}: {str(e)}"
         except Exception as e:
             return f"Error checking headers: {str(e)}"
     
-    async def check_security_headers(self, url: str) -> str:
-        """セキュリティ関連のHTTPヘッダーをチェック"""
+    def _origin(self, url: str) -> str:
+        """URLからスキーム+ホスト部分を取り出す"""
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}".lower()
+    
+    async def _range_get(self, url: str, allow_redirects: bool, timeout=None) -> Tuple[int, Dict, str]:
+        """Range: bytes=0-0 付きGETでステータスとヘッダーだけを取得し、すぐに接続を解放"""
+        session = await self._get_session()
+        kwargs = {"headers": {"Range": "bytes=0-0"}, "allow_redirects": allow_redirects}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        async with session.get(url, **kwargs) as response:
+            status = response.status
+            headers = dict(response.headers)
+            final_url = str(response.url)
+            if status == 206:
+                # 1バイトだけなので読み切ってコネクションをプールに戻す
+                await response.read()
+                response.release()
+            else:
+                # Rangeが無視された場合は本文を読まずに接続を閉じる
+                response.close()
+        # 部分取得の応答は通常の応答に読み替える
+        if status in (206, 416):
+            status = 200
+        return status, headers, final_url
+    
+    async def _detect_probe_method(self, origin: str) -> str:
+        """HEADが正しく扱われるかをトップページで判定"""
+        session = await self._get_session()
+        base_url = f"{origin}/"
+        try:
+            async with session.head(base_url, allow_redirects=False) as response:
+                head_status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return "RANGE"
+        
+        if head_status in (405, 501):
+            return "RANGE"
+        
+        try:
+            get_status, _, _ = await self._range_get(base_url, allow_redirects=False)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return "HEAD"
+        
+        # HEADとGETで結果が異なるサーバーではGETの結果を信頼する
+        return "HEAD" if head_status == get_status else "RANGE"
+    
+    async def _probe_method(self, url: str) -> str:
+        """ホストごとにキャッシュしたパス探索用メソッドを取得"""
+        origin = self._origin(url)
+        if origin in self._probe_methods:
+            return self._probe_methods[origin]
+        task = self._probe_method_tasks.get(origin)
+        if task is None:
+            task = asyncio.ensure_future(self._detect_probe_method(origin))
+            task.add_done_callback(lambda done: self._finish_probe_method(origin, done))
+            self._probe_method_tasks[origin] = task
+        method = await asyncio.shield(task)
+        return self._probe_methods.get(origin, method)
+    
+    def _finish_probe_method(self, origin: str, task: asyncio.Task):
+        """判定が終わったタスクを外し、成功した場合だけ結果をキャッシュする（例外の場合は次回判定し直す）"""
+        if self._probe_method_tasks.get(origin) is task:
+            del self._probe_method_tasks[origin]
+        if not task.cancelled() and task.exception() is None:
+            self._probe_methods.setdefault(origin, task.result())
+    
+    async def _probe(self, url: str, allow_redirects: bool = False, timeout=None) -> Tuple[int, Dict, str]:
+        """本文を取得せずにステータスとヘッダーを取得（HEAD、非対応ならRange付きGET）"""
+        if await self._probe_method(url) == "HEAD":
+            session = await self._get_session()
+            kwargs = {"allow_redirects": allow_redirects}
+            if timeout is not None:
+                kwargs["timeout"] = timeout
+            async with session.head(url, **kwargs) as response:
+                if response.status not in (405, 501):
+                    return response.status, dict(response.headers), str(response.url)
+            # HEADが拒否された場合は以降このホストではRange付きGETを使う
+            self._probe_methods[self._origin(url)] = "RANGE"
+        return await self._range_get(url, allow_redirects, timeout)
+    
+    async def _fetch_security_headers(self, validated_url: str) -> Dict:
+        """セキュリティヘッダーの設定状況を取得（整形前の生データ）"""
+        status, headers, final_url = await self._probe(validated_url, allow_redirects=True)
+        present = {h.lower(): v for h, v in headers.items()}
+        found = {}
+        missing = []
+        for header in self.security_headers:
+            if header.lower() in present:
+                found[header] = present[header.lower()]
+            else:
+                missing.append(header)
+        return {
+            "url": final_url,
+            "status": status,
+            "found": found,
+            "missing": missing
+        }
+    
+    def _format_security_headers(self, info: Dict) -> str:
+        """セキュリティヘッダーの分析結果を整形"""
+        result = [
+            "=== SECURITY HEADERS ANALYSIS ===",
+            f"URL: {info['url']}",
+            f"Status: {info['status']}",
+            "=" * 50
+        ]
+        
+        for header, description in self.security_headers.items():
+            if header in info["found"]:
+                result.append(f"✅ {header}")
+                result.append(f"   Value: {info['found'][header]}")
+                result.append(f"   説明: {description}")
+            else:
+                result.append(f"❌ {header}: 未設定")
+                result.append(f"   説明: {description}")
+            result.append("")
+        
+        found_count = len(info["found"])
+        result.append(f"セキュリティヘッダー設定状況: {found_count}/{len(self.security_headers)} 個設定済み")
+        
+        if found_count < len(self.security_headers) // 2:
+            result.append("⚠️  セキュリティヘッダーの設定が不十分です")
+        else:
+            result.append("✅ 良好なセキュリティヘッダー設定です")
+        
+        return "\n".join(result)
+    
+    async def _security_headers_result(self, url: str) -> Tuple[str, Optional[Dict]]:
+        """セキュリティヘッダーチェックを実行し、整形結果と生データを返す"""
         validated_url = self._validate_url(url)
         if not validated_url:
-            return "Error: Invalid URL format"
+            return "Error: Invalid URL format", None
         
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout, headers=self.headers) as session:
-                async with session.head(validated_url, allow_redirects=True) as response:
-                    security_headers = {
-                        'X-Frame-Options': 'クリックジャッキング対策',
-                        'X-Content-Type-Options': 'MIME型推測攻撃対策',
-                        'X-XSS-Protection': 'XSS攻撃対策（古いブラウザ用）',
-                        'Strict-Transport-Security': 'HTTPS強制',
-                        'Content-Security-Policy': 'コンテンツ読み込み制御',
-                        'Referrer-Policy': 'リファラー情報制御',
-                        'Permissions-Policy': '機能へのアクセス制御',
-                        'Cross-Origin-Embedder-Policy': 'クロスオリジン埋め込み制御'
-                    }
-                    
-                    result = [
-                        "=== SECURITY HEADERS ANALYSIS ===",
-                        f"URL: {str(response.url)}",
-                        f"Status: {response.status}",
-                        "=" * 50
-                    ]
-                    
-                    found_count = 0
-                    for header, description in security_headers.items():
-                        if header.lower() in [h.lower() for h in response.headers]:
-                            result.append(f"✅ {header}")
-                            result.append(f"   Value: {response.headers.get(header)}")
-                            result.append(f"   説明: {description}")
-                            found_count += 1
-                        else:
-                            result.append(f"❌ {header}: 未設定")
-                            result.append(f"   説明: {description}")
-                        result.append("")
-                    
-                    result.append(f"セキュリティヘッダー設定状況: {found_count}/{len(security_headers)} 個設定済み")
-                    
-                    if found_count < len(security_headers) // 2:
-                        result.append("⚠️  セキュリティヘッダーの設定が不十分です")
-                    else:
-                        result.append("✅ 良好なセキュリティヘッダー設定です")
-                    
-                    return "\n".join(result)
+            info = await self._fetch_security_headers(validated_url)
+            return self._format_security_headers(info), info
                     
         except aiohttp.ClientError as e:
-            return f"Error connecting to {validated_url}: {str(e)}"
+            return f"Error connecting to {validated_url}: {str(e)}", None
         except Exception as e:
-            return f"Error checking security headers: {str(e)}"
+            return f"Error checking security headers: {str(e)}", None
+    
+    async def check_security_headers(self, url: str) -> str:
+        """セキュリティ関連のHTTPヘッダーをチェック"""
+        text, _ = await self._security_headers_result(url)
+        return text
+    
+    @staticmethod
+    async def _read_limited(response: aiohttp.ClientResponse, max_size: int) -> Tuple[bytes, bool]:
+        """本文をEOFまたはmax_sizeバイトまで読み込む（max_sizeを超えた場合は切り詰めてTrueを返す）"""
+        chunks = []
+        received = 0
+        async for chunk in response.content.iter_chunked(65536):
+            chunks.append(chunk)
+            received += len(chunk)
+            if received > max_size:
+                return b"".join(chunks)[:max_size], True
+        return b"".join(chunks), False
+    
+    async def _cached_get(self, url: str, allow_redirects: bool = True, max_size: Optional[int] = None) -> Dict:
+        """キャッシュの検証子で条件付きGETを行い、304ならキャッシュ済みの本文を返す"""
+        entry = self.http_cache.get(url)
+        session = await self._get_session()
+        async with session.get(url, allow_redirects=allow_redirects,
+                               headers=self.http_cache.conditional_headers(entry)) as response:
+            if response.status == 304 and entry:
+                self.http_cache.hits += 1
+                return {
+                    "url": entry["final_url"],
+                    "status": entry["status"],
+                    "reason": "OK (304 Not Modified, served from cache)",
+                    "headers": CIMultiDict(entry["headers"]),
+                    "body": self.http_cache.load_body(entry),
+                    "charset": entry["charset"],
+                    "from_cache": True
+                }
+            
+            self.http_cache.misses += 1
+            max_size = max_size or self.http_cache.max_body_size
+            body, truncated = await self._read_limited(response, max_size)
+            headers = [[k, v] for k, v in response.headers.items()]
+            if not truncated:
+                self.http_cache.store(url, str(response.url), response.status, headers, body, response.charset)
+            return {
+                "url": str(response.url),
+                "status": response.status,
+                "reason": response.reason,
+                "headers": CIMultiDict(headers),
+                "body": body,
+                "charset": response.charset,
+                "from_cache": False,
+                "truncated": truncated
+            }
+    
+    def _decode_body(self, fetched: Dict) -> str:
+        """取得した本文を文字列に変換"""
+        try:
+            return fetched["body"].decode(fetched.get("charset") or "utf-8", errors="ignore")
+        except LookupError:
+            return fetched["body"].decode("utf-8", errors="ignore")
+    
+    async def _fetch_robots(self, origin: str) -> Tuple[int, Optional[Dict]]:
+        """robots.txtを取得して解析（ステータスと解析結果を返す）"""
+        fetched = await self._cached_get(f"{origin}/robots.txt", max_size=self.robots_max_size)
+        if fetched["status"] != 200:
+            return fetched["status"], None
+        return fetched["status"], parse_robots_txt(self._decode_body(fetched))
     
     async def check_robots_txt(self, url: str) -> str:
-        """robots.txtファイルの内容を確認"""
+        """robots.txtファイルを取得し、ルールとSitemap指定を解析"""
         try:
             parsed = urlparse(url)
-            robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+            origin = f"{parsed.scheme}://{parsed.netloc}"
+            robots_url = f"{origin}/robots.txt"
             
-            async with aiohttp.ClientSession(timeout=self.timeout, headers=self.headers) as session:
-                async with session.get(robots_url) as response:
-                    result = [
-                        "=== ROBOTS.TXT ANALYSIS ===",
-                        f"URL: {robots_url}",
-                        f"Status: {response.status}",
-                        ""
-                    ]
-                    
-                    if response.status == 200:
-                        content = await response.text()
-                        result.append("Content:")
-                        result.append("-" * 40)
-                        result.append(content[:2000])
-                        if len(content) > 2000:
-                            result.append("... (truncated)")
-                    elif response.status == 404:
-                        result.append("robots.txt not found (404)")
-                    else:
-                        result.append(f"Unexpected status: {response.status}")
-                    
-                    return "\n".join(result)
+            status, robots = await self._fetch_robots(origin)
+            result = [
+                "=== ROBOTS.TXT ANALYSIS ===",
+                f"URL: {robots_url}",
+                f"Status: {status}",
+                ""
+            ]
+            
+            if robots is not None:
+                if robots["groups"]:
+                    result.append("Rules:")
+                    for group in robots["groups"]:
+                        result.append(f"  User-agent: {', '.join(group['user_agents'])}")
+                        for path in group["disallow"]:
+                            result.append(f"    Disallow: {path}")
+                        for path in group["allow"]:
+                            result.append(f"    Allow: {path}")
+                        if group["crawl_delay"]:
+                            result.append(f"    Crawl-delay: {group['crawl_delay']}")
+                else:
+                    result.append("No rules defined")
+                
+                if robots["sitemaps"]:
+                    result.append("")
+                    result.append("Sitemaps:")
+                    result.extend(f"  {sitemap}" for sitemap in robots["sitemaps"])
+                
+                seeds = robots_seed_paths(robots)
+                if seeds:
+                    result.append("")
+                    result.append(f"Interesting paths ({len(seeds)}, used as directory scan candidates):")
+                    result.extend(f"  {path}" for path in seeds)
+            elif status == 404:
+                result.append("robots.txt not found (404)")
+            else:
+                result.append(f"Unexpected status: {status}")
+            
+            return "\n".join(result)
                     
         except aiohttp.ClientError as e:
             return f"Error checking robots.txt: {str(e)}"
         except Exception as e:
             return f"Error: {str(e)}"
     
+    async def _stream_sitemap(self, sitemap_url: str, on_entry) -> int:
+        """サイトマップを逐次ダウンロード・解析し、エントリごとにコールバックを呼ぶ"""
+        session = await self._get_session()
+        parser = SitemapStreamParser()
+        entry = self.http_cache.get(sitemap_url)
+        async with session.get(sitemap_url, headers=self.http_cache.conditional_headers(entry)) as response:
+            if response.status == 304 and entry:
+                # 変更がなければキャッシュ済みの本文を同じパーサーに流す
+                self.http_cache.hits += 1
+                body = self.http_cache.load_body(entry)
+                chunks = (body[i:i + 65536] for i in range(0, len(body), 65536))
+                complete = True
+            elif response.status != 200:
+                return response.status
+            else:
+                self.http_cache.misses += 1
+                chunks = response.content.iter_chunked(65536)
+                complete = False
+            
+            received = 0
+            buffered = []
+            stopped = False
+            for_cache = not complete
+            async for chunk in self._iterate_chunks(chunks):
+                received += len(chunk)
+                if for_cache:
+                    # キャッシュに収まる大きさの間だけ本文を保持する
+                    if received <= self.http_cache.max_body_size:
+                        buffered.append(chunk)
+                    else:
+                        for_cache = False
+                        buffered = []
+                for kind, loc in parser.feed(chunk):
+                    if not on_entry(kind, loc):
+                        stopped = True
+                        break
+                if stopped or received >= self.sitemap_max_bytes:
+                    break
+            else:
+                if for_cache:
+                    headers = [[k, v] for k, v in response.headers.items()]
+                    self.http_cache.store(sitemap_url, str(response.url), 200, headers, b"".join(buffered))
+            
+            if not stopped:
+                for kind, loc in parser.close():
+                    if not on_entry(kind, loc):
+                        break
+            return 200
+    
+    async def _iterate_chunks(self, chunks):
+        """同期・非同期どちらのイテレータからもチャンクを取り出す"""
+        if hasattr(chunks, "__aiter__"):
+            async for chunk in chunks:
+                yield chunk
+        else:
+            for chunk in chunks:
+                yield chunk
+    
+    async def discover_seed_paths(self, url: str) -> Dict:
+        """robots.txtとサイトマップから、実在するコンテンツのパスを収集"""
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        host = parsed.netloc.lower()
+        
+        discovery = {"robots_paths": [], "sitemaps": [], "sitemap_urls": 0, "seeds": []}
+        try:
+            _, robots = await self._fetch_robots(origin)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            robots = None
+        
+        if robots:
+            discovery["robots_paths"] = robots_seed_paths(robots)
+            queue = list(robots["sitemaps"])
+        else:
+            queue = []
+        if not queue:
+            queue = [f"{origin}/sitemap.xml"]
+        
+        # サイトマップ内のURLからディレクトリを集計（出現数の多い順に優先）
+        directory_counts: Dict[str, int] = {}
+        visited: Set[str] = set()
+        
+        def on_entry(kind: str, loc: str) -> bool:
+            loc_parsed = urlparse(loc)
+            if loc_parsed.netloc.lower() != host:
+                return True
+            if kind == "sitemap":
+                if loc not in visited and loc not in queue:
+                    queue.append(loc)
+                return True
+            discovery["sitemap_urls"] += 1
+            path = loc_parsed.path or "/"
+            parts = [p for p in path.split('/') if p]
+            for depth in range(1, len(parts)):
+                directory = '/' + '/'.join(parts[:depth]) + '/'
+                directory_counts[directory] = directory_counts.get(directory, 0) + 1
+            if parts:
+                directory_counts.setdefault(path, 0)
+            return discovery["sitemap_urls"] < self.sitemap_max_urls
+        
+        while queue and len(visited) < self.sitemap_max_files and discovery["sitemap_urls"] < self.sitemap_max_urls:
+            sitemap_url = queue.pop(0)
+            if sitemap_url in visited:
+                continue
+            visited.add(sitemap_url)
+            try:
+                status = await self._stream_sitemap(sitemap_url, on_entry)
+                if status == 200:
+                    discovery["sitemaps"].append(sitemap_url)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                continue
+        
+        seeds = list(discovery["robots_paths"])
+        seen = {p.strip('/') for p in seeds}
+        for path, _ in sorted(directory_counts.items(), key=lambda x: (-x[1], x[0])):
+            if len(seeds) >= self.seed_max_paths:
+                break
+            if path.strip('/') in seen:
+                continue
+            seen.add(path.strip('/'))
+            seeds.append(path)
+        discovery["seeds"] = seeds
+        return discovery
+    
     async def get_basic_info(self, url: str) -> str:
         """Webサイトの基本情報を取得"""
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout, headers=self.headers) as session:
-                start_time = time.time()
-                async with session.get(url, allow_redirects=True) as response:
-                    response_time = round((time.time() - start_time) * 1000, 2)
-                    
-                    result = [
-                        "=== WEB BASIC INFORMATION ===",
-                        f"URL: {str(response.url)}",
-                        f"Status: {response.status} {response.reason}",
-                        f"Response Time: {response_time}ms",
-                        ""
-                    ]
-                    
-                    important_headers = ['Server', 'Content-Type', 'Content-Length', 'Last-Modified', 'ETag']
-                    result.append("Important Headers:")
-                    for header in important_headers:
-                        if header in response.headers:
-                            result.append(f"  {header}: {response.headers[header]}")
-                    
-                    if str(response.url).startswith('https://'):
-                        result.append("SSL/TLS: Enabled")
-                    
-                    content_length = response.headers.get('Content-Length')
-                    if content_length:
-                        result.append(f"Content Size: {round(int(content_length) / 1024, 2)} KB")
-                    
-                    return "\n".join(result)
+            session = await self._get_session()
+            start_time = time.time()
+            async with session.get(url, allow_redirects=True) as response:
+                response_time = round((time.time() - start_time) * 1000, 2)
+                
+                result = [
+                    "=== WEB BASIC INFORMATION ===",
+                    f"URL: {str(response.url)}",
+                    f"Status: {response.status} {response.reason}",
+                    f"Response Time: {response_time}ms",
+                    ""
+                ]
+                
+                important_headers = ['Server', 'Content-Type', 'Content-Length', 'Last-Modified', 'ETag']
+                result.append("Important Headers:")
+                for header in important_headers:
+                    if header in response.headers:
+                        result.append(f"  {header}: {response.headers[header]}")
+                
+                if str(response.url).startswith('https://'):
+                    result.append("SSL/TLS: Enabled")
+                
+                content_length = response.headers.get('Content-Length')
+                if content_length:
+                    result.append(f"Content Size: {round(int(content_length) / 1024, 2)} KB")
+                
+                return "\n".join(result)
                     
         except aiohttp.ClientError as e:
             return f"Error connecting to {url}: {str(e)}"
         except Exception as e:
             return f"Error getting basic info: {str(e)}"
     
-    async def technology_detection(self, url: str) -> str:
-        """Webサイトで使用されている技術を検出"""
+    async def _fetch_favicon(self, origin: str) -> Optional[Dict]:
+        """/favicon.ico を取得してハッシュを計算し、フィンガープリント表と照合"""
+        favicon_url = f"{origin}/favicon.ico"
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout, headers=self.headers) as session:
-                async with session.get(url, allow_redirects=True) as response:
-                    content = await response.text()
-                    headers_str = str(response.headers)
-                    
-                    result = [
-                        "=== TECHNOLOGY DETECTION ===",
-                        f"URL: {str(response.url)}",
-                        ""
-                    ]
-                    
-                    detected_techs = {}
-                    full_content = headers_str + "\n" + content
-                    
-                    for tech_name, patterns in self.tech_patterns.items():
-                        if any(re.search(p, full_content, re.IGNORECASE) for p in patterns):
-                            detected_techs[tech_name] = True
-                    
-                    if detected_techs:
-                        result.append("Detected Technologies:")
-                        for tech in detected_techs:
-                            result.append(f"  ✅ {tech}")
-                    else:
-                        result.append("No specific technologies detected.")
-                    
-                    return "\n".join(result)
-                    
-        except aiohttp.ClientError as e:
-            return f"Error connecting to {url}: {str(e)}"
-        except Exception as e:
-            return f"Error during technology detection: {str(e)}"
+            session = await self._get_session()
+            async with session.get(favicon_url, allow_redirects=True) as response:
+                if response.status != 200:
+                    return None
+                data, truncated = await self._read_limited(response, self.favicon_max_size)
+                if not data or truncated:
+                    return None
+                hashes = favicon_hashes(data)
+                return {
+                    "url": favicon_url,
+                    "mmh3": hashes["mmh3"],
+                    "md5": hashes["md5"],
+                    "match": self.favicon_index.lookup(hashes)
+                }
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+    
+    async def _favicon_fingerprint(self, url: str) -> Optional[Dict]:
+        """ホスト単位でキャッシュしたfaviconフィンガープリントを取得"""
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}".lower()
+        task = self._favicon_tasks.get(origin)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_favicon(origin))
+            task.add_done_callback(lambda done: self._forget_failed_favicon(origin, done))
+            self._favicon_tasks[origin] = task
+        return await asyncio.shield(task)
     
-    async def directory_scan(self, url: str, wordlist: str = "common") -> str:
-        """ディレクトリ・ファイルスキャン"""
-        if wordlist == "common": targets = self.common_dirs + self.common_files
-        elif wordlist == "dirs": targets = self.common_dirs
-        elif wordlist == "files": targets = self.common_files
-        else: targets = self.common_dirs + self.common_files
+    def _forget_failed_favicon(self, origin: str, task: asyncio.Task):
+        """取得できなかった（Noneまたは例外の）結果はキャッシュせず、次回のスキャンで再取得する"""
+        if task.cancelled() or task.exception() is not None or task.result() is None:
+            if self._favicon_tasks.get(origin) is task:
+                del self._favicon_tasks[origin]
+    
+    async def _detect_technologies(self, url: str) -> Dict:
+        """技術検出を行い、検出結果を返す（整形前の生データ）"""
+        fetched = await self._cached_get(url, allow_redirects=True)
+        content = self._decode_body(fetched)
+        headers_str = "\n".join(f"{k}: {v}" for k, v in fetched["headers"].items())
+        full_content = headers_str + "\n" + content
+        final_url = fetched["url"]
+        status = fetched["status"]
+        
+        detected_techs = []
+        for tech_name, patterns in self.tech_patterns.items():
+            if any(re.search(p, full_content, re.IGNORECASE) for p in patterns):
+                detected_techs.append(tech_name)
+        
+        favicon = await self._favicon_fingerprint(final_url)
+        if favicon and favicon["match"] and favicon["match"] not in detected_techs:
+            detected_techs.append(favicon["match"])
         
+        return {
+            "url": final_url,
+            "status": status,
+            "technologies": detected_techs,
+            "favicon": favicon,
+            "from_cache": fetched["from_cache"]
+        }
+    
+    def _format_technologies(self, info: Dict) -> str:
+        """技術検出結果を整形"""
         result = [
-            "=== DIRECTORY/FILE SCAN ===",
-            f"Target: {url}",
-            f"Wordlist: {wordlist} ({len(targets)} entries)",
-            "Status codes: 200=Found, 403=Forbidden, 401=Auth Required",
+            "=== TECHNOLOGY DETECTION ===",
+            f"URL: {info['url']}",
             ""
         ]
+        if info.get("from_cache"):
+            result.insert(2, "Cache: 304 Not Modified (analyzed cached page)")
+        
+        if info["technologies"]:
+            result.append("Detected Technologies:")
+            for tech in info["technologies"]:
+                result.append(f"  ✅ {tech}")
+        else:
+            result.append("No specific technologies detected.")
+        
+        favicon = info.get("favicon")
+        if favicon:
+            result.append("")
+            result.append("Favicon Fingerprint:")
+            result.append(f"  URL: {favicon['url']}")
+            result.append(f"  mmh3: {favicon['mmh3']}")
+            result.append(f"  MD5: {favicon['md5']}")
+            result.append(f"  Match: {favicon['match'] or 'No match in local fingerprint table'}")
         
+        return "\n".join(result)
+    
+    async def _technology_result(self, url: str) -> Tuple[str, Optional[Dict]]:
+        """技術検出を実行し、整形結果と生データを返す"""
+        try:
+            info = await self._detect_technologies(url)
+            return self._format_technologies(info), info
+                    
+        except aiohttp.ClientError as e:
+            return f"Error connecting to {url}: {str(e)}", None
+        except Exception as e:
+            return f"Error during technology detection: {str(e)}", None
+    
+    async def technology_detection(self, url: str) -> str:
+        """Webサイトで使用されている技術を検出"""
+        text, _ = await self._technology_result(url)
+        return text
+    
+    def _wordlist_targets(self, wordlist: str) -> List[str]:
+        """wordlist名から探索対象のパス一覧を取得"""
+        if wordlist == "dirs":
+            return self.common_dirs
+        if wordlist == "files":
+            return self.common_files
+        return self.common_dirs + self.common_files
+    
+    async def _scan_paths(self, url: str, targets: List[str], progress: Optional[ProgressCallback] = None) -> List[str]:
+        """パス一覧を探索し、見つかったパスを「ステータス - パス」形式で返す"""
         found_items = []
+        probe_timeout = aiohttp.ClientTimeout(total=10)
         
-        async def check_path(session, target_path):
+        async def check_path(target_path):
             try:
                 full_url = urljoin(url, target_path)
-                async with session.head(full_url, timeout=10) as response:
-                    if response.status in [200, 403, 401, 301, 302]:
-                        return f"{response.status} - {target_path}"
+                status, _, _ = await self._probe(full_url, timeout=probe_timeout)
+                if status in [200, 403, 401, 301, 302]:
+                    return f"{status} - {target_path}"
             except asyncio.TimeoutError:
                 return None
             except aiohttp.ClientError:
                 return None
             return None
 
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            tasks = [check_path(session, target) for target in targets]
-            for i in range(0, len(tasks), 20):
-                chunk = tasks[i:i+20]
-                results_chunk = await asyncio.gather(*chunk)
-                for item in results_chunk:
-                    if item:
-                        found_items.append(item)
-                print(f"Directory scan progress: {min(i+20, len(tasks))}/{len(tasks)}", file=sys.stderr)
+        tasks = [check_path(target) for target in targets]
+        for i in range(0, len(tasks), 20):
+            chunk = tasks[i:i+20]
+            results_chunk = await asyncio.gather(*chunk)
+            tried = min(i+20, len(tasks))
+            message = f"Directory scan: {tried}/{len(tasks)} paths tried"
+            for item in results_chunk:
+                if item:
+                    found_items.append(item)
+                    if progress:
+                        await progress(tried, len(tasks), message, f"Found: {item} ({url})")
+            print(f"Directory scan progress: {tried}/{len(tasks)}", file=sys.stderr)
+            if progress:
+                await progress(tried, len(tasks), message)
+        
+        return found_items
+    
+    async def _directory_scan_result(self, url: str, wordlist: str = "common", use_seeds: bool = True,
+                                     progress: Optional[ProgressCallback] = None) -> Tuple[str, List[str]]:
+        """ディレクトリスキャンを実行し、整形結果と見つかったパス一覧を返す"""
+        wordlist_targets = self._wordlist_targets(wordlist)
+        
+        # robots.txt・サイトマップから得たパスを優先候補として先頭に追加
+        seeds = []
+        if use_seeds:
+            discovery = await self.discover_seed_paths(url)
+            seeds = discovery["seeds"]
+        seen = {path.strip('/') for path in seeds}
+        targets = seeds + [path for path in wordlist_targets if path.strip('/') not in seen]
+        
+        result = [
+            "=== DIRECTORY/FILE SCAN ===",
+            f"Target: {url}",
+            f"Wordlist: {wordlist} ({len(wordlist_targets)} entries)",
+            f"Seeded from robots.txt/sitemap: {len(seeds)} paths",
+            "Status codes: 200=Found, 403=Forbidden, 401=Auth Required",
+            ""
+        ]
+        
+        found_items = await self._scan_paths(url, targets, progress)
+        probe_method = self._probe_methods.get(self._origin(url), "HEAD")
+        result.insert(-1, f"Probe method: {'HEAD' if probe_method == 'HEAD' else 'GET (Range: bytes=0-0)'}")
 
         if found_items:
             result.append("Found paths:")
@@ -350,7 +826,13 @@ class WebScanner:
         else:
             result.append("No common directories/files found.")
         
-        return "\n".join(result)
+        return "\n".join(result), found_items
+    
+    async def directory_scan(self, url: str, wordlist: str = "common", use_seeds: bool = True,
+                             progress: Optional[ProgressCallback] = None) -> str:
+        """ディレクトリ・ファイルスキャン（robots.txt・サイトマップのパスを優先候補に含める）"""
+        text, _ = await self._directory_scan_result(url, wordlist, use_seeds, progress)
+        return text
 
     async def download_web_file(self, url: str, file_path: str) -> str:
         """指定されたWebサーバー上のファイルのコンテンツをダウンロードします。"""
@@ -362,38 +844,37 @@ class WebScanner:
             # ベースURLとファイルパスを安全に結合
             target_url = urljoin(validated_url, file_path)
             
-            async with aiohttp.ClientSession(timeout=self.timeout, headers=self.headers) as session:
-                async with session.get(target_url) as response:
-                    result = [
-                        f"=== File Download: {file_path} ===",
-                        f"URL: {target_url}",
-                        f"Status: {response.status} {response.reason}",
-                        ""
-                    ]
-                    
-                    if response.status == 200:
-                        # コンテンツタイプがテキストベースか大まかにチェック
-                        content_type = response.headers.get('Content-Type', '').lower()
-                        if 'text' in content_type or 'json' in content_type or 'javascript' in content_type or 'xml' in content_type:
-                            content = await response.text(encoding='utf-8', errors='ignore')
-                            result.append("--- File Content (UTF-8 decoded) ---")
-                            # コンテンツが長すぎる場合に備えて制限をかける
-                            result.append(content[:4000]) 
-                            if len(content) > 4000:
-                                result.append("\n... (Content truncated at 4000 characters)")
-                        else:
-                            # バイナリファイルの場合はその旨を伝える
-                            content_length = response.headers.get('Content-Length', 'N/A')
-                            result.append(f"File appears to be binary (Content-Type: {content_type}).")
-                            result.append(f"Content-Length: {content_length}")
-                            result.append("Binary content cannot be displayed directly.")
-                    
-                    elif response.status == 404:
-                        result.append(f"Error: File not found at {target_url}")
-                    else:
-                        result.append(f"Error: Received unexpected status code {response.status}")
-                    
-                    return "\n".join(result)
+            fetched = await self._cached_get(target_url)
+            result = [
+                f"=== File Download: {file_path} ===",
+                f"URL: {target_url}",
+                f"Status: {fetched['status']} {fetched['reason']}",
+                ""
+            ]
+            
+            if fetched["status"] == 200:
+                # コンテンツタイプがテキストベースか大まかにチェック
+                content_type = fetched["headers"].get('Content-Type', '').lower()
+                if 'text' in content_type or 'json' in content_type or 'javascript' in content_type or 'xml' in content_type:
+                    content = fetched["body"].decode('utf-8', errors='ignore')
+                    result.append("--- File Content (UTF-8 decoded) ---")
+                    # コンテンツが長すぎる場合に備えて制限をかける
+                    result.append(content[:4000]) 
+                    if len(content) > 4000:
+                        result.append("\n... (Content truncated at 4000 characters)")
+                else:
+                    # バイナリファイルの場合はその旨を伝える
+                    content_length = fetched["headers"].get('Content-Length', 'N/A')
+                    result.append(f"File appears to be binary (Content-Type: {content_type}).")
+                    result.append(f"Content-Length: {content_length}")
+                    result.append("Binary content cannot be displayed directly.")
+            
+            elif fetched["status"] == 404:
+                result.append(f"Error: File not found at {target_url}")
+            else:
+                result.append(f"Error: Received unexpected status code {fetched['status']}")
+            
+            return "\n".join(result)
 
         except aiohttp.ClientError as e:
             return f"Error connecting to {validated_url}: {str(e)}"
@@ -427,21 +908,20 @@ class WebScanner:
         workable_url = None
         probe_error_https = ""
         
+        session = await self._get_session()
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.head(https_url, allow_redirects=True) as response:
-                    workable_url = str(response.url).rstrip('/')
-                    print(f"[*] Probe successful with HTTPS: {workable_url}", file=sys.stderr)
+            async with session.head(https_url, allow_redirects=True) as response:
+                workable_url = str(response.url).rstrip('/')
+                print(f"[*] Probe successful with HTTPS: {workable_url}", file=sys.stderr)
         except Exception as e:
             probe_error_https = str(e)
             print(f"[-] Probe failed with HTTPS. Falling back to HTTP... ({e})", file=sys.stderr)
 
             if not workable_url:
                 try:
-                    async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                        async with session.head(http_url, allow_redirects=True) as response:
-                            workable_url = str(response.url).rstrip('/')
-                            print(f"[*] Probe successful with HTTP: {workable_url}", file=sys.stderr)
+                    async with session.head(http_url, allow_redirects=True) as response:
+                        workable_url = str(response.url).rstrip('/')
+                        print(f"[*] Probe successful with HTTP: {workable_url}", file=sys.stderr)
                 except Exception as e2:
                     return f"Error: Both HTTPS and HTTP probes failed.\n- HTTPS Probe Error: {probe_error_https}\n- HTTP Probe Error: {e2}"
         
@@ -450,6 +930,195 @@ class WebScanner:
         else:
             return "Error: Could not establish a connection with either HTTPS or HTTP."
 
+    async def _security_audit_result(self, url: str) -> Tuple[str, Dict]:
+        """Webセキュリティ監査を実行し、整形結果とサマリー用データを返す"""
+        summary = {"status": None, "headers": None, "technologies": None, "paths": None}
+        
+        results = []
+        results.append("=== WEB SECURITY AUDIT ===")
+        results.append(f"Target: {url}")
+        results.append("=" * 50)
+        
+        # 1. 基本情報とレスポンス分析
+        results.append("\n1. Basic Information & Response Analysis")
+        results.append("-" * 45)
+        results.append(await self.get_basic_info(url))
+        
+        # 2. セキュリティヘッダー詳細分析
+        results.append("\n2. Security Headers Analysis")
+        results.append("-" * 35)
+        security_text, security_info = await self._security_headers_result(url)
+        results.append(security_text)
+        if security_info:
+            summary["status"] = security_info["status"]
+            summary["headers"] = len(security_info["found"])
+        
+        # 3. 技術スタック検出
+        results.append("\n3. Technology Stack Detection")
+        results.append("-" * 35)
+        tech_text, tech_info = await self._technology_result(url)
+        results.append(tech_text)
+        if tech_info:
+            summary["status"] = summary["status"] or tech_info["status"]
+            summary["technologies"] = tech_info["technologies"]
+        
+        # 4. 共通ファイル・ディレクトリ検索
+        results.append("\n4. Common Files & Directories")
+        results.append("-" * 35)
+        dir_text, found_paths = await self._directory_scan_result(url, "common")
+        results.append(dir_text)
+        summary["paths"] = len(found_paths)
+        
+        # 5. robots.txt分析
+        results.append("\n5. robots.txt Analysis")
+        results.append("-" * 25)
+        results.append(await self.check_robots_txt(url))
+        
+        return "\n".join(results), summary
+
+    async def security_audit(self, url: str) -> str:
+        """Webセキュリティ監査：包括的なWebアプリケーション セキュリティチェック"""
+        text, _ = await self._security_audit_result(url)
+        return text
+
+    async def _batch_item(self, url: str, mode: str) -> Dict:
+        """バッチスキャンの1URL分を実行"""
+        item = {"url": url, "status": None, "headers": None, "technologies": None,
+                "paths": None, "error": None, "text": ""}
+        start_time = time.time()
+        
+        if mode == "security":
+            item["text"], info = await self._security_headers_result(url)
+            if info:
+                item["status"] = info["status"]
+                item["headers"] = len(info["found"])
+        elif mode == "technology":
+            item["text"], info = await self._technology_result(url)
+            if info:
+                item["status"] = info["status"]
+                item["technologies"] = info["technologies"]
+        else:
+            item["text"], summary = await self._security_audit_result(url)
+            item.update(summary)
+        
+        if item["status"] is None:
+            errors = [line for line in item["text"].split("\n") if line.startswith("Error")]
+            item["error"] = errors[0][:80] if errors else "No response"
+        item["elapsed"] = round(time.time() - start_time, 2)
+        return item
+
+    def _format_batch_row(self, item: Dict) -> str:
+        """バッチスキャン結果のサマリー行を整形"""
+        status = str(item["status"]) if item["status"] is not None else "ERR"
+        headers = f"{item['headers']}/{len(self.security_headers)}" if item["headers"] is not None else "-"
+        techs = ", ".join(item["technologies"]) if item["technologies"] else "-"
+        paths = str(item["paths"]) if item["paths"] is not None else "-"
+        row = f"{item['url']} | {status} | {headers} | {techs} | {paths} | {item.get('elapsed', 0)}s"
+        if item["error"]:
+            row += f" | {item['error']}"
+        return row
+
+    async def batch_scan(self, urls: List[str], mode: str = "audit",
+                         max_concurrency: Optional[int] = None,
+                         per_host_limit: Optional[int] = None,
+                         include_details: bool = False,
+                         progress: Optional[ProgressCallback] = None) -> str:
+        """複数URLを同時実行数の上限付きで並行スキャン
+        
+        Args:
+            urls: スキャン対象のURLリスト
+            mode: "audit"（Webセキュリティ監査）, "security"（セキュリティヘッダー）, "technology"（技術検出）
+            max_concurrency: 全体の同時実行数の上限
+            per_host_limit: 同一ホストに対する同時実行数の上限
+            include_details: 各URLの詳細結果を含めるかどうか
+            progress: 進捗コールバック（URLが1つ終わるごとに呼ぶ）
+        """
+        if mode not in ("audit", "security", "technology"):
+            return "Error: Unsupported mode. Available: audit, security, technology"
+        
+        max_concurrency = max(1, max_concurrency or self.batch_max_concurrency)
+        per_host_limit = max(1, per_host_limit or self.batch_per_host_limit)
+        
+        # URLを正規化し、重複を除去
+        targets = []
+        invalid = []
+        seen = set()
+        for url in urls or []:
+            validated_url = self._validate_url(url)
+            if not validated_url:
+                invalid.append(url)
+                continue
+            key = validated_url.rstrip('/')
+            if key in seen:
+                continue
+            seen.add(key)
+            targets.append(validated_url)
+        
+        if not targets:
+            return "Error: No valid URLs specified"
+        if len(targets) > self.batch_max_targets:
+            return f"Error: Too many targets ({len(targets)}). Maximum is {self.batch_max_targets}"
+        
+        global_semaphore = asyncio.Semaphore(max_concurrency)
+        host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        
+        async def run(url: str) -> Dict:
+            host = urlparse(url).netloc.lower()
+            host_semaphore = host_semaphores.setdefault(host, asyncio.Semaphore(per_host_limit))
+            async with host_semaphore:
+                async with global_semaphore:
+                    try:
+                        return await self._batch_item(url, mode)
+                    except Exception as e:
+                        return {"url": url, "status": None, "headers": None, "technologies": None,
+                                "paths": None, "error": str(e)[:80], "text": f"Error: {str(e)}"}
+        
+        start_time = time.time()
+        completed = []
+        tasks = [asyncio.create_task(run(url)) for url in targets]
+        try:
+            # 完了した順に結果を受け取る
+            for future in asyncio.as_completed(tasks):
+                item = await future
+                completed.append(item)
+                print(f"Batch {mode} progress: {len(completed)}/{len(targets)} - {item['url']}", file=sys.stderr)
+                if progress:
+                    await progress(len(completed), len(targets), f"Batch {mode}: {len(completed)}/{len(targets)} URLs done",
+                                   f"{item['url']}: {item['error'] or item['status']}")
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        elapsed = round(time.time() - start_time, 2)
+        succeeded = sum(1 for item in completed if item["status"] is not None)
+        
+        result = [
+            f"=== BATCH WEB SCAN ({mode.upper()}) ===",
+            f"Targets: {len(targets)} (invalid: {len(invalid)})",
+            f"Concurrency: global {max_concurrency}, per-host {per_host_limit}",
+            f"Completed: {succeeded}/{len(targets)} succeeded in {elapsed}s",
+            "=" * 60,
+            "URL | Status | SecHeaders | Technologies | Paths | Time"
+        ]
+        # サマリー表は入力順で表示
+        order = {url: i for i, url in enumerate(targets)}
+        for item in sorted(completed, key=lambda x: order[x["url"]]):
+            result.append(self._format_batch_row(item))
+        
+        if invalid:
+            result.append("")
+            result.append("Invalid URLs (skipped):")
+            result.extend(f"  '{url}'" for url in invalid)
+        
+        if include_details:
+            result.append("\n=== DETAILS (completion order) ===")
+            for i, item in enumerate(completed, 1):
+                result.append(f"\n[{i}/{len(completed)}] {item['url']}")
+                result.append("-" * 60)
+                result.append(item["text"])
+        
+        return "\n".join(result)
+
     async def take_screenshot(self, url: str, path: str) -> bool:
         """指定されたURLのスクリーンショットを撮影する。HTTPS->HTTPフォールバック対応。"""
         https_url = self._validate_url(url)
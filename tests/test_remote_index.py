@@ -0,0 +1,67 @@
+import unittest
+
+from utils.remote_index import RemoteFileIndex
+
+HOST = "ctf@10.0.0.1:22"
+
+
+def entry(path: str, mode: str, mtime: float, size: int = 0) -> tuple:
+    """find -printf の1エントリ分を (path, dir, name, size, mode, mtime, owner) に変換"""
+    return RemoteFileIndex.parse_entries([path, str(size), mode, str(mtime), "root"])[0]
+
+
+class ApplyDirectoryChangesTest(unittest.TestCase):
+    def setUp(self):
+        self.index = RemoteFileIndex(":memory:")
+        self.index.begin_full(HOST, "/a")
+        self.index.add_entries(HOST, [
+            entry("/a", "drwxr-xr-x", 100.0),
+            entry("/a/f", "-rw-r--r--", 100.0, 1),
+            entry("/a/b", "drwxr-xr-x", 100.0),
+            entry("/a/b/g", "-rw-r--r--", 100.0, 1),
+        ])
+        self.index.finish(HOST, "/a", True)
+
+    def tearDown(self):
+        self.index.close()
+
+    def changed_dirs(self, current_dirs):
+        local_dirs = self.index.directory_mtimes(HOST, "/a")
+        return [row[0] for row in current_dirs if local_dirs.get(row[0]) != row[5]]
+
+    def test_partial_relist_keeps_skipped_child_for_next_run(self):
+        # /a と /a/b が変化し、新しいディレクトリ /a/c ができたが、/a だけを一覧し直せた
+        current_dirs = [
+            entry("/a", "drwxr-xr-x", 200.0),
+            entry("/a/b", "drwxr-xr-x", 200.0),
+            entry("/a/c", "drwxr-xr-x", 200.0),
+        ]
+        changed = self.changed_dirs(current_dirs)
+        self.assertEqual(changed, ["/a", "/a/b", "/a/c"])
+        listings = [
+            entry("/a/f", "-rw-r--r--", 100.0, 1),
+            entry("/a/b", "drwxr-xr-x", 200.0),
+            entry("/a/c", "drwxr-xr-x", 200.0),
+        ]
+        self.index.apply_directory_changes(HOST, current_dirs, changed[:1], [], listings, skipped=changed[1:])
+
+        # 一覧し直せなかったディレクトリは古い更新時刻（または未登録）のままで、次回も再走査の対象になる
+        self.assertEqual(self.changed_dirs(current_dirs), ["/a/b", "/a/c"])
+        # 一覧し直せなかったディレクトリのファイルは消えない
+        self.assertEqual([row[0] for row in self.index.search(HOST, "g", "/a")], ["/a/b/g"])
+
+    def test_full_relist_updates_all_directories(self):
+        current_dirs = [entry("/a", "drwxr-xr-x", 200.0), entry("/a/b", "drwxr-xr-x", 200.0)]
+        changed = self.changed_dirs(current_dirs)
+        listings = [
+            entry("/a/b", "drwxr-xr-x", 200.0),
+            entry("/a/b/h", "-rw-r--r--", 200.0, 1),
+        ]
+        self.index.apply_directory_changes(HOST, current_dirs, changed, [], listings)
+
+        self.assertEqual(self.changed_dirs(current_dirs), [])
+        self.assertEqual([row[0] for row in self.index.search(HOST, "*", "/a")], ["/a", "/a/b", "/a/b/h"])
+
+
+if __name__ == "__main__":
+    unittest.main()
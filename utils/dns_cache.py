@@ -0,0 +1,73 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+class DNSCache:
+    """レコードのTTLに従うDNSキャッシュ（否定応答もキャッシュする）
+
+    TTLは min_ttl 〜 max_ttl の範囲に丸め、否定応答（NXDOMAIN/NOANSWER）は
+    negative_ttl の間だけ保持する。SERVFAILやタイムアウトはキャッシュしない。
+    """
+
+    CACHEABLE_NEGATIVE = ("NXDOMAIN", "NOANSWER")
+
+    def __init__(self, min_ttl: int = 30, max_ttl: int = 3600, negative_ttl: int = 60, max_entries: int = 10000):
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(name: str, record_type: str) -> Tuple[str, str]:
+        return name.lower().rstrip('.'), record_type.upper()
+
+    def _clamp(self, ttl: int) -> int:
+        return max(self.min_ttl, min(self.max_ttl, ttl))
+
+    def get(self, name: str, record_type: str) -> Optional[Dict]:
+        """有効期限内のエントリを返す（レコードのTTLは残り秒数に置き換える）"""
+        key = self._key(name, record_type)
+        item = self._entries.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        expires_at, result = item
+        remaining = int(expires_at - time.monotonic())
+        if remaining <= 0:
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        cached = dict(result)
+        cached["records"] = [dict(record, ttl=min(record["ttl"], remaining)) for record in result["records"]]
+        cached["cached"] = True
+        return cached
+
+    def put(self, name: str, record_type: str, result: Dict):
+        """問い合わせ結果を保存"""
+        if result["records"]:
+            ttl = self._clamp(min(record["ttl"] for record in result["records"]))
+        elif result["status"] in self.CACHEABLE_NEGATIVE:
+            ttl = self._clamp(self.negative_ttl)
+        else:
+            return
+
+        key = self._key(name, record_type)
+        self._entries[key] = (time.monotonic() + ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> str:
+        """キャッシュの利用状況"""
+        return f"{len(self._entries)} entries, {self.hits} hits / {self.misses} misses"
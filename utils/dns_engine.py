@@ -0,0 +1,113 @@
+import asyncio
+import random
+import struct
+from typing import Dict, Optional
+
+import dns.message
+import dns.rcode
+import dns.rdatatype
+
+
+class _EngineProtocol(asyncio.DatagramProtocol):
+    def __init__(self, engine: "UDPQueryEngine"):
+        self.engine = engine
+
+    def datagram_received(self, data: bytes, addr):
+        self.engine._on_response(data)
+
+    def error_received(self, exc):
+        # ICMPエラー等はタイムアウトとして扱う（個別クエリ側で再試行する）
+        pass
+
+
+class UDPQueryEngine:
+    """1つのUDPソケット上で多数のDNSクエリを多重化して送受信するエンジン
+
+    クエリごとにソケットやメッセージオブジェクトを作らず、トランザクションIDで
+    応答を振り分ける。応答の解析はレコードを含む場合だけ行うため、
+    大半がNXDOMAINになるサブドメイン列挙を低コストで並行実行できる。
+    """
+
+    def __init__(self, nameserver: str, port: int = 53, timeout: float = 2.0):
+        self.nameserver = nameserver
+        self.port = port
+        self.timeout = timeout
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+
+    async def start(self):
+        """ソケットを開く"""
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _EngineProtocol(self), remote_addr=(self.nameserver, self.port)
+        )
+
+    def close(self):
+        """ソケットを閉じ、応答待ちのクエリをキャンセル"""
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        for future in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+
+    def _on_response(self, data: bytes):
+        if len(data) < 12:
+            return
+        query_id = int.from_bytes(data[:2], "big")
+        future = self._pending.get(query_id)
+        if future is not None and not future.done():
+            future.set_result(data)
+
+    def _allocate_id(self) -> int:
+        while True:
+            query_id = random.getrandbits(16)
+            if query_id not in self._pending:
+                return query_id
+
+    @staticmethod
+    def _question(name: str, record_type: str) -> bytes:
+        """質問セクションのワイヤ形式を組み立てる（不正なラベルは ValueError）"""
+        labels = [part.encode("idna") for part in name.rstrip(".").split(".")]
+        if any(not 1 <= len(label) <= 63 for label in labels):
+            raise ValueError(f"invalid DNS name: {name}")
+        qname = b"".join(bytes([len(label)]) + label for label in labels) + b"\x00"
+        return qname + struct.pack(">HH", dns.rdatatype.from_text(record_type), 1)
+
+    async def query(self, name: str, record_type: str = "A") -> Dict:
+        """1件のクエリを送信し、応答コードとレコードを返す（タイムアウト時は asyncio.TimeoutError）"""
+        if self._transport is None:
+            await self.start()
+
+        question = self._question(name, record_type)
+        query_id = self._allocate_id()
+        # ヘッダー: ID, フラグ(RD), QDCOUNT=1
+        packet = struct.pack(">HHHHHH", query_id, 0x0100, 1, 0, 0, 0) + question
+        future = asyncio.get_running_loop().create_future()
+        self._pending[query_id] = future
+        try:
+            self._transport.sendto(packet)
+            data = await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._pending.pop(query_id, None)
+
+        # 別のクエリへの応答（IDの衝突・偽装）を受け入れない
+        if data[12:12 + len(question)].lower() != question.lower():
+            raise asyncio.TimeoutError()
+
+        flags, _, ancount = struct.unpack(">HHH", data[2:8])
+        result = {
+            "rcode": dns.rcode.to_text(flags & 0x000f),
+            "truncated": bool(flags & 0x0200),
+            "records": []
+        }
+        if ancount and not result["truncated"]:
+            message = dns.message.from_wire(data, ignore_trailing=True)
+            rdtype = dns.rdatatype.from_text(record_type)
+            for rrset in message.answer:
+                if rrset.rdtype != rdtype:
+                    continue
+                for rdata in rrset:
+                    result["records"].append({"name": rrset.name.to_text(), "ttl": rrset.ttl, "value": rdata.to_text()})
+        return result
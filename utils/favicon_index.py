@@ -0,0 +1,106 @@
+import base64
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+DEFAULT_FINGERPRINT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "favicon_fingerprints.json"
+)
+
+
+def murmur3_32(data: bytes, seed: int = 0) -> int:
+    """MurmurHash3 (x86, 32bit) を計算し、mmh3.hash と同じ符号付き整数で返す"""
+    c1 = 0xcc9e2d51
+    c2 = 0x1b873593
+    length = len(data)
+    h1 = seed & 0xffffffff
+    rounded_end = length & ~0x3
+
+    for i in range(0, rounded_end, 4):
+        k1 = int.from_bytes(data[i:i + 4], "little")
+        k1 = (k1 * c1) & 0xffffffff
+        k1 = ((k1 << 15) | (k1 >> 17)) & 0xffffffff
+        k1 = (k1 * c2) & 0xffffffff
+        h1 ^= k1
+        h1 = ((h1 << 13) | (h1 >> 19)) & 0xffffffff
+        h1 = (h1 * 5 + 0xe6546b64) & 0xffffffff
+
+    # 端数バイトの処理
+    k1 = 0
+    tail = length & 0x3
+    if tail == 3:
+        k1 ^= data[rounded_end + 2] << 16
+    if tail >= 2:
+        k1 ^= data[rounded_end + 1] << 8
+    if tail >= 1:
+        k1 ^= data[rounded_end]
+        k1 = (k1 * c1) & 0xffffffff
+        k1 = ((k1 << 15) | (k1 >> 17)) & 0xffffffff
+        k1 = (k1 * c2) & 0xffffffff
+        h1 ^= k1
+
+    # 最終ミックス
+    h1 ^= length
+    h1 ^= h1 >> 16
+    h1 = (h1 * 0x85ebca6b) & 0xffffffff
+    h1 ^= h1 >> 13
+    h1 = (h1 * 0xc2b2ae35) & 0xffffffff
+    h1 ^= h1 >> 16
+
+    return h1 - 0x100000000 if h1 & 0x80000000 else h1
+
+
+def favicon_hashes(data: bytes) -> Dict:
+    """favicon のハッシュを計算（Shodan互換のmmh3ハッシュとMD5）"""
+    # Shodan の http.favicon.hash と同じく、76文字ごとに改行を含むbase64に対してハッシュを取る
+    encoded = base64.encodebytes(data)
+    return {
+        "mmh3": murmur3_32(encoded),
+        "md5": hashlib.md5(data).hexdigest()
+    }
+
+
+class FaviconIndex:
+    """ローカルのfaviconフィンガープリント表を、ハッシュ値で引ける形に索引化したもの"""
+
+    def __init__(self, path: str = DEFAULT_FINGERPRINT_PATH):
+        self.path = path
+        self._by_mmh3: Optional[Dict[int, str]] = None
+        self._by_md5: Optional[Dict[str, str]] = None
+
+    def _load(self):
+        """フィンガープリント表を読み込み索引を作成（初回参照時のみ）"""
+        by_mmh3 = {}
+        by_md5 = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = []
+
+        for entry in entries:
+            name = entry.get("name")
+            if not name:
+                continue
+            if entry.get("mmh3") is not None:
+                by_mmh3[int(entry["mmh3"])] = name
+            if entry.get("md5"):
+                by_md5[entry["md5"].lower()] = name
+
+        self._by_mmh3 = by_mmh3
+        self._by_md5 = by_md5
+
+    def __len__(self) -> int:
+        if self._by_mmh3 is None:
+            self._load()
+        return len(set(self._by_mmh3.values()) | set(self._by_md5.values()))
+
+    def lookup(self, hashes: Dict) -> Optional[str]:
+        """ハッシュ値から製品名を検索"""
+        if self._by_mmh3 is None:
+            self._load()
+        name = self._by_mmh3.get(hashes.get("mmh3"))
+        if name is None and hashes.get("md5"):
+            name = self._by_md5.get(hashes["md5"].lower())
+        return name
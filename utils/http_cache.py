@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+
+class HTTPCache:
+    """ETag/Last-Modified を使った条件付きリクエスト用のディスクキャッシュ"""
+
+    def __init__(self, base_dir: str = "scan_results/http_cache", max_body_size: int = 10 * 1024 * 1024):
+        self.base_dir = base_dir
+        self.max_body_size = max_body_size
+        self.hits = 0
+        self.misses = 0
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        directory = os.path.join(self.base_dir, key[:2])
+        return directory, os.path.join(directory, f"{key}.json"), os.path.join(directory, f"{key}.body")
+
+    def get(self, url: str) -> Optional[Dict]:
+        """キャッシュ済みのメタ情報を取得"""
+        _, meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(body_path):
+            return None
+        entry["body_path"] = body_path
+        return entry
+
+    def conditional_headers(self, entry: Optional[Dict]) -> Dict[str, str]:
+        """キャッシュエントリから条件付きリクエスト用のヘッダーを作成"""
+        headers = {}
+        if not entry:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def load_body(self, entry: Dict) -> bytes:
+        """キャッシュ済みの本文を読み込む"""
+        with open(entry["body_path"], "rb") as f:
+            return f.read()
+
+    def store(self, url: str, final_url: str, status: int, headers: List[List[str]],
+              body: bytes, charset: Optional[str] = None) -> bool:
+        """検証子（ETag/Last-Modified）付きの200応答を保存"""
+        if status != 200 or len(body) > self.max_body_size:
+            return False
+        lowered = {k.lower(): v for k, v in headers}
+        etag = lowered.get("etag")
+        last_modified = lowered.get("last-modified")
+        if not etag and not last_modified:
+            return False
+
+        directory, meta_path, body_path = self._paths(url)
+        os.makedirs(directory, exist_ok=True)
+        entry = {
+            "url": url,
+            "final_url": final_url,
+            "status": status,
+            "headers": headers,
+            "etag": etag,
+            "last_modified": last_modified,
+            "charset": charset,
+            "stored_at": time.time()
+        }
+
+        # 書き込み途中のファイルを読まないよう、一時ファイルから置き換える
+        tmp_body = f"{body_path}.tmp"
+        with open(tmp_body, "wb") as f:
+            f.write(body)
+        os.replace(tmp_body, body_path)
+        tmp_meta = f"{meta_path}.tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_meta, meta_path)
+        return True
+
+    def stats(self) -> str:
+        """キャッシュの利用状況"""
+        return f"{self.hits} hits / {self.misses} misses"
@@ -0,0 +1,142 @@
+import asyncio
+import contextvars
+import json
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+JobRunner = Callable[[str, Dict[str, Any]], Awaitable[str]]
+
+
+class JobManager:
+    """時間のかかるツールをバックグラウンドで実行するジョブ管理
+
+    ジョブは同時実行数の上限付きで実行し、終了したジョブの結果は
+    results_dir にJSONとして保存する（サーバー再起動後も job_status / job_result で参照できる）。
+    """
+
+    ACTIVE_STATES = ("queued", "running")
+    # 保存時に値を伏せる引数名
+    SECRET_ARGS = ("password", "passwd", "secret", "token")
+
+    def __init__(self, runner: JobRunner, max_concurrent: int = 4, results_dir: str = "scan_results/jobs",
+                 max_jobs_in_memory: int = 200):
+        self.runner = runner
+        self.max_concurrent = max_concurrent
+        self.results_dir = results_dir
+        self.max_jobs_in_memory = max_jobs_in_memory
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _redact(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            key: "***" if any(secret in key.lower() for secret in self.SECRET_ARGS) else value
+            for key, value in args.items()
+        }
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.results_dir, f"{job_id}.json")
+
+    def _persist(self, job: Dict[str, Any]):
+        os.makedirs(self.results_dir, exist_ok=True)
+        temp_path = self._job_path(job["id"]) + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(temp_path, self._job_path(job["id"]))
+
+    def _evict(self):
+        """メモリ上のジョブが多すぎる場合は、終了済みで古いものから外す（ディスクには残る）"""
+        finished = [job for job in self._jobs.values() if job["status"] not in self.ACTIVE_STATES]
+        finished.sort(key=lambda job: job["finished_at"] or 0)
+        while len(self._jobs) > self.max_jobs_in_memory and finished:
+            del self._jobs[finished.pop(0)["id"]]
+
+    def start(self, tool: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        """ジョブを登録してすぐに返す（実行は同時実行数の空きを待ってから）"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "tool": tool,
+            "args": self._redact(args),
+            "status": "queued",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        self._jobs[job_id] = job
+        # 呼び出し元のリクエストのコンテキストを引き継がないよう、空のコンテキストでタスクを作る
+        loop = asyncio.get_running_loop()
+        task = contextvars.Context().run(loop.create_task, self._run(job, args))
+        task.add_done_callback(lambda _: self._cancelled_before_start(job))
+        self._tasks[job_id] = task
+        self._evict()
+        return job
+
+    async def _run(self, job: Dict[str, Any], args: Dict[str, Any]):
+        try:
+            async with self._semaphore:
+                job["status"] = "running"
+                job["started_at"] = time.time()
+                job["result"] = await self.runner(job["tool"], args)
+                job["status"] = "done"
+        except asyncio.CancelledError:
+            job["status"] = "cancelled"
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finished_at"] = time.time()
+            self._tasks.pop(job["id"], None)
+            try:
+                self._persist(job)
+            except OSError as e:
+                job["error"] = job["error"] or f"failed to save result: {e}"
+
+    def _cancelled_before_start(self, job: Dict[str, Any]):
+        """実行開始前に中止されたジョブ（_run が一度も動いていない）の後始末"""
+        if job["status"] not in self.ACTIVE_STATES:
+            return
+        job["status"] = "cancelled"
+        job["finished_at"] = time.time()
+        self._tasks.pop(job["id"], None)
+        try:
+            self._persist(job)
+        except OSError:
+            pass
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """ジョブ情報（メモリになければ保存済みの結果から読み込む）"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._job_path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def list(self) -> List[Dict[str, Any]]:
+        """メモリ上のジョブ（新しい順）"""
+        return sorted(self._jobs.values(), key=lambda job: job["created_at"], reverse=True)
+
+    def cancel(self, job_id: str) -> bool:
+        task = self._tasks.get(job_id)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    def stats(self) -> str:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        summary = ", ".join(f"{status} {count}" for status, count in sorted(counts.items())) or "no jobs"
+        return f"{summary} (max concurrent: {self.max_concurrent})"
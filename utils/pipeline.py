@@ -0,0 +1,82 @@
+import asyncio
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from utils.progress import ProgressCallback
+
+StageFunction = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class ReconPipeline:
+    """依存関係を宣言したステージを、依存が揃ったものから並行実行する小さなDAG実行器
+
+    各ステージは依存先ステージの結果（ステージ名 -> 結果）を受け取るコルーチン関数。
+    依存先は先に追加しておく必要があるため、循環は作れない。
+    ステージ内の例外は "Error: ..." の文字列を結果とし、そのステージに依存するステージは実行しない。
+    実行しなかったステージの結果は None とし、名前を skipped に記録する。
+    """
+
+    def __init__(self, name: str = "pipeline"):
+        self.name = name
+        self._stages: Dict[str, tuple] = {}
+        self.timings: Dict[str, tuple] = {}
+        self.skipped: Set[str] = set()
+
+    def add(self, name: str, function: StageFunction, depends: Iterable[str] = ()) -> "ReconPipeline":
+        depends = tuple(depends)
+        if name in self._stages:
+            raise ValueError(f"duplicate stage: {name}")
+        unknown = [dependency for dependency in depends if dependency not in self._stages]
+        if unknown:
+            raise ValueError(f"stage {name} depends on unknown stage(s): {', '.join(unknown)}")
+        self._stages[name] = (function, depends)
+        return self
+
+    async def run(self, progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """全ステージを実行し、ステージ名 -> 結果 の辞書を返す（progressにはステージが終わるごとに通知）"""
+        tasks: Dict[str, asyncio.Task] = {}
+        failed = set()
+        finished = []
+        started = time.monotonic()
+
+        async def execute(name: str, function: StageFunction, depends: tuple):
+            inputs = {}
+            for dependency in depends:
+                inputs[dependency] = await tasks[dependency]
+            if any(dependency in failed for dependency in depends):
+                failed.add(name)
+                self.skipped.add(name)
+                return None
+            stage_started = time.monotonic()
+            try:
+                return await function(inputs)
+            except Exception as e:
+                failed.add(name)
+                return f"Error: {name} failed: {str(e)}"
+            finally:
+                self.timings[name] = (stage_started - started, time.monotonic() - started)
+
+        async def run_stage(name: str, function: StageFunction, depends: tuple):
+            result = await execute(name, function, depends)
+            finished.append(name)
+            if progress:
+                await progress(len(finished), len(self._stages), f"{self.name}: {name} finished")
+            return result
+
+        for name, (function, depends) in self._stages.items():
+            tasks[name] = asyncio.create_task(run_stage(name, function, depends))
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        total = time.monotonic() - started
+        print(f"[*] {self.name}: {len(tasks)} stages in {total:.1f}s ({self.describe_timings()})", file=sys.stderr)
+        if self.skipped:
+            print(f"[!] {self.name}: skipped {', '.join(sorted(self.skipped))} after failed dependencies", file=sys.stderr)
+        return {name: task.result() for name, task in tasks.items()}
+
+    def describe_timings(self) -> str:
+        """各ステージの開始・終了時刻（パイプライン開始からの秒数）"""
+        return ", ".join(f"{name} {start:.1f}-{end:.1f}s" for name, (start, end) in self.timings.items())
@@ -0,0 +1,34 @@
+import time
+from typing import Awaitable, Callable, Optional
+
+# 進捗コールバック: (完了数, 全体数, メッセージ, 見つかったもの) を受け取る
+ProgressCallback = Callable[[float, Optional[float], str, Optional[str]], Awaitable[None]]
+
+
+def throttled_progress(send_progress: Callable[[float, Optional[float], str], Awaitable[None]],
+                       send_finding: Optional[Callable[[str], Awaitable[None]]] = None,
+                       interval: float = 0.5) -> ProgressCallback:
+    """進捗の通知を interval 秒に1回（と完了時）に間引くコールバックを作る
+
+    見つかったもの（finding）は間引かずにすぐ送る。進捗の値は増えるときだけ送る（MCPの進捗通知は単調増加）。
+    送信に失敗した場合（リクエスト外で呼ばれた、クライアントが切断したなど）は以降の通知をやめ、スキャン自体は止めない。
+    """
+    state = {"last_time": 0.0, "last_completed": None, "disabled": False}
+
+    async def callback(completed: float, total: Optional[float], message: str, finding: Optional[str] = None):
+        if state["disabled"]:
+            return
+        try:
+            if finding and send_finding is not None:
+                await send_finding(finding)
+            if state["last_completed"] is not None and completed <= state["last_completed"]:
+                return
+            now = time.monotonic()
+            if now - state["last_time"] >= interval or (total is not None and completed >= total):
+                state["last_time"] = now
+                state["last_completed"] = completed
+                await send_progress(completed, total, message)
+        except Exception:
+            state["disabled"] = True
+
+    return callback
@@ -0,0 +1,32 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """トークンバケット方式のレート制限（rate: 1秒あたりのトークン数, burst: 最大保持数）"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    async def acquire(self, tokens: int = 1):
+        """トークンを取得（足りなければ補充されるまで待機）"""
+        if self.rate <= 0:
+            # rate が0以下なら制限なし
+            return
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
@@ -0,0 +1,188 @@
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class RemoteFileIndex:
+    """SSH先のファイル一覧（パス・サイズ・モード・更新時刻・所有者）をSQLiteに保存して検索するインデックス"""
+
+    # find -printf の出力形式（1エントリ5フィールド、NUL区切り）
+    PRINTF_FORMAT = "%p\\0%s\\0%M\\0%T@\\0%u\\0"
+    FIELDS_PER_ENTRY = 5
+
+    def __init__(self, db_path: str = "scan_results/ssh_index.sqlite3"):
+        self.db_path = db_path
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path)
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS files (
+                    host TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    dir TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mode TEXT NOT NULL,
+                    mtime REAL NOT NULL,
+                    owner TEXT NOT NULL,
+                    PRIMARY KEY (host, path)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS files_dir ON files (host, dir);
+                CREATE INDEX IF NOT EXISTS files_name ON files (host, name);
+                CREATE TABLE IF NOT EXISTS roots (
+                    host TEXT NOT NULL,
+                    root TEXT NOT NULL,
+                    indexed_at REAL NOT NULL,
+                    complete INTEGER NOT NULL,
+                    PRIMARY KEY (host, root)
+                );
+            """)
+        return self._db
+
+    @staticmethod
+    def host_key(host: str, port: int, username: str) -> str:
+        return f"{username}@{host}:{port}"
+
+    @staticmethod
+    def _subtree_bounds(root: str) -> Tuple[str, str]:
+        """root配下（root自身を除く）を主キーの範囲検索で取るための境界。'0' は '/' の次の文字"""
+        prefix = root.rstrip('/')
+        return prefix + '/', prefix + '0'
+
+    @classmethod
+    def parse_entries(cls, fields: List[str]) -> List[Tuple]:
+        """find -printf のフィールド列を (path, dir, name, size, mode, mtime, owner) に変換"""
+        rows = []
+        for index in range(0, len(fields) - cls.FIELDS_PER_ENTRY + 1, cls.FIELDS_PER_ENTRY):
+            path, size, mode, mtime, owner = fields[index:index + cls.FIELDS_PER_ENTRY]
+            try:
+                size_value, mtime_value = int(size), float(mtime)
+            except ValueError:
+                continue
+            directory, _, name = path.rpartition('/')
+            rows.append((path, directory or '/', name or path, size_value, mode, mtime_value, owner))
+        return rows
+
+    def indexed_root(self, host: str, path: str) -> Optional[Dict]:
+        """pathを含むインデックス済みルートの情報（なければNone）"""
+        for root, indexed_at, complete in self.db.execute(
+            "SELECT root, indexed_at, complete FROM roots WHERE host = ?", (host,)
+        ):
+            if path == root or root == '/' or path.startswith(root.rstrip('/') + '/'):
+                return {"root": root, "indexed_at": indexed_at, "complete": bool(complete)}
+        return None
+
+    def begin_full(self, host: str, root: str):
+        """rootの完全な再構築を始める（既存のroot配下のエントリを消す）"""
+        low, high = self._subtree_bounds(root)
+        with self.db:
+            self.db.execute("DELETE FROM files WHERE host = ? AND (path = ? OR (path >= ? AND path < ?))",
+                            (host, root, low, high))
+            # 新しいルートに含まれる古いルートは統合する
+            for (old_root,) in self.db.execute("SELECT root FROM roots WHERE host = ?", (host,)).fetchall():
+                if old_root == root or (old_root >= low and old_root < high):
+                    self.db.execute("DELETE FROM roots WHERE host = ? AND root = ?", (host, old_root))
+
+    def _insert(self, host: str, rows: Iterable[Tuple]):
+        self.db.executemany(
+            "INSERT OR REPLACE INTO files (host, path, dir, name, size, mode, mtime, owner) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ((host,) + tuple(row) for row in rows),
+        )
+
+    def add_entries(self, host: str, rows: Iterable[Tuple]):
+        with self.db:
+            self._insert(host, rows)
+
+    def finish(self, host: str, root: str, complete: bool):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO roots (host, root, indexed_at, complete) VALUES (?, ?, ?, ?)",
+                            (host, root, time.time(), int(complete)))
+
+    def directory_mtimes(self, host: str, root: str) -> Dict[str, float]:
+        """root配下のディレクトリとその更新時刻"""
+        low, high = self._subtree_bounds(root)
+        return dict(self.db.execute(
+            "SELECT path, mtime FROM files WHERE host = ? AND mode LIKE 'd%' AND (path = ? OR (path >= ? AND path < ?))",
+            (host, root, low, high),
+        ))
+
+    def apply_directory_changes(self, host: str, current_dirs: List[Tuple], changed: List[str],
+                                removed: List[str], listings: List[Tuple], skipped: Iterable[str] = ()):
+        """差分再走査の結果を反映する（消えたディレクトリの配下を削除し、変化したディレクトリの直下を入れ替える）
+
+        skipped（変化したが一覧し直せなかったディレクトリ）は、親の一覧に含まれていても行を書き換えず、
+        保存済みの更新時刻のままにして次回の差分更新で再走査されるようにする。
+        """
+        skipped = set(skipped)
+        if skipped:
+            current_dirs = [row for row in current_dirs if row[0] not in skipped]
+            listings = [row for row in listings if row[0] not in skipped]
+        with self.db:
+            for path in removed:
+                low, high = self._subtree_bounds(path)
+                self.db.execute("DELETE FROM files WHERE host = ? AND (path = ? OR (path >= ? AND path < ?))",
+                                (host, path, low, high))
+            for path in changed:
+                self.db.execute("DELETE FROM files WHERE host = ? AND dir = ? AND mode NOT LIKE 'd%'", (host, path))
+            self._insert(host, current_dirs)
+            self._insert(host, listings)
+
+    def search(self, host: str, pattern: str, root: str = '/', limit: int = 200) -> List[Tuple]:
+        """ファイル名のワイルドカード一致（find -name と同じく大文字小文字を区別）"""
+        return self._query(host, root, "name GLOB ?", (pattern,), "path", limit)
+
+    def hidden(self, host: str, root: str = '/', limit: int = 200) -> List[Tuple]:
+        """ドットで始まるファイル・ディレクトリ"""
+        return self._query(host, root, "name GLOB '.*'", (), "path", limit)
+
+    def by_size(self, host: str, root: str = '/', min_size: int = 0, limit: int = 200) -> List[Tuple]:
+        """指定サイズ以上の通常ファイル（大きい順）"""
+        return self._query(host, root, "mode LIKE '-%' AND size >= ?", (min_size,), "size DESC", limit)
+
+    def _query(self, host: str, root: str, condition: str, params: Tuple, order: str, limit: int) -> List[Tuple]:
+        low, high = self._subtree_bounds(root)
+        return self.db.execute(
+            f"SELECT path, size, mode, mtime, owner FROM files "
+            f"WHERE host = ? AND (path = ? OR (path >= ? AND path < ?)) AND {condition} ORDER BY {order} LIMIT ?",
+            (host, root, low, high) + tuple(params) + (limit,),
+        ).fetchall()
+
+    def directory_counts(self, host: str, directory: str, limit: int = 200) -> List[Tuple]:
+        """ディレクトリ直下のサブディレクトリごとの配下ファイル数・ディレクトリ数・合計サイズ"""
+        counts = []
+        subdirs = self.db.execute(
+            "SELECT path FROM files WHERE host = ? AND dir = ? AND mode LIKE 'd%' ORDER BY path LIMIT ?",
+            (host, directory, limit),
+        ).fetchall()
+        for (path,) in [(directory,)] + subdirs:
+            low, high = self._subtree_bounds(path)
+            direct = path == directory
+            scope = "dir = ?" if direct else "path >= ? AND path < ?"
+            scope_params = (path,) if direct else (low, high)
+            files, dirs, size = self.db.execute(
+                f"SELECT SUM(mode LIKE '-%'), SUM(mode LIKE 'd%'), SUM(CASE WHEN mode LIKE '-%' THEN size ELSE 0 END) "
+                f"FROM files WHERE host = ? AND {scope}",
+                (host,) + scope_params,
+            ).fetchone()
+            counts.append((path, files or 0, dirs or 0, size or 0, direct))
+        return counts
+
+    def stats(self, host: Optional[str] = None) -> str:
+        if host is None:
+            hosts, entries = self.db.execute("SELECT COUNT(DISTINCT host), COUNT(*) FROM files").fetchone()
+            return f"{hosts} hosts, {entries} entries"
+        (entries,) = self.db.execute("SELECT COUNT(*) FROM files WHERE host = ?", (host,)).fetchone()
+        return f"{entries} entries"
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
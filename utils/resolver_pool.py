@@ -0,0 +1,170 @@
+import asyncio
+import ipaddress
+import itertools
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import dns.resolver
+
+
+class Upstream:
+    """プール内の1つの上流リゾルバー（遅延・エラーの統計と同時実行数の上限を持つ）"""
+
+    def __init__(self, address: str, port: int, max_concurrency: int):
+        self.address = address
+        self.port = port
+        self.max_concurrency = max_concurrency
+        self.latency_ewma: Optional[float] = None
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.demotions = 0
+        self.demoted_until = 0.0
+        self.active = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def key(self) -> Tuple[str, int]:
+        return self.address, self.port
+
+    @property
+    def label(self) -> str:
+        host = f"[{self.address}]" if ':' in self.address else self.address
+        return f"{host}:{self.port}"
+
+    def demoted(self, now: float) -> bool:
+        return self.demoted_until > now
+
+    def slot(self) -> "_Slot":
+        """同時実行数の上限付きで問い合わせ枠を確保するコンテキスト"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return _Slot(self)
+
+
+class _Slot:
+    def __init__(self, upstream: Upstream):
+        self.upstream = upstream
+
+    async def __aenter__(self):
+        await self.upstream._semaphore.acquire()
+        self.upstream.active += 1
+        return self.upstream
+
+    async def __aexit__(self, *exc):
+        self.upstream.active -= 1
+        self.upstream._semaphore.release()
+
+
+class ResolverPool:
+    """複数の上流リゾルバーを負荷分散するプール
+
+    nameservers には "8.8.8.8"、"127.0.0.1:5353"、"[2001:4860:4860::8888]:53"、
+    または /etc/resolv.conf のネームサーバーを表す "system" を指定する。
+    strategy は "round_robin" か "least_latency"。連続して失敗したリゾルバーは
+    一定時間（失敗が続くほど長く）選択対象から外す。
+    """
+
+    STRATEGIES = ("round_robin", "least_latency")
+
+    def __init__(self, nameservers: Iterable[str], port: int = 53, strategy: str = "least_latency",
+                 max_concurrency: int = 50, failure_threshold: int = 3,
+                 demote_seconds: float = 30.0, ewma_alpha: float = 0.3):
+        self.strategy = self.validate_strategy(strategy)
+        self.failure_threshold = failure_threshold
+        self.demote_seconds = demote_seconds
+        self.ewma_alpha = ewma_alpha
+        self.upstreams: List[Upstream] = []
+        seen = set()
+        for address, upstream_port in self._expand(nameservers, port):
+            if (address, upstream_port) not in seen:
+                seen.add((address, upstream_port))
+                self.upstreams.append(Upstream(address, upstream_port, max_concurrency))
+        if not self.upstreams:
+            raise ValueError("No usable nameservers configured")
+        self._cycle = itertools.cycle(range(len(self.upstreams)))
+
+    @classmethod
+    def validate_strategy(cls, strategy: str) -> str:
+        if strategy not in cls.STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy} (available: {', '.join(cls.STRATEGIES)})")
+        return strategy
+
+    @staticmethod
+    def _expand(nameservers: Iterable[str], default_port: int) -> List[Tuple[str, int]]:
+        """ネームサーバー指定を (アドレス, ポート) に展開（不正な指定は ValueError）"""
+        expanded = []
+        for entry in nameservers:
+            entry = entry.strip()
+            if entry == "system":
+                try:
+                    system = dns.resolver.Resolver(configure=True)
+                    expanded.extend((str(ns), system.port) for ns in system.nameservers)
+                except dns.resolver.NoResolverConfiguration:
+                    pass
+                continue
+            address, port = entry, default_port
+            if entry.startswith('['):
+                address, _, rest = entry[1:].partition(']')
+                if rest.startswith(':'):
+                    port = int(rest[1:])
+            elif entry.count(':') == 1:
+                address, port_text = entry.split(':')
+                port = int(port_text)
+            ipaddress.ip_address(address)
+            expanded.append((address, port))
+        return expanded
+
+    def select(self, exclude: Iterable[Tuple[str, int]] = ()) -> Upstream:
+        """戦略に従ってリゾルバーを1つ選択（全て降格中なら復帰が最も近いものを返す）"""
+        now = time.monotonic()
+        excluded = set(exclude)
+        candidates = [u for u in self.upstreams if u.key not in excluded and not u.demoted(now)]
+        if not candidates:
+            pool = [u for u in self.upstreams if u.key not in excluded] or self.upstreams
+            return min(pool, key=lambda u: u.demoted_until)
+
+        if self.strategy == "round_robin":
+            for _ in range(len(self.upstreams)):
+                upstream = self.upstreams[next(self._cycle)]
+                if upstream in candidates:
+                    return upstream
+
+        # 未計測のリゾルバーを優先し、以降は平均遅延と処理中件数で選ぶ
+        return min(candidates, key=lambda u: (u.latency_ewma or 0.0) * (1 + u.active / u.max_concurrency))
+
+    def record_success(self, upstream: Upstream, latency: float):
+        """成功した問い合わせの遅延を記録"""
+        upstream.successes += 1
+        upstream.consecutive_failures = 0
+        upstream.demotions = 0
+        if upstream.latency_ewma is None:
+            upstream.latency_ewma = latency
+        else:
+            upstream.latency_ewma += self.ewma_alpha * (latency - upstream.latency_ewma)
+
+    def record_failure(self, upstream: Upstream):
+        """失敗を記録し、連続失敗が閾値に達したら一定時間降格する"""
+        upstream.failures += 1
+        if upstream.demoted(time.monotonic()):
+            # 降格前に送信済みだった問い合わせの失敗では降格期間を延ばさない
+            return
+        upstream.consecutive_failures += 1
+        if upstream.consecutive_failures >= self.failure_threshold:
+            upstream.demotions += 1
+            upstream.consecutive_failures = 0
+            backoff = min(300.0, self.demote_seconds * (2 ** (upstream.demotions - 1)))
+            upstream.demoted_until = time.monotonic() + backoff
+
+    def status_lines(self) -> List[str]:
+        """リゾルバーごとの統計"""
+        now = time.monotonic()
+        lines = []
+        for upstream in self.upstreams:
+            latency = f"{upstream.latency_ewma * 1000:.1f}ms" if upstream.latency_ewma is not None else "n/a"
+            state = f"demoted ({upstream.demoted_until - now:.0f}s)" if upstream.demoted(now) else "active"
+            lines.append(
+                f"{upstream.label}: {state}, latency {latency}, "
+                f"ok {upstream.successes} / failed {upstream.failures}, in-flight {upstream.active}/{upstream.max_concurrency}"
+            )
+        return lines
@@ -0,0 +1,123 @@
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from lxml import etree
+
+
+def parse_robots_txt(content: str) -> Dict:
+    """robots.txtを解析し、User-agentグループごとのルールとSitemap指定を返す"""
+    groups: List[Dict] = []
+    sitemaps: List[str] = []
+    current: Optional[Dict] = None
+    last_was_agent = False
+
+    for raw_line in content.splitlines():
+        # コメントを除去
+        line = raw_line.split('#', 1)[0].strip()
+        if not line or ':' not in line:
+            continue
+
+        field, value = line.split(':', 1)
+        field = field.strip().lower()
+        value = value.strip()
+
+        if field == 'user-agent':
+            # 連続するUser-agent行は同じグループにまとめる
+            if current is None or not last_was_agent:
+                current = {"user_agents": [], "allow": [], "disallow": [], "crawl_delay": None}
+                groups.append(current)
+            current["user_agents"].append(value)
+            last_was_agent = True
+            continue
+
+        last_was_agent = False
+        if field == 'sitemap':
+            if value and value not in sitemaps:
+                sitemaps.append(value)
+        elif current is None:
+            continue
+        elif field == 'allow' and value:
+            current["allow"].append(value)
+        elif field == 'disallow' and value:
+            current["disallow"].append(value)
+        elif field == 'crawl-delay':
+            current["crawl_delay"] = value
+
+    return {"groups": groups, "sitemaps": sitemaps}
+
+
+def robots_seed_paths(robots: Dict) -> List[str]:
+    """robots.txtのルールからディレクトリスキャンの候補パスを抽出"""
+    paths = []
+    seen = set()
+    for group in robots.get("groups", []):
+        for path in group["disallow"] + group["allow"]:
+            # ワイルドカードを含むパターンは、ワイルドカードの手前までを候補とする
+            path = path.split('*', 1)[0].rstrip('$')
+            if not path.startswith('/') or path == '/' or path in seen:
+                continue
+            seen.add(path)
+            paths.append(path)
+    return paths
+
+
+class SitemapStreamParser:
+    """サイトマップXMLを逐次解析するパーサー（gzip圧縮にも対応）
+
+    feed() にレスポンスのチャンクを渡すと、見つかった <loc> を
+    ("url", loc) または ("sitemap", loc) の形で返す。
+    """
+
+    def __init__(self):
+        self._parser = etree.XMLPullParser(events=("end",), resolve_entities=False, no_network=True, huge_tree=True)
+        self._decompressor = None
+        self._started = False
+
+    def _decompress(self, chunk: bytes) -> bytes:
+        """先頭のマジックバイトでgzipを判定し、必要なら逐次展開"""
+        if not self._started:
+            self._started = True
+            if chunk[:2] == b'\x1f\x8b':
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self._decompressor is not None:
+            return self._decompressor.decompress(chunk)
+        return chunk
+
+    def feed(self, chunk: bytes) -> List[Tuple[str, str]]:
+        """チャンクを解析し、新たに見つかったエントリを返す"""
+        data = self._decompress(chunk)
+        if data:
+            self._parser.feed(data)
+        return self._collect()
+
+    def close(self) -> List[Tuple[str, str]]:
+        """残りのデータを解析して終了"""
+        if self._decompressor is not None:
+            rest = self._decompressor.flush()
+            if rest:
+                self._parser.feed(rest)
+        try:
+            self._parser.close()
+        except etree.XMLSyntaxError:
+            pass
+        return self._collect()
+
+    def _collect(self) -> List[Tuple[str, str]]:
+        entries = []
+        for _, element in self._parser.read_events():
+            tag = etree.QName(element).localname if isinstance(element.tag, str) else ""
+            if tag not in ("url", "sitemap"):
+                continue
+
+            for child in element:
+                if isinstance(child.tag, str) and etree.QName(child).localname == "loc" and child.text:
+                    entries.append(("sitemap" if tag == "sitemap" else "url", child.text.strip()))
+                    break
+
+            # 解析済みの要素を解放してメモリ使用量を一定に保つ
+            element.clear()
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+        return entries
@@ -0,0 +1,76 @@
+import ipaddress
+import os
+from typing import List, Optional, Union
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+class EngagementScope:
+    """診断対象範囲（スコープ）の定義
+
+    環境変数 HACKING_MCP_SCOPE にカンマ/空白区切りでCIDR・IPアドレス・ドメイン名を指定する
+    （"@/path/to/scope.txt" でファイルから読み込み）。未設定の場合は制限しない。
+    ドメイン名はそのサブドメインも対象に含む。
+    """
+
+    ENV_VAR = "HACKING_MCP_SCOPE"
+
+    def __init__(self, entries: Optional[List[str]] = None):
+        self.networks: List[IPNetwork] = []
+        self.domains: List[str] = []
+        for entry in entries or []:
+            entry = entry.strip().lower()
+            if not entry or entry.startswith('#'):
+                continue
+            try:
+                self.networks.append(ipaddress.ip_network(entry, strict=False))
+            except ValueError:
+                self.domains.append(entry.lstrip('*.').rstrip('.'))
+
+    @classmethod
+    def from_env(cls) -> "EngagementScope":
+        """環境変数からスコープを読み込む"""
+        value = os.environ.get(cls.ENV_VAR, "").strip()
+        if value.startswith('@'):
+            try:
+                with open(value[1:], 'r', encoding='utf-8') as f:
+                    value = f.read()
+            except OSError:
+                value = ""
+        entries = [line.split('#', 1)[0] for line in value.splitlines()]
+        return cls(" ".join(entries).replace(',', ' ').split())
+
+    @property
+    def restricted(self) -> bool:
+        return bool(self.networks or self.domains)
+
+    def contains_network(self, network: IPNetwork) -> bool:
+        """ネットワーク全体がスコープ内か"""
+        if not self.restricted:
+            return True
+        return any(
+            network.version == allowed.version and network.subnet_of(allowed)
+            for allowed in self.networks
+        )
+
+    def contains_ip(self, ip: str) -> bool:
+        """IPアドレスがスコープ内か"""
+        address = ipaddress.ip_address(ip)
+        return self.contains_network(ipaddress.ip_network(address))
+
+    def contains_host(self, host: str) -> bool:
+        """ホスト名またはIPアドレスがスコープ内か"""
+        try:
+            return self.contains_ip(host)
+        except ValueError:
+            pass
+        if not self.restricted:
+            return True
+        host = host.lower().rstrip('.')
+        return any(host == domain or host.endswith('.' + domain) for domain in self.domains)
+
+    def describe(self) -> str:
+        """スコープの概要"""
+        if not self.restricted:
+            return f"unrestricted ({self.ENV_VAR} not set)"
+        return ", ".join([str(n) for n in self.networks] + self.domains)
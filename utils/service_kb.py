@@ -0,0 +1,141 @@
+import glob
+import os
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "services")
+DEFAULT_SERVICES_PATHS = [
+    "/usr/share/nmap/nmap-services",
+    os.path.join(DATA_DIR, "services.txt")
+]
+DEFAULT_RULES_DIR = os.path.join(DATA_DIR, "rules")
+
+
+class ServiceKnowledgeBase:
+    """サービス表（nmap-services形式）とYAMLのルールパックを索引化したナレッジベース
+
+    サービス表は後に読み込んだファイルが優先され（同梱の表が nmap-services を上書きする）、
+    ルールパックのプロファイルはプロファイル名・nmapサービス名・製品名・ポートで引ける。
+    いずれも初回参照時に一度だけ読み込む。
+    """
+
+    def __init__(self, services_paths: Optional[List[str]] = None, rules_dir: str = DEFAULT_RULES_DIR):
+        self.services_paths = services_paths or list(DEFAULT_SERVICES_PATHS)
+        self.rules_dir = rules_dir
+        self._by_port: Optional[Dict[Tuple[int, str], Dict]] = None
+        self._profiles: Dict[str, Dict] = {}
+        self._by_service: Dict[str, Dict] = {}
+        self._by_product: Dict[str, Dict] = {}
+
+    def _load(self):
+        """サービス表とルールパックを読み込み索引を作成（初回参照時のみ）"""
+        by_port: Dict[Tuple[int, str], Dict] = {}
+        for path in self.services_paths:
+            self._load_services(path, by_port)
+
+        profiles, by_service, by_product = {}, {}, {}
+        for path in sorted(glob.glob(os.path.join(self.rules_dir, "*.yaml"))):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    pack = yaml.safe_load(f) or {}
+            except (OSError, yaml.YAMLError):
+                continue
+            for profile in pack.get("profiles") or []:
+                name = profile.get("name")
+                if not name:
+                    continue
+                profile = {
+                    "name": name,
+                    "common_issues": list(profile.get("common_issues") or []),
+                    "recommendations": list(profile.get("recommendations") or []),
+                    "tools": list(profile.get("tools") or []),
+                    "services": [s.lower() for s in profile.get("services") or []],
+                    "products": [p.lower() for p in profile.get("products") or []]
+                }
+                profiles[name.lower()] = profile
+                for service in profile["services"]:
+                    by_service[service] = profile
+                for product in profile["products"]:
+                    by_product[product] = profile
+
+        self._profiles = profiles
+        self._by_service = by_service
+        self._by_product = by_product
+        self._by_port = by_port
+
+    @staticmethod
+    def _load_services(path: str, by_port: Dict[Tuple[int, str], Dict]):
+        """nmap-services形式のファイルを読み込む（同じポートは出現頻度の高いものを残す）"""
+        try:
+            f = open(path, "r", encoding="utf-8", errors="ignore")
+        except OSError:
+            return
+        overriding = {}
+        with f:
+            for line in f:
+                line, _, comment = line.partition('#')
+                fields = line.split()
+                if len(fields) < 2 or '/' not in fields[1]:
+                    continue
+                port_text, _, proto = fields[1].partition('/')
+                try:
+                    key = (int(port_text), proto.lower())
+                    frequency = float(fields[2]) if len(fields) > 2 else 0.0
+                except ValueError:
+                    continue
+                entry = {"name": fields[0], "description": comment.strip() or fields[0], "frequency": frequency}
+                # 同じファイル内では頻度の高いもの、ファイル間では後のファイルを優先
+                current = overriding.get(key)
+                if current is None or frequency > current["frequency"]:
+                    overriding[key] = entry
+        by_port.update(overriding)
+
+    def _ensure_loaded(self):
+        if self._by_port is None:
+            self._load()
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._by_port)
+
+    @property
+    def profile_count(self) -> int:
+        self._ensure_loaded()
+        return len(self._profiles)
+
+    def lookup_port(self, port: int, proto: str = "tcp") -> Optional[Dict]:
+        """ポート番号・プロトコルからサービス表のエントリを検索"""
+        self._ensure_loaded()
+        return self._by_port.get((port, proto.lower()))
+
+    def lookup_product(self, product: str) -> Optional[Dict]:
+        """製品名（"OpenSSH 8.2p1 Ubuntu" のようなバージョン付きも可）からプロファイルを検索"""
+        self._ensure_loaded()
+        tokens = product.lower().split()
+        # 後ろの語（バージョン等）を順に外しながら完全一致で引く
+        for end in range(len(tokens), 0, -1):
+            profile = self._by_product.get(" ".join(tokens[:end]))
+            if profile is not None:
+                return profile
+        return None
+
+    def lookup_profile(self, port: int, proto: str = "tcp", service_name: str = "", product: str = "") -> Optional[Dict]:
+        """製品名 → nmapサービス名 → ポートのサービス名 の順にプロファイルを検索"""
+        self._ensure_loaded()
+        # 簡易出力では "Apache 2.4.41" のように製品名がサービス名側に入ることがある
+        for candidate in (product, f"{service_name} {product}"):
+            if candidate.strip():
+                profile = self.lookup_product(candidate)
+                if profile is not None:
+                    return profile
+        if service_name:
+            name = service_name.lower()
+            profile = self._by_service.get(name) or self._profiles.get(name)
+            if profile is not None:
+                return profile
+        entry = self._by_port.get((port, proto.lower()))
+        if entry is not None:
+            name = entry["name"].lower()
+            return self._profiles.get(name) or self._by_service.get(name)
+        return None
@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+
+import asyncssh
+
+PoolKey = Tuple[str, int, str, str]
+
+
+class _PooledConnection:
+    def __init__(self, conn: asyncssh.SSHClientConnection):
+        self.conn = conn
+        self.users = 0
+        self.last_used = time.monotonic()
+        self.last_checked = time.monotonic()
+
+
+class SSHConnectionPool:
+    """ホスト・ポート・ユーザー名（・パスワードのハッシュ）ごとにSSH接続を再利用するプール
+
+    1つの接続は複数のタスクで同時に共有する（SSHのチャネル多重化）。
+    一定時間使われていない接続は閉じ、上限数に達した場合は使用中でない最も古い接続を閉じる。
+    しばらく使っていない接続は再利用前に疎通確認し、切れていれば透過的に再接続する。
+    """
+
+    def __init__(self, max_connections: int = 10, idle_timeout: float = 300.0,
+                 health_check_interval: float = 30.0, connect_timeout: float = 15.0):
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.connect_timeout = connect_timeout
+        self._connections: Dict[PoolKey, _PooledConnection] = {}
+        self._key_locks: Dict[PoolKey, asyncio.Lock] = {}
+        self._released: Optional[asyncio.Condition] = None
+        self._reaper: Optional[asyncio.Task] = None
+        self.connects = 0
+        self.reuses = 0
+
+    @staticmethod
+    def _key(host: str, port: int, username: str, password: str) -> PoolKey:
+        # パスワード自体は保持せず、異なる認証情報の接続を区別するためだけにハッシュを使う
+        return host, port, username, hashlib.sha256(password.encode()).hexdigest()
+
+    async def _is_healthy(self, pooled: _PooledConnection) -> bool:
+        """接続が生きているか確認（最近使った接続は確認を省略）"""
+        if pooled.conn.is_closed():
+            return False
+        if time.monotonic() - pooled.last_checked < self.health_check_interval:
+            return True
+        try:
+            await asyncio.wait_for(pooled.conn.run("true", check=False), timeout=5)
+        except (asyncio.TimeoutError, asyncssh.Error, OSError):
+            return False
+        pooled.last_checked = time.monotonic()
+        return True
+
+    def _close(self, key: PoolKey):
+        pooled = self._connections.pop(key, None)
+        if pooled is not None:
+            pooled.conn.close()
+
+    def _evict_idle(self):
+        """アイドル時間を超えた未使用の接続を閉じる"""
+        now = time.monotonic()
+        for key, pooled in list(self._connections.items()):
+            if pooled.users == 0 and (now - pooled.last_used > self.idle_timeout or pooled.conn.is_closed()):
+                self._close(key)
+
+    async def _reap(self):
+        while self._connections:
+            await asyncio.sleep(max(1.0, self.idle_timeout / 2))
+            self._evict_idle()
+        self._reaper = None
+
+    async def _make_room(self):
+        """上限に達していれば未使用の最も古い接続を閉じる（全て使用中なら解放を待つ）"""
+        if self._released is None:
+            self._released = asyncio.Condition()
+        async with self._released:
+            while len(self._connections) >= self.max_connections:
+                idle = [(pooled.last_used, key) for key, pooled in self._connections.items() if pooled.users == 0]
+                if idle:
+                    self._close(min(idle)[1])
+                    break
+                await self._released.wait()
+
+    async def _acquire(self, host: str, port: int, username: str, password: str,
+                       connect_host: Optional[str] = None) -> Tuple[PoolKey, _PooledConnection, bool]:
+        key = self._key(host, port, username, password)
+        lock = self._key_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            self._evict_idle()
+            pooled = self._connections.get(key)
+            if pooled is not None:
+                if await self._is_healthy(pooled):
+                    pooled.users += 1
+                    self.reuses += 1
+                    return key, pooled, True
+                self._close(key)
+
+            await self._make_room()
+            conn = await asyncio.wait_for(
+                asyncssh.connect(connect_host or host, port=port, username=username, password=password, known_hosts=None),
+                timeout=self.connect_timeout
+            )
+            pooled = _PooledConnection(conn)
+            pooled.users = 1
+            self._connections[key] = pooled
+            self.connects += 1
+            if self._reaper is None:
+                self._reaper = asyncio.create_task(self._reap())
+            return key, pooled, False
+
+    async def _release(self, key: PoolKey, pooled: _PooledConnection, discard: bool = False):
+        pooled.users -= 1
+        pooled.last_used = time.monotonic()
+        if discard and self._connections.get(key) is pooled:
+            self._close(key)
+        if self._released is not None:
+            async with self._released:
+                self._released.notify_all()
+
+    @asynccontextmanager
+    async def connection(self, host: str, port: int, username: str, password: str, connect_host: Optional[str] = None):
+        """プールから接続を取得するコンテキスト（(接続, 再利用したか) を返す）
+
+        接続断（ConnectionLost/DisconnectError）が発生した接続はプールから外す。
+        """
+        key, pooled, reused = await self._acquire(host, port, username, password, connect_host)
+        discard = False
+        try:
+            yield pooled.conn, reused
+        except (asyncssh.ConnectionLost, asyncssh.DisconnectError):
+            discard = True
+            raise
+        finally:
+            await self._release(key, pooled, discard)
+
+    def close(self, host: Optional[str] = None) -> int:
+        """プール内の接続を閉じる（host指定時はそのホストの接続のみ）"""
+        keys = [key for key in self._connections if host is None or key[0] == host]
+        for key in keys:
+            self._close(key)
+        return len(keys)
+
+    def stats(self) -> str:
+        """プールの利用状況"""
+        active = sum(1 for pooled in self._connections.values() if pooled.users)
+        return (
+            f"{len(self._connections)}/{self.max_connections} connections ({active} in use), "
+            f"{self.connects} connects / {self.reuses} reuses"
+        )
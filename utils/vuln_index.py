@@ -0,0 +1,140 @@
+import json
+import os
+import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_FEED_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "vulnerabilities.json"
+)
+
+# プレリリース扱いの接尾辞（"1.3.6rc1" < "1.3.6"）
+PRE_RELEASE = {"alpha", "beta", "rc", "pre", "dev"}
+VERSION_TOKEN = re.compile(r'^\d+(?:\.\d+)+[a-z0-9.]*|^\d+[a-z]*\d*$', re.IGNORECASE)
+SEVERITY_ORDER = {"low": 1, "medium": 2, "high": 3, "critical": 4}
+
+VersionKey = Tuple[Tuple[int, object], ...]
+
+
+@lru_cache(maxsize=4096)
+def version_key(version: str) -> VersionKey:
+    """バージョン文字列を比較可能なキーに変換（"8.2p1" > "8.2"、"1.3.6rc1" < "1.3.6"）
+
+    各要素は (種別, 値)。種別は 数値=3 > 後置文字=2 > 終端=1 > プレリリース=0 で、
+    終端要素により "8.2" と "8.2p1"、"1.3.6" と "1.3.6rc1" の前後関係が決まる。
+    """
+    parts = []
+    for number, letters in re.findall(r'(\d+)|([a-z]+)', version.lower()):
+        if number:
+            parts.append((3, int(number)))
+        else:
+            parts.append((0 if letters in PRE_RELEASE else 2, letters))
+    parts.append((1, ""))
+    return tuple(parts)
+
+
+def _just_above(key: VersionKey) -> VersionKey:
+    """指定バージョンの直後（そのバージョンを含む上限として使う）"""
+    return key + ((4, ""),)
+
+
+@lru_cache(maxsize=4096)
+def split_product_version(text: str) -> Tuple[str, str]:
+    """"OpenSSH 8.2p1 Ubuntu 4ubuntu0.5" → ("openssh", "8.2p1")"""
+    tokens = text.split()
+    for index, token in enumerate(tokens):
+        match = VERSION_TOKEN.match(token)
+        if match:
+            return " ".join(tokens[:index]).lower(), match.group(0).rstrip('.')
+    return text.strip().lower(), ""
+
+
+class VulnerabilityIndex:
+    """ローカルの脆弱性フィードを製品ごとの区間索引にしたもの
+
+    製品ごとに全ての範囲境界をソートして基本区間に分割し、各基本区間に該当する
+    脆弱性を前計算しておく。検索は二分探索1回（O(log n)）で済む。
+    """
+
+    def __init__(self, path: str = DEFAULT_FEED_PATH):
+        self.path = path
+        self._products: Optional[Dict[str, Tuple[List[VersionKey], List[List[Dict]]]]] = None
+        self._entries = 0
+
+    def _load(self):
+        """フィードを読み込み索引を作成（初回参照時のみ）"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                feed = json.load(f)
+        except (OSError, ValueError):
+            feed = []
+
+        ranges: Dict[str, List[Tuple[Optional[VersionKey], Optional[VersionKey], Dict]]] = {}
+        for entry in feed:
+            if not entry.get("id") or not entry.get("products"):
+                continue
+            vuln = {
+                "id": entry["id"],
+                "name": entry.get("name", entry["id"]),
+                "severity": entry.get("severity", "medium").lower(),
+                "cvss": entry.get("cvss"),
+                "description": entry.get("description", "")
+            }
+            for affected in entry.get("affected", []):
+                low = version_key(affected["introduced"]) if affected.get("introduced") else None
+                if affected.get("fixed"):
+                    high = version_key(affected["fixed"])
+                elif affected.get("last_affected"):
+                    high = _just_above(version_key(affected["last_affected"]))
+                else:
+                    high = None
+                for product in entry["products"]:
+                    ranges.setdefault(product.lower(), []).append((low, high, vuln))
+            self._entries += 1
+
+        products = {}
+        for product, product_ranges in ranges.items():
+            # 範囲の境界で基本区間 [bounds[i-1], bounds[i]) に分割し、区間ごとの該当脆弱性を前計算
+            bounds = sorted({b for low, high, _ in product_ranges for b in (low, high) if b is not None})
+            segments: List[List[Dict]] = [[] for _ in range(len(bounds) + 1)]
+            for low, high, vuln in product_ranges:
+                first = 0 if low is None else bisect_right(bounds, low)
+                last = len(bounds) if high is None else bisect_left(bounds, high)
+                for index in range(first, last + 1):
+                    if vuln not in segments[index]:
+                        segments[index].append(vuln)
+            products[product] = (bounds, segments)
+        self._products = products
+
+    def __len__(self) -> int:
+        if self._products is None:
+            self._load()
+        return self._entries
+
+    def lookup(self, product: str, version: str) -> List[Dict]:
+        """製品名とバージョンに該当する脆弱性を返す"""
+        if self._products is None:
+            self._load()
+        indexed = self._products.get(product.lower())
+        if indexed is None or not version:
+            return []
+        bounds, segments = indexed
+        return segments[bisect_right(bounds, version_key(version))]
+
+    def lookup_service(self, *texts: str) -> List[Dict]:
+        """nmapのサービス/バージョン文字列から製品とバージョンを取り出して検索（深刻度順）"""
+        if self._products is None:
+            self._load()
+        for text in texts:
+            product, version = split_product_version(text)
+            if not version:
+                continue
+            tokens = product.split()
+            # "apache httpd" → "apache" のように後ろの語を外しながら製品名を引く
+            for end in range(len(tokens), 0, -1):
+                name = " ".join(tokens[:end])
+                if name in self._products:
+                    matches = self.lookup(name, version)
+                    return sorted(matches, key=lambda v: (-SEVERITY_ORDER.get(v["severity"], 0), v["id"]))
+        return []